@@ -0,0 +1,168 @@
+"""Run Culinary Connections without its windows, on a stream of users' answers, one JSON object per line.
+
+Run it with, for example:
+
+    python batch.py --input users.jsonl --output recommendations.jsonl --workers 4
+
+Each input line is an object with the answers the windows would have collected:
+
+    {"area": "Downtown", "preferences": [8 attributes, as in main.py], "name": "Ada", "friend": "Grace"}
+
+and each output line (in the same order) has the business ids main.py would have shown on its map (the
+recommended ones best first, and the preferences relaxed for any that do not match them all):
+
+    {"name": "Ada", "friend": "Grace", "recommended": [...], "relaxed": {...}, "nearby": [...],
+     "friend_restaurants": [...]}
+
+or an "error" if the answers could not be used. The restaurants, decision tree and graph are loaded once (once
+per worker process), and every record adds its user to the same graph, as main.py would. Maps are only drawn if
+--html is given.
+"""
+from __future__ import annotations
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from typing import Iterable, Iterator, Optional, TextIO
+
+import graph_implement
+import map_implement
+import name_implement
+import service_implement
+
+# The service used by each worker process, set by init_worker
+_service: Optional[service_implement.RecommendationService] = None
+
+# The directory each worker process saves maps to, if any
+_html_dir: Optional[str] = None
+
+
+def recommend_record(service: service_implement.RecommendationService, record: dict,
+                     html_path: Optional[str] = None) -> dict:
+    """Return the recommendations for the user whose answers are record, as main.py would make them.
+
+    The user is added to service's graph with their recommended restaurants, as a friend of record['friend']
+    if the record has one. If html_path is given, the map of the recommendations is saved there.
+
+    A record that cannot be answered (such as one whose friend is not a user, or is the user themselves) is
+    returned with an error instead.
+    """
+    name, friend = record.get('name'), record.get('friend')
+    try:
+        if not isinstance(name, str) or not isinstance(record['preferences'], list):
+            raise TypeError('name must be a string and preferences a list')
+        location = graph_implement.get_lat_lon(record['area'])
+        recommended = service.recommend(record['preferences'], location=location)
+        nearby = service.nearby(location)
+        recommended_ids = [business['business_id'] for business, _ in recommended]
+        if friend is None:
+            service.add_user(name, recommended_ids)
+            friend_restaurants = []
+        else:
+            service.make_friend(name, friend, recommended_ids)
+            friend_restaurants = service.friend_restaurants(friend)
+    except (KeyError, TypeError, ValueError) as error:
+        return {'name': name, 'friend': friend, 'error': f'{type(error).__name__}: {error}'}
+
+    if html_path is not None:
+        map_builder = map_implement.MapBuilder()
+        service.add_to_map(map_builder, [business for business, _ in recommended], 'decision_tree')
+        service.add_to_map(map_builder, nearby, 'nearby')
+        service.add_to_map(map_builder, friend_restaurants, 'friend')
+        map_builder.save(html_path)
+
+    return {'name': name, 'friend': friend, 'recommended': recommended_ids,
+            'relaxed': {business['business_id']: relaxed for business, relaxed in recommended if relaxed},
+            'nearby': [business['business_id'] for business in nearby],
+            'friend_restaurants': [business['business_id'] for business in friend_restaurants]}
+
+
+def init_worker(zip_file: str, user_data: list[dict], html_dir: Optional[str]) -> None:
+    """Load the service of a worker process, with the same users as every other worker."""
+    set_worker_service(service_implement.load_service(zip_file, user_data=user_data), html_dir)
+
+
+def set_worker_service(service: service_implement.RecommendationService, html_dir: Optional[str]) -> None:
+    """Make run_worker use service, and save maps to html_dir if it is not None."""
+    global _service, _html_dir
+    _service = service
+    _html_dir = html_dir
+
+
+def run_worker(numbered_line: tuple[int, str]) -> str:
+    """Return the output line for the numbered input line, using the worker process's service."""
+    number, line = numbered_line
+    html_path = None if _html_dir is None else os.path.join(_html_dir, f'{number}.html')
+    return json.dumps(recommend_line(_service, line, html_path))
+
+
+def recommend_line(service: service_implement.RecommendationService, line: str,
+                   html_path: Optional[str] = None) -> dict:
+    """Return the recommendations for the record on one input line."""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return {'error': 'the line is not JSON'}
+    if not isinstance(record, dict):
+        return {'error': 'the line is not a JSON object'}
+    return recommend_record(service, record, html_path)
+
+
+def numbered_lines(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """Yield the non-blank lines with their (1-based) line numbers."""
+    for number, line in enumerate(lines, start=1):
+        if line.strip():
+            yield number, line
+
+
+def run_batch(lines: Iterable[str], output: TextIO, zip_file: str = service_implement.YELP_ZIP,
+              workers: int = 1, html_dir: Optional[str] = None, user_amount: int = 30, seed: int = 0) -> int:
+    """Write the output line for every input line to output, and return the number of records.
+
+    The user_amount dummy users are generated from the given random seed, so the same input gives the same
+    output. With more than one worker, the records are spread over that many processes, each with its own copy
+    of the restaurants and graph (starting from the same users).
+    """
+    service = service_implement.load_service(zip_file, user_data=[])
+    random.seed(seed)
+    user_data = name_implement.generate_users(user_amount, 5, service.catalogue)
+    if html_dir is not None:
+        os.makedirs(html_dir, exist_ok=True)
+
+    count = 0
+    if workers > 1:
+        with multiprocessing.Pool(workers, init_worker, (zip_file, user_data, html_dir)) as pool:
+            for result in pool.imap(run_worker, numbered_lines(lines), chunksize=64):
+                output.write(result + '\n')
+                count += 1
+    else:
+        service.graph.load_restaurant_graph(service.catalogue.by_id, user_data)
+        set_worker_service(service, html_dir)
+        for numbered_line in numbered_lines(lines):
+            output.write(run_worker(numbered_line) + '\n')
+            count += 1
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recommend restaurants for users read as JSON lines.')
+    parser.add_argument('--input', default='-', help='the JSON lines file to read (- for standard input)')
+    parser.add_argument('--output', default='-', help='the JSON lines file to write (- for standard output)')
+    parser.add_argument('--html', default=None, help='save a map of each record to this directory')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--zip', default=service_implement.YELP_ZIP, help='path to the Yelp business dataset zip')
+    parser.add_argument('--users', type=int, default=30, help='number of dummy users to generate')
+    parser.add_argument('--seed', type=int, default=0, help='random seed the dummy users are generated from')
+    arguments = parser.parse_args()
+
+    input_file = sys.stdin if arguments.input == '-' else open(arguments.input, encoding='utf-8')
+    output_file = sys.stdout if arguments.output == '-' else open(arguments.output, 'w', encoding='utf-8')
+    start = time.perf_counter()
+    with input_file, output_file:
+        records = run_batch(input_file, output_file, arguments.zip, arguments.workers, arguments.html,
+                            arguments.users, arguments.seed)
+    seconds = time.perf_counter() - start
+    print(f'{records} records in {seconds:.2f}s ({records / seconds:.0f} records per second)', file=sys.stderr)
@@ -0,0 +1,724 @@
+"""Timing and memory benchmarks for the slow stages of Culinary Connections.
+
+Run a benchmark with, for example:
+
+    python benchmarks.py startup
+
+Benchmarks that need the real data read the Yelp zip from the working directory (see --zip).
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import heapq
+import importlib.util
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import folium
+from geopy.distance import geodesic
+
+from index_implement import ANY
+import cache_implement
+import catalogue_implement
+import csr_graph_implement
+import feature_implement
+import graph_implement
+import ingest_implement
+import map_implement
+import pipeline_implement
+import ranking_implement
+import matrix_implement
+import record_implement
+import recommend_implement
+import server
+import service_implement
+import shard_implement
+import similarity_implement
+import spatial_implement
+import snapshot_implement
+import tree_implement
+
+YELP_ZIP = 'yelp_academic_dataset_business.json.zip'
+YELP_JSON = 'yelp_academic_dataset_business.json'
+CUISINE_FILE = 'cuisines.txt'
+
+
+def time_it(function: Callable[[], Any]) -> tuple[float, Any]:
+    """Return how many seconds function() takes to run, and what it returned."""
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def bench_startup(args: argparse.Namespace) -> None:
+    """Compare a cold start (parse the zip, build the snapshot) with a warm start (memory-map the snapshot)."""
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, 'benchmark.snapshot')
+
+        def start() -> list:
+            snapshot = snapshot_implement.load_or_build(args.zip, YELP_JSON, CUISINE_FILE, snapshot_path)
+            snapshot.records()
+            return list(snapshot.rows())
+
+        def no_snapshot() -> list:
+            r_data = tree_implement.load_restaurants_nashville(args.zip, YELP_JSON)
+            cuisine_list = tree_implement.filter_cuisine(r_data, CUISINE_FILE)
+            return [tree_implement.make_row(r, cuisine_list) for r in r_data]
+
+        no_snapshot_seconds, _ = time_it(no_snapshot)
+        cold_seconds, _ = time_it(start)
+        warm_seconds, rows = time_it(start)
+    tree_seconds, _ = time_it(lambda: tree_implement.make_tree_from_rows(rows))
+
+    print('loading the restaurants and their decision tree rows:')
+    print(f'  without snapshot: {no_snapshot_seconds:.3f}s')
+    print(f'  cold start (building the snapshot): {cold_seconds:.3f}s')
+    print(f'  warm start (memory-mapped snapshot): {warm_seconds:.3f}s')
+    print(f'building the decision tree from the rows: {tree_seconds:.3f}s')
+
+
+def nashville_rows(zip_path: str) -> list[list]:
+    """Return the decision tree rows of the Nashville restaurants in the zip at zip_path."""
+    r_data = tree_implement.load_restaurants_nashville(zip_path, YELP_JSON)
+    cuisine_list = tree_implement.filter_cuisine(r_data, CUISINE_FILE)
+    rows = (tree_implement.make_row(r, cuisine_list) for r in r_data)
+    return [row for row in rows if row is not None]
+
+
+def bench_tree(args: argparse.Namespace) -> None:
+    """Compare building and querying the list-based Tree with the dict-based DecisionTree."""
+    rows = nashville_rows(args.zip)
+    queries = [row[:-1] for row in random.Random(0).choices(rows, k=args.queries)]
+    print(f'{len(rows)} rows, {len(queries)} queries')
+
+    for label, new_tree in [('Tree', lambda: tree_implement.Tree('', [])),
+                            ('DecisionTree', lambda: tree_implement.DecisionTree(''))]:
+        build_seconds, tree = time_it(lambda: tree_implement.make_tree_from_rows(rows, new_tree()))
+        query_seconds, _ = time_it(lambda: [tree.match_user_restaurant(query) for query in queries])
+        print(f'{label}: build {build_seconds:.3f}s, '
+              f'query {query_seconds / len(queries) * 1e6:.1f}us per match_user_restaurant')
+
+
+def bench_wildcards(args: argparse.Namespace) -> None:
+    """Compare matching fully specified user input with matching user input that is mostly wildcards."""
+    rows = nashville_rows(args.zip)
+    tree = tree_implement.make_tree_from_rows(rows)
+    generator = random.Random(0)
+    full_rows = [row for row in rows if len(row) == 9]
+    exact = [row[:-1] for row in generator.choices(full_rows, k=args.queries)]
+    for wildcards in range(0, 9, 2):
+        queries = []
+        for query in exact:
+            query = list(query)
+            for i in generator.sample(range(8), wildcards):
+                query[i] = ANY
+            queries.append(query)
+        seconds, _ = time_it(lambda: [tree.match_user_restaurant(query) for query in queries])
+        print(f'{wildcards} wildcards: {seconds / len(queries) * 1e6:.1f}us per match_user_restaurant')
+
+
+def random_preferences(rows: list[list], count: int, generator: random.Random) -> list[list]:
+    """Return count preference vectors taken from the full rows, with a random number of wildcards each."""
+    full_rows = [row for row in rows if len(row) == 9]
+    preferences = []
+    for row in generator.choices(full_rows, k=count):
+        preference = row[:-1]
+        for i in generator.sample(range(8), generator.randint(0, 8)):
+            preference[i] = ANY
+        preferences.append(preference)
+    return preferences
+
+
+def bench_matrix(args: argparse.Namespace) -> None:
+    """Compare AttributeMatrix.match_many with calling match_user_restaurant once per preference vector."""
+    rows = nashville_rows(args.zip)
+    preferences = random_preferences(rows, args.queries, random.Random(0))
+    tree = tree_implement.make_tree_from_rows(rows)
+    matrix = matrix_implement.AttributeMatrix(rows)
+
+    loop_seconds, expected = time_it(
+        lambda: [tree.match_user_restaurant(preference, len(rows)) for preference in preferences])
+    batch_seconds, actual = time_it(lambda: matrix.match_many(preferences))
+    assert actual == expected
+    print(f'{len(preferences)} preference vectors against {len(rows)} rows:')
+    print(f'  match_user_restaurant in a loop: {loop_seconds:.3f}s')
+    print(f'  AttributeMatrix.match_many: {batch_seconds:.3f}s')
+
+
+def bench_nearby(args: argparse.Namespace) -> None:
+    """Compare finding the restaurants within 1 km with a SpatialIndex against measuring the geodesic distance
+    to every restaurant.
+    """
+    r_data = tree_implement.load_restaurants_nashville(args.zip, YELP_JSON)
+    generator = random.Random(0)
+    locations = [(generator.uniform(36.05, 36.3), generator.uniform(-86.9, -86.65)) for _ in range(args.queries)]
+
+    def scan(location: tuple[float, float]) -> set[str]:
+        return {b['business_id'] for b in r_data
+                if geodesic(location, (b['latitude'], b['longitude'])).kilometers <= 1}
+
+    index_seconds, index = time_it(lambda: spatial_implement.SpatialIndex(r_data))
+    scan_seconds, expected = time_it(lambda: [scan(location) for location in locations])
+    query_seconds, actual = time_it(lambda: [index.within(location) for location in locations])
+    assert [{b['business_id'] for _, b in result} for result in actual] == expected
+    print(f'{len(locations)} locations against {len(r_data)} restaurants:')
+    print(f'  geodesic to every restaurant: {scan_seconds / len(locations) * 1e3:.2f}ms per location')
+    print(f'  SpatialIndex.within: {query_seconds / len(locations) * 1e3:.2f}ms per location '
+          f'(index built in {index_seconds:.3f}s)')
+
+
+def bench_graph_load(args: argparse.Namespace) -> None:
+    """Time Graph.load_restaurant_graph on growing numbers of synthetic users, each with 5 restaurants."""
+    r_data = tree_implement.load_restaurants_nashville(args.zip, YELP_JSON)
+    r_index = {r['business_id']: r for r in r_data}
+    business_ids = list(r_index)
+    generator = random.Random(0)
+    user_amount = 1000
+    while user_amount <= args.max_users:
+        user_data = [{f'user {i}': generator.sample(business_ids, 5)} for i in range(user_amount)]
+        graph = graph_implement.Graph()
+        load_seconds, _ = time_it(lambda: graph.load_restaurant_graph(r_index, user_data))
+        reload_seconds, _ = time_it(lambda: graph.load_restaurant_graph(r_index, user_data))
+        print(f'{user_amount} users: load {load_seconds:.3f}s '
+              f'({load_seconds / (user_amount * 5) * 1e6:.2f}us per edge), reload {reload_seconds:.3f}s')
+        user_amount *= 10
+
+
+def bench_csr(args: argparse.Namespace) -> None:
+    """Compare the memory per edge and neighbour query time of Graph and CSRGraph, on synthetic users who have
+    each been to 5 of 5000 restaurants.
+    """
+    generator = random.Random(0)
+    restaurants = [f'restaurant {i}' for i in range(5000)]
+    user_data = [(f'user {i}', generator.sample(restaurants, 5)) for i in range(args.max_users)]
+    edges = len(user_data) * 5
+    queries = [generator.choice(user_data)[0] for _ in range(args.queries)] + generator.sample(restaurants, 100)
+
+    for label, new_graph in [('Graph', graph_implement.Graph), ('CSRGraph', csr_graph_implement.CSRGraph)]:
+        tracemalloc.start()
+        graph = new_graph()
+        for restaurant in restaurants:
+            graph.add_vertex(restaurant, 'restaurant')
+        for user, visited in user_data:
+            graph.add_vertex(user, 'user')
+            for restaurant in visited:
+                graph.add_edge(user, restaurant)
+        if isinstance(graph, csr_graph_implement.CSRGraph):
+            graph.compact()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        query_seconds, _ = time_it(lambda: [graph.get_neighbours(item) for item in queries])
+        print(f'{label}: {memory / edges:.0f} bytes per edge, '
+              f'{query_seconds / len(queries) * 1e6:.1f}us per get_neighbours')
+
+
+def bench_recommend(args: argparse.Namespace) -> None:
+    """Time friend-of-friend recommendations on a CSRGraph of synthetic users who have each been to 5 of 5000
+    restaurants (--max-users users, so five times as many edges).
+    """
+    generator = random.Random(0)
+    restaurants = [f'restaurant {i}' for i in range(5000)]
+    graph = csr_graph_implement.CSRGraph()
+    for restaurant in restaurants:
+        graph.add_vertex(restaurant, 'restaurant')
+    for i in range(args.max_users):
+        user = graph.add_vertex(f'user {i}', 'user')
+        for restaurant_id in generator.sample(range(5000), 5):
+            graph.add_edge_ids(user, restaurant_id)
+    graph.compact()
+
+    users = [f'user {generator.randrange(args.max_users)}' for _ in range(args.queries)]
+    seconds, results = time_it(lambda: [recommend_implement.recommend_restaurants(graph, user) for user in users])
+    print(f'{args.max_users * 5} edges: {seconds / len(users) * 1e3:.1f}ms per recommend_restaurants, '
+          f'{sum(len(result) for result in results) / len(users):.1f} results on average')
+
+
+def bench_similar(args: argparse.Namespace) -> None:
+    """Compare the recall and latency of MinHashLSH.similar_users with brute-force Jaccard similarity, on
+    synthetic users who each pick 5-10 restaurants from one of many overlapping groups of 20.
+    """
+    generator = random.Random(0)
+    user_data = []
+    for i in range(args.max_users):
+        group = generator.randrange(args.max_users // 10 + 1)
+        choices = range(group * 10, group * 10 + 20)
+        user_data.append({f'user {i}': generator.sample(choices, generator.randint(5, 10))})
+    sets = {name: set(restaurants) for user in user_data for name, restaurants in user.items()}
+
+    build_seconds, index = time_it(lambda: similarity_implement.from_users(user_data))
+    users = generator.sample(list(sets), min(args.queries, len(sets)))
+
+    def brute_force(user: str) -> list[tuple[str, float]]:
+        scored = ((other, similarity_implement.jaccard(sets[user], sets[other])) for other in sets if other != user)
+        return heapq.nlargest(10, scored, key=lambda pair: pair[1])
+
+    exact_seconds, expected = time_it(lambda: [brute_force(user) for user in users])
+    lsh_seconds, actual = time_it(lambda: [index.similar_users(user) for user in users])
+
+    found = relevant = 0
+    for exact, approximate in zip(expected, actual):
+        wanted = {user for user, similarity in exact if similarity >= 0.5}
+        relevant += len(wanted)
+        found += len(wanted & {user for user, _ in approximate})
+    print(f'{len(sets)} users (index built in {build_seconds:.2f}s):')
+    print(f'  brute force: {exact_seconds / len(users) * 1e3:.2f}ms per query')
+    print(f'  MinHashLSH: {lsh_seconds / len(users) * 1e3:.2f}ms per query, '
+          f'recall {found / max(relevant, 1):.3f} of top-10 users with similarity >= 0.5')
+
+
+def bench_map(args: argparse.Namespace) -> None:
+    """Compare the size of map.html and the time to write it with one iframe marker per restaurant against
+    a MapBuilder, for --queries restaurants.
+    """
+    r_data = tree_implement.load_restaurants_nashville(args.zip, YELP_JSON)[:args.queries]
+    categories = list(map_implement.CATEGORY_COLOURS)
+    people = ['Ada', 'Grace', 'Alan']
+
+    def iframe_map(path: str) -> None:
+        my_map = folium.Map(location=[36.1627, -86.7816], zoom_start=12)
+        for i, business in enumerate(r_data):
+            popup_html = (f"<div style='font-family: trebuchet ms, sans-serif; font-size: "
+                          f"15px;'><b>Restaurant:</b> {business['name']}<br/>")
+            popup_html += f"<div style='margin-top: 9px;'><b>Rating:</b> {business['stars']}<br/>"
+            popup_html += f"<div style='margin-top: 9px;'><b>People:</b> {', '.join(people)}<br/>"
+            popup_iframe = folium.IFrame(width=220, height=110, html=popup_html)
+            colour = map_implement.CATEGORY_COLOURS[categories[i % len(categories)]]
+            folium.Marker([business['latitude'], business['longitude']], popup=folium.Popup(popup_iframe),
+                          icon=folium.Icon(color=colour, icon='glyphicon glyphicon-cutlery')).add_to(my_map)
+        my_map.save(path)
+
+    def builder_map(path: str) -> None:
+        map_builder = map_implement.MapBuilder()
+        for i, business in enumerate(r_data):
+            map_builder.add(business, categories[i % len(categories)], people)
+        map_builder.save(path)
+
+    with tempfile.TemporaryDirectory() as directory:
+        iframe_path, builder_path = os.path.join(directory, 'iframe.html'), os.path.join(directory, 'builder.html')
+        iframe_seconds, _ = time_it(lambda: iframe_map(iframe_path))
+        builder_seconds, _ = time_it(lambda: builder_map(builder_path))
+        print(f'{len(r_data)} restaurants:')
+        print(f'  one iframe per marker: {os.path.getsize(iframe_path) / 1e3:.0f}kB in {iframe_seconds:.3f}s')
+        print(f'  MapBuilder: {os.path.getsize(builder_path) / 1e3:.0f}kB in {builder_seconds:.3f}s')
+
+
+def bench_server(args: argparse.Namespace) -> None:
+    """Load test a RecommendationServer on a free local port with --concurrency connections sending --queries
+    requests between them (mostly /match, with some /nearby, /friend_restaurants and /make_friend).
+    """
+    generator = random.Random(0)
+    service = service_implement.load_service(args.zip)
+    preferences = random_preferences(nashville_rows(args.zip), args.queries, generator)
+    users = sorted(service.users())
+    areas = ['Downtown', 'East Nashville', 'The Gulch', 'Germantown', '12 South', 'Green Hills']
+    requests: list[tuple[str, dict[str, Any]]] = []
+    for i, preference in enumerate(preferences):
+        kind = generator.random()
+        if kind < 0.7:
+            requests.append(('/match', {'preferences': preference}))
+        elif kind < 0.85:
+            requests.append(('/nearby', {'area': generator.choice(areas)}))
+        elif kind < 0.95:
+            requests.append(('/friend_restaurants', {'friend': generator.choice(users)}))
+        else:
+            requests.append(('/make_friend', {'user': f'Load Tester {i}', 'friend': generator.choice(users),
+                                              'restaurants': []}))
+
+    listening = threading.Event()
+    ports = []
+
+    def started(listener: asyncio.AbstractServer) -> None:
+        ports.append(listener.sockets[0].getsockname()[1])
+        listening.set()
+
+    recommendation_server = server.RecommendationServer(service, workers=args.concurrency)
+    threading.Thread(target=lambda: asyncio.run(recommendation_server.serve('127.0.0.1', 0, started)),
+                     daemon=True).start()
+    listening.wait()
+
+    latencies = []
+    statuses = {}
+
+    async def client(queue: list) -> None:
+        reader, writer = await asyncio.open_connection('127.0.0.1', ports[0])
+        while queue:
+            path, body = queue.pop()
+            data = json.dumps(body).encode()
+            start = time.perf_counter()
+            writer.write(f'POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n'.encode()
+                         + data)
+            await writer.drain()
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            status = int(head.split(b' ')[1])
+            statuses[status] = statuses.get(status, 0) + 1
+        writer.close()
+
+    async def load_test() -> None:
+        queue = list(reversed(requests))
+        await asyncio.gather(*(client(queue) for _ in range(args.concurrency)))
+
+    seconds, _ = time_it(lambda: asyncio.run(load_test()))
+    latencies.sort()
+    print(f'{len(requests)} requests over {args.concurrency} connections (statuses {statuses}):')
+    print(f'  p50 {latencies[len(latencies) // 2] * 1e3:.2f}ms, '
+          f'p99 {latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1e3:.2f}ms, '
+          f'{len(requests) / seconds:.0f} requests per second')
+
+
+def bench_pipeline(args: argparse.Namespace) -> None:
+    """Compare the time from saving preferences to the map being written when loading starts after the
+    preference window closes against loading in the background while it is open (the user is assumed to take
+    two seconds to fill it in).
+    """
+    area, preferences = 'Downtown', ['Mexican', ANY, 'high star', ANY, ANY, ANY, ANY, ANY]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'map.html')
+
+        def after_window() -> None:
+            pipeline = pipeline_implement.StartupPipeline(zip_file=args.zip)
+            _, map_builder, _ = pipeline.recommend(area, preferences)
+            pipeline.save_map(map_builder, path, open_browser=False).result()
+            pipeline.close()
+
+        background = pipeline_implement.StartupPipeline(zip_file=args.zip)
+        time.sleep(2)
+
+        def in_background() -> None:
+            _, map_builder, _ = background.recommend(area, preferences)
+            background.save_map(map_builder, path, open_browser=False).result()
+
+        after_seconds, _ = time_it(after_window)
+        background_seconds, _ = time_it(in_background)
+        background.close()
+    print('From saving preferences to map.html:')
+    print(f'  loading after the window closes: {after_seconds:.3f}s')
+    print(f'  loading while the window is open: {background_seconds:.3f}s')
+
+
+def bench_shards(args: argparse.Namespace) -> None:
+    """Time the single ingest pass that splits the dump into city shards, the first (cold) load of each city,
+    and later (warm) lookups, with room for two shards in memory.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        ingest_seconds, sharded = time_it(lambda: shard_implement.ShardedCatalogue(
+            args.zip, YELP_JSON, CUISINE_FILE, directory, max_resident=2))
+        cities = sharded.cities()
+        print(f'one ingest pass over {args.zip}: {ingest_seconds:.2f}s, {len(cities)} cities')
+        for key, count in list(cities.items())[:5]:
+            city, state = key.rsplit(', ', 1)
+            cold_seconds, shard = time_it(lambda: sharded.shard(city, state))
+            warm_seconds, _ = time_it(lambda: [sharded.shard(city, state) for _ in range(args.queries)])
+            matches = shard.decision_tree.match_user_restaurant([ANY] * 8)
+            print(f'  {key}: {count} restaurants, {len(shard.catalogue.cuisines)} cuisines, '
+                  f'{len(matches)} matches; cold load {cold_seconds:.3f}s, '
+                  f'warm lookup {warm_seconds / args.queries * 1e6:.1f}us')
+        print(f'  resident after visiting them in turn: {sharded.resident()}')
+
+        service = service_implement.load_service(args.zip)
+        service.use_shards(sharded)
+        check_city_routing(service, list(cities)[:5])
+        print(f'  queries routed to each city by RecommendationService.in_city; resident: {sharded.resident()}')
+
+
+def check_city_routing(service: service_implement.RecommendationService, keys: list[str]) -> None:
+    """Assert that service.in_city answers the queries about each city in keys (see shard_implement.city_key)
+    from that city's restaurants alone, answers Nashville itself, and keeps no more shards in memory than its
+    ShardedCatalogue allows.
+
+    Each city's results are cached under the same query as the others', so this also checks that no city is
+    answered from another's cached results.
+    """
+    assert service.shards is not None and service.in_city(' nashville', 'tn') is service
+    for key in keys:
+        city, state = key.rsplit(', ', 1)
+        city_service = service.in_city(city, state)
+        assert city_service.city == key and city_service.graph is service.graph
+        restaurants = city_service.match([ANY] * 8, 10)
+        assert restaurants and all(shard_implement.city_key(r['city'], r['state']) == key for r in restaurants)
+        assert [r['business_id'] for r in city_service.match([ANY] * 8, 10)] == \
+            [r['business_id'] for r in restaurants]
+
+        visited = [r['business_id'] for r in restaurants]
+        service.graph.load_restaurant_graph(city_service.catalogue.by_id, [{f'visitor of {key}': visited}])
+        location = (restaurants[0]['latitude'], restaurants[0]['longitude'])
+        nearby = city_service.nearby(location, 5.0, 5)
+        assert visited[0] in [r['business_id'] for r in nearby]
+        assert all(shard_implement.city_key(r['city'], r['state']) == key for r in nearby)
+        assert len(service.shards.resident()) <= service.shards.max_resident
+    try:
+        service.in_city('Atlantis', 'XX')
+    except KeyError:
+        pass
+    else:
+        raise AssertionError('a city without restaurants was routed')
+
+
+def bench_ingest(args: argparse.Namespace) -> None:
+    """Compare reading the Nashville restaurants out of the zip one line at a time against decoding chunks of
+    it in 1, 2, 4 and 8 worker processes.
+    """
+    serial_seconds, expected = time_it(lambda: tree_implement.load_restaurants_nashville(args.zip, YELP_JSON))
+    expected_ids = [r['business_id'] for r in expected]
+    parser = 'orjson' if importlib.util.find_spec('orjson') is not None else 'json'
+    print(f'{len(expected)} restaurants in {args.zip} ({os.cpu_count()} CPUs):')
+    print(f'  load_restaurants_nashville: {serial_seconds:.2f}s')
+    for workers in [1, 2, 4, 8]:
+        seconds, restaurants = time_it(lambda: ingest_implement.load_restaurants(args.zip, YELP_JSON, workers))
+        assert [r['business_id'] for r in restaurants] == expected_ids
+        print(f'  load_restaurants with {workers} workers ({parser}): {seconds:.2f}s')
+
+
+def traced_memory(function: Callable[[], Any]) -> tuple[int, Any]:
+    """Return the bytes still allocated (according to tracemalloc) by the result of calling function, and the
+    result.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def bench_records(args: argparse.Namespace) -> None:
+    """Compare the memory held by the Nashville restaurants as full Yelp dictionaries, as the dictionaries of
+    the snapshot, and as compact records.
+    """
+    snapshot = snapshot_implement.load_or_build(args.zip, YELP_JSON, CUISINE_FILE)
+    full_bytes, full = traced_memory(lambda: tree_implement.load_restaurants_nashville(args.zip, YELP_JSON))
+    dict_bytes, dicts = traced_memory(snapshot.records)
+    strings = record_implement.StringTable()
+    compact_bytes, compact = traced_memory(lambda: [record_implement.Restaurant(r, strings) for r in dicts])
+    assert [r.to_dict() for r in compact] == [{key: r.get(key) for key in record_implement.FIELDS} for r in dicts]
+    print(f'{len(full)} restaurants:')
+    print(f'  Yelp dictionaries: {full_bytes / 1e6:.1f}MB ({full_bytes / len(full):.0f}B each)')
+    print(f'  snapshot dictionaries: {dict_bytes / 1e6:.1f}MB ({dict_bytes / len(dicts):.0f}B each)')
+    print(f'  compact records: {compact_bytes / 1e6:.1f}MB ({compact_bytes / len(compact):.0f}B each, '
+          f'{len(strings)} distinct strings)')
+
+
+def bench_features(args: argparse.Namespace) -> None:
+    """Time extracting the decision tree row of every Nashville restaurant in one pass, and count the
+    restaurants left out of the tree for each reason.
+    """
+    r_data = tree_implement.load_restaurants_nashville(args.zip, YELP_JSON)
+    cuisine_list = tree_implement.filter_cuisine(r_data, CUISINE_FILE)
+    compile_seconds, extractor = time_it(lambda: feature_implement.FeatureExtractor(cuisine_list))
+    seconds, (rows, dropped) = time_it(lambda: extractor.extract_all(r_data))
+    print(f'{len(r_data)} restaurants, {len(cuisine_list)} cuisines (compiled in {compile_seconds * 1e3:.2f}ms):')
+    print(f'  {len(r_data) / seconds:.0f} records per second, '
+          f'{sum(row is not None for row in rows)} rows')
+    for reason, count in dropped.most_common():
+        print(f'  dropped ({reason}): {count}')
+
+
+def bench_ranking(args: argparse.Namespace) -> None:
+    """Compare ranking every match of a broad query with a full sort against selecting the first page with a
+    bounded heap, and against paging through a heap.
+    """
+    service = service_implement.load_service(args.zip, user_data=[])
+    by_id, ranker = service.catalogue.by_id, service.catalogue.ranker
+    location = graph_implement.get_lat_lon('Downtown')
+    ids = service.decision_tree.match_all([ANY] * service_implement.NUM_PREFERENCES)
+
+    def full_sort() -> list[str]:
+        """Score and rank every match one at a time, then take the first page."""
+        return sorted((i for i in ids if i in by_id),
+                      key=lambda i: -ranking_implement.score(by_id[i], location))[:10]
+
+    sort_seconds, sorted_page = time_it(full_sort)
+    heap_seconds, heap_page = time_it(lambda: ranker.top_k(ids, 10, location))
+    pages = ranker.pages(ids, 10, location)
+    first_seconds, first_page = time_it(lambda: next(pages))
+    next_seconds, _ = time_it(lambda: [next(pages) for _ in range(9)])
+    assert sorted_page == heap_page == first_page
+    print(f'{len(ids)} matches:')
+    print(f'  full sort, first page: {sort_seconds * 1e3:.2f}ms')
+    print(f'  Ranker.top_k (k=10): {heap_seconds * 1e3:.2f}ms')
+    print(f'  Ranker.pages: {first_seconds * 1e3:.2f}ms for the first page, '
+          f'{next_seconds / 9 * 1e3:.3f}ms for each of the next 9')
+
+
+def bench_relax(args: argparse.Namespace) -> None:
+    """Compare an exact query with the relaxation search and with trying every set of relaxed preferences, on
+    random preferences that no restaurant matches exactly.
+    """
+    service = service_implement.load_service(args.zip, user_data=[])
+    index = service.decision_tree.index
+    values = [sorted({row[i] for row in nashville_rows(args.zip)}) for i in range(service_implement.NUM_PREFERENCES)]
+    generator = random.Random(0)
+    queries = []
+    while len(queries) < args.queries:
+        preferences = [generator.choice(options) for options in values]
+        if not index.matching_bits(preferences):
+            queries.append(preferences)
+
+    def every_relaxation(preferences: list) -> int:
+        """Return the bitset of the cheapest relaxation, found by trying every set of relaxed preferences."""
+        best = None
+        for relaxed in range(1 << len(preferences)):
+            bits = index.matching_bits([ANY if relaxed >> i & 1 else value for i, value in enumerate(preferences)])
+            if bits and (best is None or relaxed.bit_count() < best[0]):
+                best = (relaxed.bit_count(), bits)
+        return best[1]
+
+    exact_seconds, _ = time_it(lambda: [index.matching_bits(preferences) for preferences in queries])
+    search_seconds, found = time_it(lambda: [next(index.relaxations(preferences)) for preferences in queries])
+    every_seconds, _ = time_it(lambda: [every_relaxation(preferences) for preferences in queries])
+    relaxed_seconds, _ = time_it(lambda: [service.relaxed_match(preferences) for preferences in queries])
+    print(f'{len(queries)} queries with no exact match '
+          f'(mean {sum(len(relaxed) for _, relaxed, _ in found) / len(found):.2f} preferences relaxed):')
+    print(f'  exact query: {exact_seconds / len(queries) * 1e6:.1f}us')
+    print(f'  relaxation search, first result: {search_seconds / len(queries) * 1e6:.1f}us')
+    print(f'  every set of relaxed preferences: {every_seconds / len(queries) * 1e6:.1f}us')
+    print(f'  relaxed_match (10 ranked restaurants): {relaxed_seconds / len(queries) * 1e6:.1f}us')
+
+
+def bench_cache(args: argparse.Namespace) -> None:
+    """Compare answering repeated recommendation requests (drawn from a few popular preference combinations and
+    areas) with and without the query cache, and report the cache's counters.
+    """
+    service = service_implement.load_service(args.zip)
+    rows = nashville_rows(args.zip)
+    generator = random.Random(0)
+    popular = random_preferences(rows, 200, generator)
+    requests = [(generator.choice(list(graph_implement.NASHVILLE_AREAS)), generator.choice(popular))
+                for _ in range(args.queries)]
+
+    def answer_all() -> None:
+        """Answer every request as main.py would, before the user is added to the graph."""
+        for area, preferences in requests:
+            location = graph_implement.get_lat_lon(area)
+            service.recommend(preferences, location=location)
+            service.nearby(location)
+
+    service.cache = cache_implement.QueryCache(max_entries=0)
+    uncached_seconds, _ = time_it(answer_all)
+    service.cache = cache_implement.QueryCache(max_entries=1024)
+    cached_seconds, _ = time_it(answer_all)
+    print(f'{len(requests)} requests ({len(popular)} preference combinations, '
+          f'{len(graph_implement.NASHVILLE_AREAS)} areas):')
+    print(f'  without the cache: {uncached_seconds / len(requests) * 1e6:.0f}us per request')
+    print(f'  with the cache: {cached_seconds / len(requests) * 1e6:.0f}us per request')
+    print(f'  {service.cache.stats()}')
+
+
+def check_delta(service: service_implement.RecommendationService, generator: random.Random,
+                queries: int = 200) -> None:
+    """Assert that service, to which deltas have been applied, answers queries as a service rebuilt from its
+    restaurants by make_tree_from_rows and a new RestaurantCatalogue does.
+
+    Restaurants with the same score may be ranked in either order, so rankings are compared by score.
+    """
+    catalogue = service.catalogue
+    restaurants = catalogue.r_data
+    fresh = catalogue_implement.RestaurantCatalogue(restaurants, catalogue.cuisines)
+    extractor = feature_implement.compile_extractor(tuple(catalogue.cuisines))
+    rows = [row for row in map(extractor.row, restaurants) if row is not None]
+    tree = tree_implement.make_tree_from_rows(rows)
+    rebuilt = service_implement.RecommendationService(fresh, tree, service.graph)
+    assert len(service.decision_tree.index) == len(tree.index)
+    assert catalogue.categories.categories() == fresh.categories.categories()
+    for cuisine in catalogue.cuisines:
+        assert {r['business_id'] for r in catalogue.restaurants_with(cuisine)} == \
+            {r['business_id'] for r in fresh.restaurants_with(cuisine)}
+
+    values = [sorted({row[i] for row in rows}) + [ANY, ANY] for i in range(len(feature_implement.ROW_ATTRIBUTES))]
+    for _ in range(queries):
+        preferences = [generator.choice(choices) for choices in values]
+        location = (36.16 + generator.uniform(-0.05, 0.05), -86.78 + generator.uniform(-0.05, 0.05))
+        matches = service.decision_tree.match_all(preferences)
+        assert sorted(matches) == sorted(tree.match_all(preferences))
+        assert catalogue.ranker.scored(catalogue.ranker.top_k(matches, 10, location), location)[1].tolist() == \
+            fresh.ranker.scored(fresh.ranker.top_k(matches, 10, location), location)[1].tolist()
+        relaxed = [(ranking_implement.score(r, location), names)
+                   for r, names in service.relaxed_match(preferences, 10, location)]
+        assert relaxed == [(ranking_implement.score(r, location), names)
+                           for r, names in rebuilt.relaxed_match(preferences, 10, location)]
+
+
+def bench_delta(args: argparse.Namespace) -> None:
+    """Compare applying deltas of different sizes (a mix of rating changes, closures, new restaurants and
+    deletions) in place against rebuilding the catalogue and decision tree from scratch, and check that the
+    service answers as a rebuilt one would after each delta.
+    """
+    snapshot = snapshot_implement.load_or_build(args.zip, YELP_JSON, CUISINE_FILE)
+
+    def rebuild() -> service_implement.RecommendationService:
+        """Build the catalogue, decision tree and graph from the snapshot, as load_service does."""
+        catalogue = catalogue_implement.catalogue_from(snapshot)
+        return service_implement.service_from(catalogue, tree_implement.make_tree_from_rows(snapshot.rows()))
+
+    rebuild_seconds, service = time_it(rebuild)
+    print(f'{len(service.catalogue.by_id)} restaurants, rebuilt from the snapshot in {rebuild_seconds:.3f}s:')
+    generator = random.Random(0)
+    for size in (10, 100, 1000):
+        ids = list(service.catalogue.by_id)
+        upserts = [{'business_id': business_id, 'stars': generator.choice([1.0, 2.5, 4.0, 5.0])}
+                   for business_id in generator.sample(ids, size // 2)]
+        upserts += [{'business_id': business_id, 'is_open': generator.choice([0, '0', False])}
+                    for business_id in generator.sample(ids, size // 4)]
+        for i in range(size // 8):
+            business = service.catalogue.by_id[generator.choice(ids)]
+            upserts.append({**{key: business.get(key) for key in business}, 'business_id': f'new {size} {i}'})
+        upserts.append({**upserts[-1], 'business_id': f'closed {size}', 'is_open': 0})
+        deletes = generator.sample(ids, size - len(upserts))
+        seconds, counts = time_it(lambda: service.apply_delta(upserts, deletes))
+        print(f'  delta of {size}: {seconds * 1e3:.2f}ms ({counts})')
+        check_delta(service, generator)
+
+    # Restaurants that come and go under new names must not make the string table grow for ever
+    strings = len(service.catalogue.strings)
+    business = next(iter(service.catalogue.by_id.values()))
+    for i in range(20):
+        upserts = [{**{key: business.get(key) for key in business}, 'business_id': f'churn {i} {j}',
+                    'name': f'Churn {i} {j}'} for j in range(500)]
+        service.apply_delta(upserts, [])
+        service.apply_delta([], [upsert['business_id'] for upsert in upserts])
+        assert len(service.catalogue.strings) <= max(2 * strings, catalogue_implement.MIN_COMPACTION) + len(upserts)
+    print(f'  10000 restaurants added and removed: {len(service.catalogue.strings)} strings (from {strings})')
+    check_delta(service, generator)
+
+
+BENCHMARKS = {
+    'startup': bench_startup,
+    'tree': bench_tree,
+    'wildcards': bench_wildcards,
+    'matrix': bench_matrix,
+    'nearby': bench_nearby,
+    'graph_load': bench_graph_load,
+    'csr': bench_csr,
+    'recommend': bench_recommend,
+    'similar': bench_similar,
+    'map': bench_map,
+    'server': bench_server,
+    'pipeline': bench_pipeline,
+    'shards': bench_shards,
+    'ingest': bench_ingest,
+    'records': bench_records,
+    'features': bench_features,
+    'ranking': bench_ranking,
+    'relax': bench_relax,
+    'cache': bench_cache,
+    'delta': bench_delta,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a Culinary Connections benchmark.')
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--zip', default=YELP_ZIP, help='path to the Yelp business dataset zip')
+    parser.add_argument('--queries', type=int, default=1000, help='number of queries to time')
+    parser.add_argument('--concurrency', type=int, default=16, help='number of concurrent clients')
+    parser.add_argument('--max-users', type=int, default=1_000_000, help='largest number of synthetic users')
+    arguments = parser.parse_args()
+    BENCHMARKS[arguments.benchmark](arguments)
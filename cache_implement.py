@@ -0,0 +1,103 @@
+"""A bounded cache of query results, shared by every request to a RecommendationService.
+
+The space of preferences is small, so the same queries come in again and again. Each result is cached under
+a key that includes the versions of the structures it was computed from (see RestaurantCatalogue.version and
+Graph.version), so a result is never returned once the restaurants or the graph have changed: its key is
+simply never asked for again, and it is evicted in time like any other entry that is not being used.
+"""
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class QueryCache:
+    """A cache of query results that keeps at most max_entries of them, evicting the least recently used.
+
+    Instance Attributes:
+        - max_entries: The largest number of results kept at once (0 to cache nothing).
+        - hits: The number of lookups answered from the cache.
+        - misses: The number of lookups that had to compute their result.
+        - evictions: The number of results evicted to make room for newer ones.
+
+    Representation Invariants:
+        - self.max_entries >= 0
+        - len(self._entries) <= self.max_entries
+    """
+    max_entries: int
+    hits: int
+    misses: int
+    evictions: int
+    # Private Instance Attributes:
+    #   - _entries: The cached results by key, least recently used first.
+    #   - _lock: Held while _entries or the counters are read or changed.
+    _entries: OrderedDict[Hashable, Any]
+    _lock: threading.Lock
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        """Initialize an empty cache of at most max_entries results."""
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of results in this cache."""
+        return len(self._entries)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the result cached under key, or else compute() (caching it under key).
+
+        compute is called without holding the cache's lock, so two threads missing the same key at once may
+        both compute it. Keys that cannot be hashed are not cached (and are not counted).
+
+        >>> cache = QueryCache(max_entries=1)
+        >>> cache.get_or_compute('a', lambda: 1), cache.get_or_compute('a', lambda: 2)
+        (1, 1)
+        >>> cache.get_or_compute('b', lambda: 3), cache.get_or_compute('a', lambda: 4)
+        (3, 4)
+        >>> cache.stats()
+        {'entries': 1, 'max_entries': 1, 'hits': 1, 'misses': 3, 'evictions': 2}
+        """
+        try:
+            hash(key)
+        except TypeError:
+            return compute()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        result = compute()
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of results in this cache, its capacity, and its hit, miss and eviction counts."""
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+    def clear(self) -> None:
+        """Remove every result from this cache (the counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["threading", "collections"]
+    })
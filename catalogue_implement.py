@@ -0,0 +1,168 @@
+"""The restaurant catalogue: the filtered restaurant data, loaded once and shared by the whole program."""
+from __future__ import annotations
+from typing import Optional
+
+from category_implement import CategoryStats
+from ranking_implement import Ranker
+from record_implement import Restaurant, StringTable
+import snapshot_implement
+from spatial_implement import SpatialIndex
+
+# The size a catalogue's string table must reach before upsert moves the records into a new table
+MIN_COMPACTION = 1024
+
+
+class RestaurantCatalogue:
+    """The Nashville restaurants, indexed by business id, by name and by cuisine.
+
+    The restaurants can be changed in place with upsert and remove, which keep every index up to date.
+
+    Instance Attributes:
+        - cuisines: The cuisines that the decision tree offers (as returned by filter_cuisine).
+        - categories: The category statistics of the restaurants, which also serve as the cuisine index.
+        - by_id:
+            Maps each business id to its restaurant (a Yelp dictionary or compact record_implement.Restaurant
+            record), in the order they appear in the dataset (with restaurants added later at the end).
+        - spatial_index: The restaurants, indexed by location.
+        - ranker: The scores of the restaurants, for ranking the matches of a query.
+        - version:
+            The number of changes made to the restaurants of this catalogue so far, so that results computed
+            from it can be told apart from those computed before it changed (see cache_implement).
+        - strings: The string table for the records of the restaurants added to this catalogue.
+
+    Representation Invariants:
+        - all(self.by_id[r['business_id']] is r for r in self.r_data)
+        - all(business_id in self.by_id for ids in self._ids_by_name.values() for business_id in ids)
+    """
+    cuisines: list[str]
+    categories: CategoryStats
+    by_id: dict[str, Restaurant | dict]
+    spatial_index: SpatialIndex
+    ranker: Ranker
+    version: int
+    strings: StringTable
+    # Private Instance Attributes:
+    #   - _ids_by_name:
+    #       Maps each restaurant name to the business ids of the restaurants with that name (every branch
+    #       of a chain), in dataset order.
+    #   - _compacted_size: The number of strings in self.strings when it was last compacted (or given).
+    _ids_by_name: dict[str, list[str]]
+    _compacted_size: int
+
+    def __init__(self, r_data: list[Restaurant | dict], cuisines: list[str],
+                 categories: Optional[CategoryStats] = None, strings: Optional[StringTable] = None) -> None:
+        """Initialize a catalogue of r_data.
+
+        Pass the CategoryStats of r_data as categories if they have already been computed, and the string table
+        of the records in r_data as strings if they are records (a new table is used otherwise).
+        """
+        self.cuisines = cuisines
+        self.strings = StringTable() if strings is None else strings
+        self._compacted_size = len(self.strings)
+        self.categories = CategoryStats(r_data) if categories is None else categories
+        self.spatial_index = SpatialIndex(r_data)
+        self.ranker = Ranker(r_data)
+        self.version = 0
+        self.by_id = {}
+        self._ids_by_name = {}
+        for r in r_data:
+            self.by_id[r['business_id']] = r
+            self._ids_by_name.setdefault(r['name'], []).append(r['business_id'])
+
+    @property
+    def r_data(self) -> list[Restaurant | dict]:
+        """The restaurants in this catalogue, in the order of by_id."""
+        return list(self.by_id.values())
+
+    def upsert(self, business: Restaurant | dict) -> Optional[Restaurant | dict]:
+        """Add business to this catalogue, replacing the restaurant with the same business id if there is one,
+        and return the restaurant it replaced (or None).
+
+        This takes time proportional to the size of business (and of its cell of the spatial index), not to the
+        size of the catalogue, except when the string table has grown to twice its size since it was last
+        compacted (see compact), which is rare enough that the cost of each upsert stays the same on average.
+        """
+        business_id = business['business_id']
+        old = self.by_id.get(business_id)
+        if old is not None:
+            self._unindex(old)
+        self.by_id[business_id] = business
+        self._ids_by_name.setdefault(business['name'], []).append(business_id)
+        self.categories.add(business)
+        self.spatial_index.add(business)
+        self.ranker.update(business)
+        self.version += 1
+        if len(self.strings) > max(2 * self._compacted_size, MIN_COMPACTION):
+            self.compact()
+        return old
+
+    def remove(self, business_id: str) -> Optional[Restaurant | dict]:
+        """Remove the restaurant with the given business id from this catalogue, and return it (or None if there
+        is no such restaurant).
+        """
+        old = self.by_id.pop(business_id, None)
+        if old is not None:
+            self._unindex(old)
+            self.ranker.remove(business_id)
+            self.version += 1
+        return old
+
+    def compact(self) -> None:
+        """Move the records in this catalogue into a new string table, holding only the strings they use, so
+        that the strings of the restaurants removed (or renamed) since then can be freed.
+
+        The old records are left as they are, so any still held elsewhere (such as in results being sent) stay
+        valid.
+        """
+        strings = StringTable()
+        for business_id, business in self.by_id.items():
+            if isinstance(business, Restaurant):
+                self.by_id[business_id] = Restaurant(business, strings)
+        self.strings = strings
+        self._compacted_size = len(strings)
+        self.spatial_index = SpatialIndex(self.by_id.values())
+
+    def _unindex(self, business: Restaurant | dict) -> None:
+        """Remove business from the name, category and spatial indexes."""
+        ids = self._ids_by_name[business['name']]
+        ids.remove(business['business_id'])
+        if not ids:
+            del self._ids_by_name[business['name']]
+        self.categories.remove(business)
+        self.spatial_index.remove(business)
+
+    def ids_named(self, name: str) -> list[str]:
+        """Return the business ids of the restaurants called name, in dataset order."""
+        return self._ids_by_name.get(name, [])
+
+    def restaurants_with(self, cuisine: str) -> list[Restaurant | dict]:
+        """Return the restaurants that list a category containing cuisine, in dataset order.
+
+        A category contains cuisine if the words of cuisine appear in it in order, as when the decision tree
+        finds a restaurant's cuisine, so 'Asian' also finds 'Asian Fusion' and 'Pan Asian'. This takes time
+        proportional to the number of restaurants returned once the cuisine has been looked up in the category
+        index.
+        """
+        return [self.by_id[business_id] for business_id in self.categories.matching(cuisine)]
+
+
+def catalogue_from(snapshot: snapshot_implement.Snapshot) -> RestaurantCatalogue:
+    """Return the catalogue of the restaurants in snapshot, as compact records in a new string table."""
+    strings = StringTable()
+    return RestaurantCatalogue(snapshot.restaurants(strings), snapshot.cuisines, strings=strings)
+
+
+def load_catalogue(zip_path: str, json_file_name: str, cuisine_file: str) -> RestaurantCatalogue:
+    """Return the catalogue of the Nashville restaurants in the zip at zip_path, read through its snapshot."""
+    return catalogue_from(snapshot_implement.load_or_build(zip_path, json_file_name, cuisine_file))
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'max-attributes': 9,
+        'extra-imports': ["category_implement", "ranking_implement", "record_implement", "snapshot_implement",
+                          "spatial_implement"]
+    })
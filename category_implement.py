@@ -0,0 +1,174 @@
+"""Category statistics: counts of the Yelp categories and the businesses listing each one, built in one pass."""
+from __future__ import annotations
+import heapq
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, Optional
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def split_categories(categories: Optional[str]) -> list[str]:
+    """Return the categories in a Yelp categories string, which separates them with commas.
+
+    >>> split_categories('Tex-Mex, Mexican, Restaurants')
+    ['Tex-Mex', 'Mexican', 'Restaurants']
+    >>> split_categories(None)
+    []
+    """
+    if not categories:
+        return []
+    return [category.strip() for category in categories.split(',') if category.strip()]
+
+
+@lru_cache(maxsize=4096)
+def tokens(text: str) -> tuple[str, ...]:
+    """Return the lowercase words of text.
+
+    >>> tokens('American (Traditional)')
+    ('american', 'traditional')
+    """
+    return tuple(_TOKEN.findall(text.lower()))
+
+
+def contains_words(category: str, text: str) -> bool:
+    """Return whether the words of text appear, in order, within category.
+
+    This is how a cuisine is found in a category, both by the decision tree (see feature_implement) and by
+    CategoryStats.matching.
+
+    >>> contains_words('American (New)', 'American'), contains_words('Thailand', 'Thai')
+    (True, False)
+    """
+    words, phrase = tokens(category), tokens(text)
+    return bool(phrase) and any(words[i:i + len(phrase)] == phrase for i in range(len(words) - len(phrase) + 1))
+
+
+class CategoryStats:
+    """The categories of a collection of businesses, with a posting list of business ids for each category.
+
+    Representation Invariants:
+        - all(ids for ids in self._postings.values())
+        - all(business_id in self._position for ids in self._postings.values() for business_id in ids)
+    """
+    # Private Instance Attributes:
+    #   - _postings:
+    #       Maps each category to the ids of the businesses listing it (as the keys of a dict, so that one can
+    #       be removed in constant time), in the order they were added.
+    #   - _position:
+    #       Maps each business id to the order it was added in.
+    #   - _added:
+    #       The number of businesses ever added, which gives the next business its position.
+    #   - _matching:
+    #       A cache of the answers of matching, keyed by the text searched for.
+    #   - _sets:
+    #       A cache of posting lists turned into sets, for co_occurrence.
+    _postings: dict[str, dict[str, None]]
+    _position: dict[str, int]
+    _added: int
+    _matching: dict[str, list[str]]
+    _sets: dict[str, set[str]]
+
+    def __init__(self, businesses: Iterable[dict] = ()) -> None:
+        """Initialize the statistics of businesses."""
+        self._postings = {}
+        self._position = {}
+        self._added = 0
+        self._matching = {}
+        self._sets = {}
+        for business in businesses:
+            self.add(business)
+
+    def add(self, business: dict) -> None:
+        """Count the categories of business and add it to their posting lists.
+
+        Do nothing if a business with the same id has already been added.
+        """
+        business_id = business['business_id']
+        if business_id in self._position:
+            return
+        self._position[business_id] = self._added
+        self._added += 1
+        for category in split_categories(business.get('categories')):
+            self._postings.setdefault(category, {})[business_id] = None
+            self._sets.pop(category, None)
+        self._matching.clear()
+
+    def remove(self, business: dict) -> None:
+        """Remove business from the posting lists of its categories (and drop any category it was the last to
+        list).
+
+        Do nothing if no business with its id has been added. This takes time proportional to the number of
+        categories business lists.
+        """
+        business_id = business['business_id']
+        if self._position.pop(business_id, None) is None:
+            return
+        for category in split_categories(business.get('categories')):
+            ids = self._postings.get(category)
+            if ids is not None and business_id in ids:
+                del ids[business_id]
+                if not ids:
+                    del self._postings[category]
+                self._sets.pop(category, None)
+        self._matching.clear()
+
+    def count(self, category: str) -> int:
+        """Return how many businesses list category."""
+        return len(self._postings.get(category, {}))
+
+    def businesses(self, category: str) -> list[str]:
+        """Return the ids of the businesses listing category, in the order they were added."""
+        return list(self._postings.get(category, {}))
+
+    def categories(self) -> Counter:
+        """Return the number of businesses listing each category."""
+        return Counter({category: len(ids) for category, ids in self._postings.items()})
+
+    def matching(self, text: str) -> list[str]:
+        """Return the ids of the businesses listing any category that contains text, in the order they were added.
+
+        A category contains text if the words of text appear in it in order (see contains_words), the same rule
+        the decision tree uses to find a restaurant's cuisine: 'Asian' finds 'Asian Fusion' and 'Pan Asian', but
+        'Thai' does not find 'Thailand'. Each answer is computed once and then reused.
+        """
+        if text not in self._matching:
+            postings = [ids for category, ids in self._postings.items() if contains_words(category, text)]
+            merged = []
+            for business_id in heapq.merge(*postings, key=self._position.__getitem__):
+                if not merged or merged[-1] != business_id:
+                    merged.append(business_id)
+            self._matching[text] = merged
+        return self._matching[text]
+
+    def more_than(self, n: int, candidates: Iterable[str]) -> list[str]:
+        """Return the candidates that match (see matching) more than n businesses, in the order given."""
+        return [c for c in candidates if len(self.matching(c)) > n]
+
+    def co_occurrence(self, category1: str, category2: str) -> int:
+        """Return how many businesses list both category1 and category2.
+
+        This takes time proportional to the shorter of the two posting lists (once the longer one has been
+        turned into a set, which is kept for later queries).
+        """
+        shorter, longer = sorted((category1, category2), key=self.count)
+        longer_ids = self._posting_set(longer)
+        return sum(1 for business_id in self.businesses(shorter) if business_id in longer_ids)
+
+    def _posting_set(self, category: str) -> set[str]:
+        """Return the ids of the businesses listing category, as a set."""
+        if category not in self._sets:
+            self._sets[category] = set(self.businesses(category))
+        return self._sets[category]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["heapq", "re", "collections", "functools"]
+    })
@@ -0,0 +1,207 @@
+"""A compact user-restaurant graph stored in compressed sparse row (CSR) form.
+
+Every vertex is interned to an integer id. The neighbours of all vertices are kept in one array of ids,
+sorted within each vertex, with a second array giving where each vertex's neighbours start. New edges go to a
+small buffer first and are merged into the arrays once the buffer grows past a fraction of the graph.
+
+CSRGraph is only used by benchmarks.py (csr and recommend), to measure the memory and traversal time of
+graphs of millions of synthetic users. The program itself keeps its users in a graph_implement.Graph, since
+applying a delta removes restaurant vertices and notifies the user listeners, neither of which CSRGraph
+supports; recommend_implement works on either graph.
+"""
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from typing import Any
+
+# The code stored in the kind array for each kind of vertex
+KINDS = {'user': 0, 'restaurant': 1}
+_KIND_NAMES = {code: kind for kind, code in KINDS.items()}
+
+# Merge the buffered edges into the arrays once there are more than this many of them...
+MIN_DELTA_EDGES = 1024
+
+# ...and more than this fraction of the edges already in the arrays
+DELTA_FRACTION = 0.125
+
+
+class CSRGraph:
+    """A graph of users and restaurants with integer vertex ids and CSR adjacency arrays.
+
+    This offers the same add_vertex, add_edge, adjacent, get_neighbours and get_all_vertices methods as
+    graph_implement.Graph.
+
+    Representation Invariants:
+        - len(self._items) == len(self._kinds)
+        - len(self._offsets) - 1 <= len(self._items)
+        - self._offsets[-1] == len(self._neighbours)
+    """
+    # Private Instance Attributes:
+    #   - _ids: Maps each item to the id of its vertex.
+    #   - _items: The item of each vertex, indexed by id.
+    #   - _kinds: The KINDS code of each vertex, indexed by id.
+    #   - _offsets:
+    #       The neighbours of vertex v in the arrays are _neighbours[_offsets[v]:_offsets[v + 1]]. Vertices
+    #       added since the arrays were last rebuilt have no entry.
+    #   - _neighbours: The sorted neighbour ids of every vertex, one vertex after another.
+    #   - _delta: Maps vertex ids to the neighbours added since the arrays were last rebuilt.
+    #   - _delta_edges: The number of (directed) edges in _delta.
+    _ids: dict[Any, int]
+    _items: list
+    _kinds: bytearray
+    _offsets: array
+    _neighbours: array
+    _delta: dict[int, set[int]]
+    _delta_edges: int
+
+    def __init__(self) -> None:
+        """Initialize an empty graph (no vertices or edges)."""
+        self._ids = {}
+        self._items = []
+        self._kinds = bytearray()
+        self._offsets = array('q', [0])
+        self._neighbours = array('i')
+        self._delta = {}
+        self._delta_edges = 0
+
+    def add_vertex(self, item: Any, kind: str) -> int:
+        """Add a vertex with the given item and kind to this graph, and return its id.
+
+        Do nothing (except return its id) if the given item is already in this graph.
+
+        Preconditions:
+            - kind in KINDS
+        """
+        if item in self._ids:
+            return self._ids[item]
+        return self.new_vertex(item, kind)
+
+    def new_vertex(self, item: Any, kind: str) -> int:
+        """Add a new vertex with the given item and kind to this graph, and return its id, even if another
+        vertex already has the same item (such as two different people with the same name).
+
+        Methods that take items refer to the first vertex with a given item; the others can only be reached
+        through their ids.
+
+        Preconditions:
+            - kind in KINDS
+        """
+        vertex = len(self._items)
+        self._items.append(item)
+        self._kinds.append(KINDS[kind])
+        self._ids.setdefault(item, vertex)
+        return vertex
+
+    def _id(self, item: Any) -> int:
+        """Return the id of the vertex with the given item.
+
+        Raise a ValueError if item does not appear as a vertex in this graph.
+        """
+        if item not in self._ids:
+            raise ValueError
+        return self._ids[item]
+
+    def _stored_neighbours(self, vertex: int) -> array:
+        """Return the neighbours of vertex that are in the arrays (not in the buffer)."""
+        if vertex + 1 >= len(self._offsets):
+            return array('i')
+        return self._neighbours[self._offsets[vertex]:self._offsets[vertex + 1]]
+
+    def adjacent_ids(self, vertex1: int, vertex2: int) -> bool:
+        """Return whether the vertices with ids vertex1 and vertex2 are adjacent."""
+        if vertex1 + 1 < len(self._offsets):
+            start, end = self._offsets[vertex1], self._offsets[vertex1 + 1]
+            i = bisect_left(self._neighbours, vertex2, start, end)
+            if i < end and self._neighbours[i] == vertex2:
+                return True
+        return vertex2 in self._delta.get(vertex1, ())
+
+    def neighbour_ids(self, vertex: int) -> list[int]:
+        """Return the ids of the neighbours of the vertex with id vertex."""
+        return self._stored_neighbours(vertex).tolist() + list(self._delta.get(vertex, ()))
+
+    def add_edge_ids(self, vertex1: int, vertex2: int) -> None:
+        """Add an edge between the vertices with ids vertex1 and vertex2, if there is not one already.
+
+        Preconditions:
+            - vertex1 != vertex2
+        """
+        if self.adjacent_ids(vertex1, vertex2):
+            return
+        self._delta.setdefault(vertex1, set()).add(vertex2)
+        self._delta.setdefault(vertex2, set()).add(vertex1)
+        self._delta_edges += 2
+        if self._delta_edges > max(MIN_DELTA_EDGES, DELTA_FRACTION * len(self._neighbours)):
+            self.compact()
+
+    def compact(self) -> None:
+        """Merge the buffered edges into the arrays."""
+        offsets = array('q', [0])
+        neighbours = array('i')
+        for vertex in range(len(self._items)):
+            stored = self._stored_neighbours(vertex)
+            if vertex in self._delta:
+                stored = array('i', sorted(stored.tolist() + list(self._delta[vertex])))
+            neighbours.extend(stored)
+            offsets.append(len(neighbours))
+        self._offsets = offsets
+        self._neighbours = neighbours
+        self._delta = {}
+        self._delta_edges = 0
+
+    def add_edge(self, item1: Any, item2: Any) -> None:
+        """Add an edge between the two vertices with the given items in this graph.
+
+        Raise a ValueError if item1 or item2 do not appear as vertices in this graph.
+
+        Preconditions:
+            - item1 != item2
+        """
+        self.add_edge_ids(self._id(item1), self._id(item2))
+
+    def adjacent(self, item1: Any, item2: Any) -> bool:
+        """Return whether item1 and item2 are adjacent vertices in this graph.
+
+        Return False if item1 or item2 do not appear as vertices in this graph.
+        """
+        if item1 in self._ids and item2 in self._ids:
+            return self.adjacent_ids(self._ids[item1], self._ids[item2])
+        else:
+            return False
+
+    def get_neighbours(self, item: Any) -> set:
+        """Return a set of the neighbours of the given item.
+
+        Raise a ValueError if item does not appear as a vertex in this graph.
+        """
+        return {self._items[neighbour] for neighbour in self.neighbour_ids(self._id(item))}
+
+    def get_all_vertices(self, kind: str = '') -> set:
+        """Return a set of all vertex items in this graph.
+
+        If kind != '', only return the items of the given vertex kind.
+
+        Preconditions:
+            - kind == '' or kind in KINDS
+        """
+        if kind != '':
+            code = KINDS[kind]
+            return {item for item, item_code in zip(self._items, self._kinds) if item_code == code}
+        else:
+            return set(self._items)
+
+    def get_kind(self, item: Any) -> str:
+        """Return the kind of the vertex with the given item.
+
+        Raise a ValueError if item does not appear as a vertex in this graph.
+        """
+        return _KIND_NAMES[self._kinds[self._id(item)]]
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["array", "bisect"]
+    })
@@ -0,0 +1,214 @@
+"""The attributes of a restaurant that the decision tree asks about, declared once and compiled into an extractor.
+
+SCHEMA lists, in the order the user is asked about them, each attribute of a restaurant that becomes a level of
+the decision tree: which Yelp field it comes from and how that field's values become the answers offered to
+the user. compile_extractor turns SCHEMA and a cuisine list into a FeatureExtractor, which reads each field of
+a restaurant once and either returns its row or says why it was left out of the tree.
+"""
+from __future__ import annotations
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+from category_implement import split_categories, tokens
+
+
+class Attribute:
+    """One attribute of a restaurant that the decision tree asks about, taken from one of its Yelp attributes.
+
+    Instance Attributes:
+        - name: The name of this attribute.
+        - key: The key of the Yelp attribute this attribute is read from.
+        - labels: Maps each (normalized) value of the Yelp attribute to the answer it gives.
+        - otherwise:
+            The answer given by any other value of the Yelp attribute, or None if restaurants with other values
+            are left out of the tree.
+    """
+    name: str
+    key: str
+    labels: dict[str, str]
+    otherwise: Optional[str]
+
+    def __init__(self, name: str, key: str, labels: dict[str, str], otherwise: Optional[str] = None) -> None:
+        """Initialize an attribute read from the Yelp attribute key."""
+        self.name = name
+        self.key = key
+        self.labels = labels
+        self.otherwise = otherwise
+
+
+# The attributes read from a restaurant's Yelp attributes, in the order they appear in a row. A row starts with
+# the cuisine, and the star rating comes between takeout and alcohol
+SCHEMA = [
+    Attribute('takeout', 'RestaurantsTakeOut', {'True': 'takeout', 'False': 'no takeout'}),
+    Attribute('alcohol', 'Alcohol', {'none': 'no alcohol'}, otherwise='alcohol'),
+    Attribute('wifi', 'WiFi', {'no': 'no wifi'}, otherwise='wifi'),
+    Attribute('credit_card', 'BusinessAcceptsCreditCards', {'True': 'credit card'}, otherwise='no credit card'),
+    Attribute('groups', 'RestaurantsGoodForGroups', {'True': 'groups'}, otherwise='no groups'),
+    Attribute('price', 'RestaurantsPriceRange2', {'1': '$', '2': '$$', '3': '$$$', '4': '$$$$'})
+]
+
+# The name of each attribute of a row, in order (before the business id at the end)
+ROW_ATTRIBUTES = ['cuisine', SCHEMA[0].name, 'stars'] + [attribute.name for attribute in SCHEMA[1:]]
+
+# Restaurants rated at least this many stars are 'high star'
+HIGH_STARS = 3.0
+
+
+def normalize_value(value: str) -> Optional[str]:
+    """Return a Yelp attribute value without the Python string quoting it is often stored with, or None if it
+    is empty.
+
+    A value of 'None' is kept as it is: like any other value without a label of its own, it gives an
+    attribute's otherwise answer (so a restaurant with Alcohol 'None' is one without 'no alcohol').
+
+    >>> normalize_value("u'full_bar'"), normalize_value("'full_bar'"), normalize_value('full_bar')
+    ('full_bar', 'full_bar', 'full_bar')
+    >>> normalize_value('None'), normalize_value("''")
+    ('None', None)
+    """
+    value = value.strip()
+    if value[:2] in ("u'", 'u"'):
+        value = value[1:]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '\'"':
+        value = value[1:-1]
+    return value or None
+
+
+class FeatureExtractor:
+    """SCHEMA compiled for one cuisine list: turns restaurants into decision tree rows.
+
+    A restaurant's cuisine is the first cuisine of the list whose words appear, in order, within one of its
+    categories (see category_implement.contains_words: 'Thai' matches the category 'Thai' but not 'Thailand',
+    and 'American' matches 'American (New)'). Looking this up takes time proportional to the number of words in
+    the restaurant's categories, however many cuisines there are, and the answer for each categories string and
+    each category is cached.
+
+    Instance Attributes:
+        - cuisines: The cuisine list, in order of preference.
+        - schema: The attributes read from each restaurant's Yelp attributes.
+    """
+    cuisines: tuple[str, ...]
+    schema: list[Attribute]
+    # Private Instance Attributes:
+    #   - _cuisines_by_word:
+    #       Maps the first word of each cuisine to the (position in cuisines, words, cuisine) of the cuisines
+    #       starting with it.
+    #   - _by_category:
+    #       A cache mapping each category seen to the (position in cuisines, cuisine) of its first cuisine, or
+    #       None if it has none.
+    #   - _by_categories:
+    #       A cache mapping each categories string seen to its cuisine, or None if it has none.
+    #   - _answers:
+    #       For each attribute of schema, a cache mapping raw Yelp values to the answer they give (None if the
+    #       restaurant is left out of the tree).
+    #   - _reasons: For each attribute of schema, the reason given for leaving out restaurants without it.
+    _cuisines_by_word: dict[str, list[tuple[int, tuple[str, ...], str]]]
+    _by_category: dict[str, Optional[tuple[int, str]]]
+    _by_categories: dict[Optional[str], Optional[str]]
+    _answers: list[dict[str, Optional[str]]]
+    _reasons: list[str]
+
+    def __init__(self, cuisines: Iterable[str], schema: Optional[list[Attribute]] = None) -> None:
+        """Compile schema (SCHEMA by default) for the given cuisine list."""
+        self.cuisines = tuple(cuisines)
+        self.schema = SCHEMA if schema is None else schema
+        self._cuisines_by_word = {}
+        for position, cuisine in enumerate(self.cuisines):
+            words = tokens(cuisine)
+            if words:
+                self._cuisines_by_word.setdefault(words[0], []).append((position, words, cuisine))
+        self._by_category = {}
+        self._by_categories = {}
+        self._answers = [{} for _ in self.schema]
+        self._reasons = [f'missing {attribute.name}' for attribute in self.schema]
+
+    def _category_cuisine(self, category: str) -> Optional[tuple[int, str]]:
+        """Return the (position in cuisines, cuisine) of the first cuisine in category, or None."""
+        if category not in self._by_category:
+            words = tokens(category)
+            found = [(position, cuisine) for i, word in enumerate(words)
+                     for position, cuisine_words, cuisine in self._cuisines_by_word.get(word, ())
+                     if words[i:i + len(cuisine_words)] == cuisine_words]
+            self._by_category[category] = min(found) if found else None
+        return self._by_category[category]
+
+    def cuisine(self, categories: Optional[str]) -> Optional[str]:
+        """Return the first cuisine of the cuisine list in categories (a Yelp categories string), or None."""
+        if categories not in self._by_categories:
+            found = [match for match in map(self._category_cuisine, split_categories(categories))
+                     if match is not None]
+            self._by_categories[categories] = min(found)[1] if found else None
+        return self._by_categories[categories]
+
+    def _answer(self, i: int, raw: str) -> Optional[str]:
+        """Return the answer the raw value of the ith attribute of the schema gives (None if there is none)."""
+        answers = self._answers[i]
+        if raw not in answers:
+            attribute = self.schema[i]
+            value = normalize_value(str(raw))
+            if value is None:
+                answers[raw] = None
+            else:
+                answers[raw] = attribute.labels.get(value, attribute.otherwise)
+        return answers[raw]
+
+    def extract(self, r: Any) -> tuple[Optional[list], Optional[str]]:
+        """Return (row, None) for the decision tree row of restaurant r (its answers in the order the user is
+        asked, then its business id), or (None, reason) if r is left out of the tree.
+        """
+        cuisine = self.cuisine(r.get('categories'))
+        if cuisine is None:
+            return None, 'missing cuisine'
+        attributes = r.get('attributes')
+        if not isinstance(attributes, dict):
+            return None, 'missing attributes'
+        stars = r.get('stars')
+        if stars is None:
+            return None, 'missing stars'
+
+        answers = []
+        for i, attribute in enumerate(self.schema):
+            raw = attributes.get(attribute.key)
+            if raw is None:
+                return None, self._reasons[i]
+            answer = self._answers[i].get(raw) if raw in self._answers[i] else self._answer(i, raw)
+            if answer is None:
+                return None, self._reasons[i]
+            answers.append(answer)
+        return [cuisine, answers[0], 'high star' if stars >= HIGH_STARS else 'low star'] + answers[1:] + \
+            [r['business_id']], None
+
+    def row(self, r: Any) -> Optional[list]:
+        """Return the decision tree row of restaurant r, or None if it is left out of the tree."""
+        return self.extract(r)[0]
+
+    def extract_all(self, restaurants: Iterable[Any]) -> tuple[list[Optional[list]], Counter]:
+        """Return the row of every restaurant (None for those left out), and how many were left out for each
+        reason, in one pass over restaurants.
+        """
+        rows = []
+        dropped = Counter()
+        for r in restaurants:
+            row, reason = self.extract(r)
+            rows.append(row)
+            if reason is not None:
+                dropped[reason] += 1
+        return rows, dropped
+
+
+@lru_cache(maxsize=16)
+def compile_extractor(cuisines: tuple[str, ...]) -> FeatureExtractor:
+    """Return the FeatureExtractor of SCHEMA for the given cuisine list, compiling it only once per list."""
+    return FeatureExtractor(cuisines)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["collections", "functools", "category_implement"]
+    })
@@ -1,15 +1,15 @@
 """Graph time!"""
 from __future__ import annotations
-from typing import Any
-import subprocess
-import folium
-from geopy.distance import geodesic
+from typing import Any, Callable
+import recommend_implement
+from map_implement import MapBuilder
+from spatial_implement import SpatialIndex
 
 
 class _Vertex:
     """A vertex in a restaurant review graph, used to represent a user or a restaurant.
 
-    Each vertex item is either a user or restaurant title. Both are represented as strings,
+    Each vertex item is either a user's name or a restaurant's business id. Both are represented as strings,
     even though we've kept the type annotation as Any to be consistent with lecture.
 
     Instance Attributes:
@@ -41,16 +41,40 @@ class _Vertex:
 
 class Graph:
     """A graph used to represent a restaurant review network.
+
+    Instance Attributes:
+        - version:
+            The number of changes made to this graph so far, so that results computed from it can be told
+            apart from those computed before it changed (see cache_implement).
     """
+    version: int
     # Private Instance Attributes:
     #     - _vertices:
     #         A collection of the vertices contained in this graph.
     #         Maps item to _Vertex object.
+    #     - _restaurant_users:
+    #         Maps the business id of each restaurant loaded by load_restaurant_graph to the names of the
+    #         users who have been there.
+    #     - _user_listeners:
+    #         The functions to call with a user and all of their restaurants whenever user_to_restaurant
+    #         adds restaurants to a user, or remove_vertex removes one of them.
     _vertices: dict[Any, _Vertex]
+    _restaurant_users: dict[str, set[str]]
+    _user_listeners: list[Callable[[str, list], None]]
 
     def __init__(self) -> None:
         """Initialize an empty graph (no vertices or edges)."""
+        self.version = 0
         self._vertices = {}
+        self._restaurant_users = {}
+        self._user_listeners = []
+
+    def add_user_listener(self, listener: Callable[[str, list], None]) -> None:
+        """Call listener(user, restaurants) with the user and all of their restaurants every time
+        user_to_restaurant adds restaurants to a user or remove_vertex removes one of their restaurants (such
+        as MinHashLSH.insert, to keep an index of similar users up to date).
+        """
+        self._user_listeners.append(listener)
 
     def add_vertex(self, item: Any, kind: str) -> None:
         """Add a vertex with the given item and kind to this graph.
@@ -63,6 +87,33 @@ class Graph:
         """
         if item not in self._vertices:
             self._vertices[item] = _Vertex(item, kind)
+            self.version += 1
+
+    def remove_vertex(self, item: Any) -> None:
+        """Remove the vertex with the given item, and all of its edges, from this graph.
+
+        Do nothing if the given item is not in this graph. This takes time proportional to the number of
+        neighbours of the vertex (and, if it is a restaurant and there are user listeners, to the number of
+        restaurants of its users, who are passed to the listeners without it).
+        """
+        v = self._vertices.pop(item, None)
+        if v is None:
+            return
+        for u in v.neighbours:
+            u.neighbours.discard(v)
+        self._restaurant_users.pop(item, None)
+        self.version += 1
+        if v.kind == 'restaurant':
+            for u in v.neighbours:
+                if u.kind == 'user':
+                    self._notify_user_listeners(u)
+
+    def _notify_user_listeners(self, user: _Vertex) -> None:
+        """Call every user listener with user's item and the items of all of their restaurants."""
+        if self._user_listeners:
+            user_restaurants = [v.item for v in user.neighbours if v.kind == 'restaurant']
+            for listener in self._user_listeners:
+                listener(user.item, user_restaurants)
 
     def add_edge(self, item1: Any, item2: Any) -> None:
         """Add an edge between the two vertices with the given items in this graph.
@@ -76,8 +127,10 @@ class Graph:
             v1 = self._vertices[item1]
             v2 = self._vertices[item2]
 
-            v1.neighbours.add(v2)
-            v2.neighbours.add(v1)
+            if v2 not in v1.neighbours:
+                v1.neighbours.add(v2)
+                v2.neighbours.add(v1)
+                self.version += 1
         else:
             raise ValueError
 
@@ -118,57 +171,68 @@ class Graph:
         else:
             return set(self._vertices.keys())
 
+    def get_kind(self, item: Any) -> str:
+        """Return the kind of the vertex with the given item.
+
+        Raise a ValueError if item does not appear as a vertex in this graph.
+        """
+        if item in self._vertices:
+            return self._vertices[item].kind
+        else:
+            raise ValueError
+
     def user_to_restaurant(self, user: str, restaurants: list) -> None:
-        """Takes restaurants given by the decision tree, adds the user to the graph, and creates edges between the
-        user and the recommended restaurants"""
+        """Takes restaurants (business ids) given by the decision tree, adds the user to the graph, and creates edges
+        between the user and the recommended restaurants"""
         self.add_vertex(user, 'user')
         for r in restaurants:
             self.add_vertex(r, 'restaurant')
             self.add_edge(user, r)
 
-    def show_restaurants_connected(self, my_map: folium.Map, r_data: list[dict], category: str) -> None:
-        """Displays each restaurant and its user neighbours on folium."""
-
-        for v in self._vertices:
-            for business in r_data:
-                vertex = self._vertices[v]
-                if 'restaurant' == vertex.kind and business['name'] == vertex.item:
-                    people_list = list(self.get_neighbours(vertex.item))
-                    people_str = ", ".join(people_list)
-                    popup_html = (f"<div style='font-family: trebuchet ms, sans-serif; font-size: "
-                                  f"15px;'><b>Restaurant:</b> {business['name']}<br/>")
-                    popup_html += f"<div style='margin-top: 9px;'><b>Rating:</b> {business['stars']}<br/>"
-                    popup_html += f"<div style='margin-top: 9px;'><b>People:</b> {people_str}<br/>"
-                    popup_iframe = folium.IFrame(width=220, height=110, html=popup_html)
-                    b_location = [business['latitude'], business['longitude']]
-                    make_marker(category, b_location, popup_iframe, my_map)
-
-        my_map.save("map.html")
-        subprocess.run(["open", 'map.html'], check=True)
-
-    def load_restaurant_graph(self, r_data: list[dict], user_data: list[dict]) -> None:
-        """Create an edges between users and corresponding restaurants based on r_data and user_data."""
-        for business in r_data:
-            user_list = give_user(user_data)
-            for user in user_list:
-                if business['name'] in user[1]:
-                    self.add_to_graph((user[0], 'user'), (business['name'], 'restaurant'))
-
-    # the r_data in this method is the entire data of restaurants in Nashville
-    def get_nearby_restaurants(self, user_location: tuple, r_data: list[dict], user_data: list[dict]) -> list[dict]:
-        """Returns the eateries within 1 km of their location."""
-        self.load_restaurant_graph(r_data, user_data)
-        nearby_so_far = []
+        self._notify_user_listeners(self._vertices[user])
+
+    def show_restaurants_connected(self, map_builder: MapBuilder, r_data: list[dict], category: str) -> None:
+        """Adds each restaurant in r_data that is in this graph, and its user neighbours, to map_builder.
+
+        Nothing is drawn until map_builder is saved, so this can be called for every category first."""
         for business in r_data:
-            user_list = give_user(user_data)
-            for user in user_list:
-                b_location = (business['latitude'], business['longitude'])
-                if distance(user_location, b_location) and business['name'] in user[1]:
-                    self.add_to_graph((user[0], 'user'), (business['name'], 'restaurant'))
-                    nearby_so_far.append(business)
-        if len(nearby_so_far) > 5:
-            return nearby_so_far[:5]
-        return nearby_so_far
+            vertex = self._vertices.get(business['business_id'])
+            if vertex is not None and 'restaurant' == vertex.kind:
+                map_builder.add(business, category, self.get_neighbours(vertex.item))
+
+    def load_restaurant_graph(self, r_index: dict[str, dict], user_data: list[dict]) -> None:
+        """Create an edges between users and corresponding restaurants based on r_index and user_data.
+
+        r_index maps business ids to restaurants (see RestaurantCatalogue.by_id); restaurants of users that
+        are not in it are ignored. This makes one pass over user_data, recording who has been to each
+        restaurant as it goes, and only adds the edges that are not already in the graph, so loading the
+        same users again does nothing and loading new users only adds theirs.
+        """
+        for user in user_data:
+            for user_name, restaurants in user.items():
+                self._load_user_restaurants(r_index, user_name, restaurants)
+
+    def _load_user_restaurants(self, r_index: dict[str, dict], user_name: str, restaurants: list) -> None:
+        """Create the edges between user_name and those of restaurants that are in r_index, recording that they
+        have been there (see load_restaurant_graph).
+        """
+        for restaurant in restaurants:
+            if restaurant not in r_index:
+                continue
+            users = self._restaurant_users.setdefault(restaurant, set())
+            if user_name not in users:
+                users.add(user_name)
+                self.version += 1
+                self.add_to_graph((user_name, 'user'), (restaurant, 'restaurant'))
+
+    # the spatial_index in this method holds the entire data of restaurants in Nashville
+    def get_nearby_restaurants(self, user_location: tuple, spatial_index: SpatialIndex,
+                               radius_km: float = 1.0, k: int = 5) -> list[dict]:
+        """Returns the k eateries nearest to user_location, within radius_km of it, that the users loaded by
+        load_restaurant_graph have been to, nearest first."""
+        nearby = spatial_index.nearest(user_location, k, radius_km,
+                                       where=lambda business: business['business_id'] in self._restaurant_users)
+        return [business for _, business in nearby]
 
     def add_to_graph(self, u: tuple, r: tuple) -> None:
         """Create user and restaurant vertices and add edges between them."""
@@ -177,62 +241,50 @@ class Graph:
         self.add_edge(u[0], r[0])
 
     def make_friend(self, user: str, friend: str) -> None:
-        """Create an edge between user and friend."""
-        self.add_edge(user, friend)
-
-    def get_friend_restaurants(self, friend: str, r_data: list[dict]) -> list[dict]:
-        """Return information on all restaurants friend is connected to."""
-        restaurants_so_far = []
-        all_neigh = list(self.get_neighbours(friend))
-        r_neigh = [neigh for neigh in all_neigh if self._vertices[neigh].kind == 'restaurant']
-        for business in r_data:
-            for restaurant in r_neigh:
-                if business['name'] == restaurant:
-                    restaurants_so_far.append(business)
-        return restaurants_so_far
+        """Create an edge between user and friend.
 
+        Raise a ValueError if user and friend are the same, or either of them is not in this graph.
+        """
+        if user == friend:
+            raise ValueError(f'{user} cannot be their own friend')
+        self.add_edge(user, friend)
 
-def distance(user_location: tuple, b_location: tuple) -> bool:
-    """Returns whether the distance between user_location and b_location is less than 1km."""
-    distance_between = geodesic(user_location, b_location).kilometers
-    return distance_between <= 1
+    def get_friend_restaurants(self, friend: str, r_index: dict[str, dict]) -> list[dict]:
+        """Return information on all restaurants friend is connected to.
 
+        r_index maps business ids to restaurants (see RestaurantCatalogue.by_id).
+        """
+        all_neigh = self.get_neighbours(friend)
+        r_neigh = [neigh for neigh in all_neigh if self._vertices[neigh].kind == 'restaurant']
+        return [r_index[restaurant] for restaurant in r_neigh if restaurant in r_index]
 
-def make_marker(category: str, b_location: list, popup_iframe: folium.IFrame, my_map: folium.Map) -> None:
-    """Make a marker on the folium map based on type, color, and b_location."""
-    if category == 'friend':
-        color = 'red'
-    elif category == 'decision_tree':
-        color = 'orange'
-    else:
-        color = 'blue'
+    def get_recommended_restaurants(self, user: str, r_index: dict[str, dict], k: int = 10) -> list[dict]:
+        """Return information on the k restaurants recommended to user through the people who go to the same
+        restaurants (and their friends), best first.
 
-    folium.Marker(b_location, popup=folium.Popup(popup_iframe),
-                  icon=folium.Icon(color=color, icon='glyphicon glyphicon-cutlery')).add_to(my_map)
+        The restaurants are ranked with recommend_implement.recommend_restaurants. r_index maps business ids to
+        restaurants (see RestaurantCatalogue.by_id).
+        """
+        recommended = recommend_implement.recommend_restaurants(self, user, k)
+        return [r_index[restaurant] for restaurant, _ in recommended if restaurant in r_index]
 
 
-def give_user(user_data: list[dict]) -> list[tuple[str, list]]:
-    """Return user_data in a list with tuples."""
-    lst_so_far = []
-    for user in user_data:
-        for user_name in user:
-            lst_so_far.append((user_name, user[user_name]))
-    return lst_so_far
+# The latitude and longitude of each area of Nashville the user can choose
+NASHVILLE_AREAS = {
+    "Downtown": (36.1627, -86.7816),
+    "East Nashville": (36.1771, -86.7538),
+    "The Gulch": (36.1525, -86.7889),
+    "Germantown": (36.1771, -86.7907),
+    "12 South": (36.1230, -86.7909),
+    "Green Hills": (36.1069, -86.8190),
+    "Belmont-Hillsboro": (36.1314, -86.7996),
+    "Joelton": (36.3239, -86.8689)
+}
 
 
 def get_lat_lon(location: str) -> tuple[float, float]:
     """Return the latitude and longitude based on the location."""
-    locations = {
-        "Downtown": (36.1627, -86.7816),
-        "East Nashville": (36.1771, -86.7538),
-        "The Gulch": (36.1525, -86.7889),
-        "Germantown": (36.1771, -86.7907),
-        "12 South": (36.1230, -86.7909),
-        "Green Hills": (36.1069, -86.8190),
-        "Belmont-Hillsboro": (36.1314, -86.7996),
-        "Joelton": (36.3239, -86.8689)
-    }
-    return locations[location]
+    return NASHVILLE_AREAS[location]
 
 
 if __name__ == '__main__':
@@ -240,5 +292,5 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 237,
-        'extra-imports': ["geopy.distance", "folium", "subprocess"]
+        'extra-imports': ["recommend_implement", "map_implement", "spatial_implement"]
     })
@@ -0,0 +1,205 @@
+"""An index of decision tree rows by the value at each level, for matching user input containing wildcards."""
+from __future__ import annotations
+import functools
+import heapq
+import operator
+from typing import Any, Iterator, Optional
+
+# Matches any value of an attribute ("doesn't matter")
+ANY = '*'
+
+# The index is compacted once more than this many of its rows, and more than half of them, have been removed
+MIN_COMPACT_ROWS = 64
+
+# The positions of the bits set in each byte, lowest first
+_BYTE_BITS = [tuple(i for i in range(8) if byte >> i & 1) for byte in range(256)]
+
+
+class AttributeIndex:
+    """The rows of a decision tree, with a bitset of the rows having each value of each attribute.
+
+    A bitset is a Python int whose bit i is set when row i (in insertion order) has the value, so a
+    query is answered by and-ing together the bitsets of the attributes that are not wildcards.
+
+    Instance Attributes:
+        - num_attributes: The number of attributes in a row (before the restaurant at the end).
+
+    Representation Invariants:
+        - len(self._bits) == self.num_attributes
+        - all(row is None or len(row) == self.num_attributes + 1 for row in self._rows)
+        - all(self._rows[i][-1] == restaurant for restaurant, i in self._positions.items())
+    """
+    num_attributes: int
+    # Private Instance Attributes:
+    #   - _rows: Every row added, in the order it was added (None for the rows that have been removed).
+    #   - _bits: For each attribute, maps each of its values to the bitset of the rows having it.
+    #   - _all: The bitset of every row that has not been removed.
+    #   - _positions: Maps the restaurant of each row that has not been removed to its position in _rows.
+    _rows: list[Optional[list]]
+    _bits: list[dict[Any, int]]
+    _all: int
+    _positions: dict[Any, int]
+
+    def __init__(self, num_attributes: int) -> None:
+        """Initialize an empty index of rows with num_attributes attributes."""
+        self.num_attributes = num_attributes
+        self._rows = []
+        self._bits = [{} for _ in range(num_attributes)]
+        self._all = 0
+        self._positions = {}
+
+    def __len__(self) -> int:
+        """Return the number of rows in this index."""
+        return len(self._positions)
+
+    def add(self, row: list) -> None:
+        """Add row to this index, replacing the row of the same restaurant if there is one.
+
+        Rows with a different number of attributes (such as those of restaurants without any attributes,
+        which make_row shortens) are ignored.
+        """
+        if len(row) != self.num_attributes + 1:
+            return
+        self.remove(row[-1])
+        self._positions[row[-1]] = len(self._rows)
+        bit = 1 << len(self._rows)
+        self._rows.append(row)
+        self._all |= bit
+        for values, value in zip(self._bits, row):
+            values[value] = values.get(value, 0) | bit
+
+    def remove(self, restaurant: Any) -> None:
+        """Remove the row of restaurant from this index, if it has one.
+
+        The row's place in the bitsets is left empty until more than half of the rows (and more than
+        MIN_COMPACT_ROWS of them) have been removed, when the remaining rows are moved to the front, in the same
+        order. So the bitsets stay within twice the size of the index, and bitsets returned before a removal
+        must not be used after it.
+        """
+        position = self._positions.pop(restaurant, None)
+        if position is None:
+            return
+        row = self._rows[position]
+        if row is None:
+            return
+        bit = 1 << position
+        self._all &= ~bit
+        for values, value in zip(self._bits, row):
+            values[value] &= ~bit
+            if not values[value]:
+                del values[value]
+        self._rows[position] = None
+        removed = len(self._rows) - len(self._positions)
+        if removed > MIN_COMPACT_ROWS and removed * 2 > len(self._rows):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rebuild the bitsets from the rows that have not been removed, in the order they were added."""
+        live = [row for row in self._rows if row is not None]
+        self._rows = []
+        self._bits = [{} for _ in range(self.num_attributes)]
+        self._all = 0
+        self._positions = {}
+        for kept in live:
+            self.add(kept)
+
+    def matching_bits(self, user_input: list) -> int:
+        """Return the bitset of the rows matching user_input, where ANY matches every value.
+
+        Attributes missing from the end of user_input also match every value.
+        """
+        bits = self._all
+        for values, value in zip(self._bits, user_input):
+            if value != ANY:
+                bits &= values.get(value, 0)
+                if not bits:
+                    return 0
+        return bits
+
+    def rows(self, bits: int) -> Iterator[list]:
+        """Yield the rows in bits, in the order they were added.
+
+        The bitset is read a byte at a time, since clearing its bits one by one would copy the whole int for
+        every row.
+        """
+        for offset, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+            if byte:
+                for i in _BYTE_BITS[byte]:
+                    yield self._rows[offset * 8 + i]
+
+    def restaurants(self, bits: int) -> list:
+        """Return the distinct restaurants of the rows in bits, in insertion order."""
+        return list(dict.fromkeys(row[-1] for row in self.rows(bits)))
+
+    def match(self, user_input: list, limit: Optional[int] = 10) -> list:
+        """Return (up to limit of, or all if limit is None) the distinct restaurants whose rows match user_input,
+        in insertion order.
+        """
+        if limit is None:
+            return self.restaurants(self.matching_bits(user_input))
+        restaurants = {}
+        for row in self.rows(self.matching_bits(user_input)):
+            if len(restaurants) >= limit:
+                break
+            restaurants[row[-1]] = None
+        return list(restaurants)
+
+    def relaxations(self, user_input: list,
+                    weights: Optional[list[float]] = None) -> Iterator[tuple[float, tuple[int, ...], int]]:
+        """Yield (cost, relaxed, bits) for the cheapest ways of relaxing user_input, cheapest first.
+
+        relaxed holds the positions of the attributes of user_input that are treated as ANY, cost is the sum of
+        their weights (1 each if weights is None), and bits is the bitset of the rows that match once they are
+        relaxed but that no cheaper relaxation matched. Exact matches, if any, come first, with relaxed == ().
+        Among relaxations of the same cost, those of the attributes asked about last come first, so that with
+        equal weights the cuisine (asked about first) is the last thing given up.
+
+        This is a best-first search over the sets of specified attributes. A set is only ever extended with
+        attributes after its last one, so each set is visited at most once, and a set is not extended at all
+        if even relaxing every attribute after its last one would match no new rows. Attributes whose value
+        never occurs are relaxed from the start, since nothing matches without relaxing them.
+
+        Preconditions:
+            - weights is None or all(weight > 0 for weight in weights)
+        """
+        if weights is None:
+            weights = [1.0] * self.num_attributes
+        columns = [(i, values.get(value, 0)) for i, (values, value) in enumerate(zip(self._bits, user_input))
+                   if value != ANY]
+        costs = [weights[attribute] for attribute, _ in columns]
+        forced = tuple(position for position, (_, column) in enumerate(columns) if not column)
+        free = [position for position in range(len(columns)) if position not in forced]
+        seen = 0
+        # each entry is (cost, order, relaxed, last), where order (relaxed negated, from last to first) breaks ties
+        heap = [(sum(costs[position] for position in forced), (), (), -1)]
+        while heap and seen != self._all:
+            entry = heapq.heappop(heap)
+            cost, _, relaxed, last = entry
+            bits = functools.reduce(operator.and_, (columns[kept][1] for kept in free if kept not in relaxed),
+                                    self._all) & ~seen
+            if bits:
+                seen |= bits
+                yield cost, tuple(sorted(columns[given_up][0] for given_up in relaxed + forced)), bits
+            # the rows any extension of relaxed could match: those matching every attribute up to last
+            bound = functools.reduce(operator.and_, (columns[kept][1] for kept in free
+                                                     if kept <= last and kept not in relaxed), self._all)
+            if bound & ~seen:
+                _push_relaxations(heap, entry, [later for later in free if later > last], costs)
+
+
+def _push_relaxations(heap: list[tuple], entry: tuple, positions: list[int], costs: list[float]) -> None:
+    """Push onto heap, for each of positions, the entry of relaxing that column as well as those relaxed in entry
+    (see AttributeIndex.relaxations), where costs[position] is the cost of relaxing each column.
+    """
+    cost, order, relaxed, _ = entry
+    for position in positions:
+        heapq.heappush(heap, (cost + costs[position], (-position,) + order, relaxed + (position,), position))
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["functools", "heapq", "operator"]
+    })
@@ -0,0 +1,113 @@
+"""Reading the restaurants out of the Yelp dump on several cores at once.
+
+The decompressed dump is cut into chunks of whole lines, which are decoded and filtered by a pool of worker
+processes. Workers send back only the restaurants that pass the filter, and only the fields the program uses,
+so little more than the filtered data ever travels back to the parent process. If orjson is installed, it is
+used to decode the lines; otherwise the standard json module is.
+
+Decoding in worker processes is opt-in (see load_restaurants): under the spawn start method each worker
+re-imports the main module, so only programs whose top-level code is guarded by if __name__ == '__main__' may
+ask for more than one worker.
+"""
+from __future__ import annotations
+import importlib
+import json
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Iterator, Optional
+
+import tree_implement
+
+# The fields of each business kept by the workers (everything else in the dump is dropped)
+FIELDS = ['business_id', 'name', 'categories', 'city', 'state', 'latitude', 'longitude', 'stars',
+          'review_count', 'is_open', 'attributes']
+
+# The size of each chunk of the decompressed dump handed to a worker, in bytes
+CHUNK_BYTES = 4 << 20
+
+
+@lru_cache(maxsize=1)
+def _parser() -> Callable[[bytes], Any]:
+    """Return orjson.loads if orjson is installed, and json.loads otherwise."""
+    try:
+        return importlib.import_module('orjson').loads
+    except ImportError:
+        return json.loads
+
+
+def loads(line: bytes) -> Any:
+    """Return the JSON value encoded in line, decoded with orjson if it is installed."""
+    return _parser()(line)
+
+
+def read_chunks(zip_path: str, json_file_name: str, chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """Yield json_file_name, decompressed from the zip at zip_path, in chunks of about chunk_bytes that each
+    end at the end of a line.
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        with zip_ref.open(json_file_name) as f:
+            rest = b''
+            for block in iter(lambda: f.read(chunk_bytes), b''):
+                block = rest + block
+                end = block.rfind(b'\n') + 1
+                if end == 0:
+                    rest = block
+                else:
+                    rest = block[end:]
+                    yield block[:end]
+            if rest:
+                yield rest
+
+
+def parse_chunk(chunk: bytes, keep: Callable[[dict], bool] = tree_implement.is_nashville_restaurant) -> list[dict]:
+    """Return the businesses on the lines of chunk for which keep is True, with only their FIELDS."""
+    businesses = []
+    for line in chunk.splitlines():
+        if line.strip():
+            d = loads(line)
+            if keep(d):
+                businesses.append({field: d.get(field) for field in FIELDS})
+    return businesses
+
+
+def load_restaurants(zip_path: str, json_file_name: str, workers: Optional[int] = 1,
+                     keep: Callable[[dict], bool] = tree_implement.is_nashville_restaurant,
+                     chunk_bytes: int = CHUNK_BYTES) -> list[dict]:
+    """Return the businesses in the zipped dataset for which keep is True (the Nashville restaurants by default),
+    in the order they appear in it, decoding the chunks of the dump in the given number of worker processes
+    (in this process by default, or one per CPU if workers is None).
+
+    Only ask for more than one worker from a program whose main module guards its top-level code with
+    if __name__ == '__main__' (such as benchmarks.py or batch.py), since each worker may import it again.
+
+    keep must be a function defined at the top level of a module, so that it can be sent to the workers. At
+    most two chunks per worker are read ahead of the results, so memory use does not grow with the dump.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return [d for block in read_chunks(zip_path, json_file_name, chunk_bytes) for d in parse_chunk(block, keep)]
+
+    restaurants = []
+    pending: deque[Future] = deque()
+    with ProcessPoolExecutor(workers) as executor:
+        for chunk in read_chunks(zip_path, json_file_name, chunk_bytes):
+            pending.append(executor.submit(parse_chunk, chunk, keep))
+            if len(pending) >= 2 * workers:
+                restaurants.extend(pending.popleft().result())
+        while pending:
+            restaurants.extend(pending.popleft().result())
+    return restaurants
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["json", "os", "zipfile", "collections", "concurrent.futures", "functools", "importlib",
+                          "orjson", "tree_implement"]
+    })
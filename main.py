@@ -1,77 +1,56 @@
 """The main file to run!"""
 
-import graph_implement
-import tree_implement
-import folium
-import name_implement
+import pipeline_implement
 import user_input
 
-all_user_data = user_input.display_user_input()
-
-# all_r_data reads data and stores it as a list
-all_r_data = tree_implement.unzip_data('yelp_academic_dataset_business.json.zip', 'yelp_academic_dataset_business.json')
-
-# filter data to only include restaurants in Nashville
-r_data = tree_implement.filter_businesses_nashville(all_r_data)
-
-# create a list of all cuisines present in the restaurant data
-list_of_cuisines = tree_implement.filter_cuisine(r_data, 'cuisines.txt')
-
-# create the decision tree
-decision_tree = tree_implement.make_tree(r_data, list_of_cuisines)
-
-# generating a list of restaurants based on the user's specifications
-recommended_restaurants = decision_tree.match_user_restaurant(all_user_data[1])
-
-# generate a dummy data for the users who have used the program
-user_data = name_implement.generate_users(30, 5)
-
-# create a map on folium centered at Nashville
-map = folium.Map(location=[36.1627, -86.7816], zoom_start=12)
-
-# get the latitude and longitude of the location entered by the user
-# here, location is the location that the user chose
-user_location = graph_implement.get_lat_lon(all_user_data[0])
-
-# create a graph
-g = graph_implement.Graph()
-
-# add the vertices and edges based on the dummy data (user_data)
-g.load_restaurant_graph(r_data, user_data)
-
-# get the restaurants that are close to the user
-nearby_r_data = g.get_nearby_restaurants(user_location, r_data, user_data)
-
-# get the data for the all the restaurants in recommended_restaurants
-rr_data = tree_implement.recommended_to_dict(recommended_restaurants, r_data)
-
-# show restaurants from the decision tree
-g.show_restaurants_connected(map, rr_data, 'decision_tree')
-
-# show restaurants closeby to the user in folium
-g.show_restaurants_connected(map, nearby_r_data, 'nearby')
-
-friending_data = user_input.display_makefriends()
-
-# get user's and friend's names
-user = friending_data[0]
-friend = friending_data[1]
-
-# adding the user to the graph network
-g.user_to_restaurant(user, recommended_restaurants)
-
-# create an edge between the user and friend so that they become neighbours
-g.make_friend(user, friend)
-
-# get data for all the restaurants that the friend is adjacent to
-f_restaurants = g.get_friend_restaurants(friend, r_data)
-
-# show the restaurants from the decision tree, nearby to the user, and recommended by friend if there are overalaps
-# between friend and the other two categories, then the marker will be shown as recommended by friend
-g.show_restaurants_connected(map, f_restaurants, 'friend')
-
-
-
-
-
-
+if __name__ == '__main__':
+    # start loading the restaurants in Nashville, the decision tree and the graph of dummy users in the background,
+    # so they are (mostly) ready by the time the user has entered their preferences. The restaurants come from the
+    # snapshot, which is built from the Yelp zip the first time (and whenever the zip or cuisines.txt changes)
+    pipeline = pipeline_implement.StartupPipeline(zip_file='yelp_academic_dataset_business.json.zip',
+                                                  json_file='yelp_academic_dataset_business.json',
+                                                  cuisine_file='cuisines.txt', user_amount=30,
+                                                  max_restaurants_per_user=5)
+
+    all_user_data = user_input.display_user_input()
+
+    # wait for whatever is left of the loading; the service holds the catalogue of restaurants, the decision tree
+    # and the graph of the dummy users and the restaurants they have been to. The graph is only changed through
+    # the service, whose lock keeps it consistent while the map is being drawn in the background
+    service = pipeline.service()
+
+    # generating a list of the best 10 restaurants based on the user's specifications (ranked by stars, reviews and
+    # distance from the user's chosen location), and a map (centered at Nashville) of them and of the restaurants
+    # closeby to the user's chosen location. If no restaurant matches every specification, the ones that need the
+    # fewest of them relaxed are recommended instead
+    recommended_restaurants, map_builder, relaxed = pipeline.recommend(all_user_data[0], all_user_data[1], limit=10)
+    relaxed_attributes = sorted({attribute for attributes in relaxed.values() for attribute in attributes})
+    if relaxed_attributes:
+        print('No restaurant matches all of your preferences, so these preferences were relaxed:',
+              ', '.join(relaxed_attributes))
+
+    # draw, save and open the map in the background while the user is making a friend
+    first_map = pipeline.save_map(map_builder, 'map.html', open_browser=True)
+
+    friending_data = user_input.display_makefriends()
+    first_map.result()
+
+    # get user's and friend's names
+    user = friending_data[0]
+    friend = friending_data[1]
+
+    # adding the user to the graph network, and creating an edge between the user and friend so that they become
+    # neighbours, then getting data for all the restaurants that the friend is adjacent to
+    try:
+        service.make_friend(user, friend, recommended_restaurants)
+        f_restaurants = service.friend_restaurants(friend)
+    except ValueError as error:
+        print(f'{friend} could not be made your friend: {error}')
+        service.add_user(user, recommended_restaurants)
+        f_restaurants = []
+
+    # show the restaurants from the decision tree, nearby to the user, and recommended by friend if there are overalaps
+    # between friend and the other two categories, then the marker will be shown as recommended by friend
+    service.add_to_map(map_builder, f_restaurants, 'friend')
+    pipeline.save_map(map_builder, 'map.html', open_browser=True)
+    pipeline.close()
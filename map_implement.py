@@ -0,0 +1,116 @@
+"""Building the folium map of restaurants, rendered and saved once after everything has been added to it.
+
+The restaurants of each category are kept as one GeoJSON feature collection, drawn as a toggleable layer whose
+markers are clustered where they are dense, with the popup filled in from each feature's properties (instead
+of one HTML iframe per marker).
+"""
+from __future__ import annotations
+import webbrowser
+from pathlib import Path
+from typing import Iterable
+
+import folium
+from folium.plugins import MarkerCluster
+
+# The marker colour of each category of restaurant
+CATEGORY_COLOURS = {'decision_tree': 'orange', 'nearby': 'blue', 'friend': 'red'}
+
+# The name of each category's layer in the layer control
+CATEGORY_NAMES = {'decision_tree': 'Matches your preferences', 'nearby': 'Near you',
+                  'friend': "Your friend's restaurants"}
+
+# A restaurant added in more than one category is only shown in the one that comes first here
+PRECEDENCE = ('friend', 'decision_tree', 'nearby')
+
+# The fields of each feature shown in its popup, and their labels
+POPUP_FIELDS = ['name', 'stars', 'people']
+POPUP_ALIASES = ['Restaurant:', 'Rating:', 'People:']
+
+
+class MapBuilder:
+    """A map of restaurants in categories, collected before the map is rendered.
+
+    Instance Attributes:
+        - location: The (latitude, longitude) the map is centred at.
+        - zoom_start: The initial zoom level of the map.
+
+    Representation Invariants:
+        - all(category in CATEGORY_COLOURS for category, _ in self._features.values())
+    """
+    location: tuple[float, float]
+    zoom_start: int
+    # Private Instance Attributes:
+    #   - _features:
+    #       Maps the business id of each restaurant on the map to its category and its GeoJSON feature.
+    _features: dict[str, tuple[str, dict]]
+
+    def __init__(self, location: tuple[float, float] = (36.1627, -86.7816), zoom_start: int = 12) -> None:
+        """Initialize an empty map centred at location (Nashville by default)."""
+        self.location = location
+        self.zoom_start = zoom_start
+        self._features = {}
+
+    def add(self, business: dict, category: str, people: Iterable[str] = ()) -> None:
+        """Add business to the map in category, with the people who have been there.
+
+        If business is already on the map, it stays in whichever category comes first in PRECEDENCE, and its
+        people are updated.
+
+        Preconditions:
+            - category in CATEGORY_COLOURS
+        """
+        business_id = business['business_id']
+        if business_id in self._features:
+            old_category, _ = self._features[business_id]
+            if PRECEDENCE.index(old_category) < PRECEDENCE.index(category):
+                category = old_category
+        feature = {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [business['longitude'], business['latitude']]},
+            'properties': {'name': business['name'], 'stars': business['stars'],
+                           'people': ', '.join(sorted(people))}
+        }
+        self._features[business_id] = (category, feature)
+
+    def feature_collection(self, category: str) -> dict:
+        """Return the GeoJSON feature collection of the restaurants shown in category."""
+        return {'type': 'FeatureCollection',
+                'features': [feature for c, feature in self._features.values() if c == category]}
+
+    def render(self) -> folium.Map:
+        """Return a folium map with one clustered layer for each category that has restaurants in it."""
+        my_map = folium.Map(location=list(self.location), zoom_start=self.zoom_start)
+        for category, colour in CATEGORY_COLOURS.items():
+            collection = self.feature_collection(category)
+            if not collection['features']:
+                continue
+            layer = folium.FeatureGroup(name=CATEGORY_NAMES[category]).add_to(my_map)
+            cluster = MarkerCluster().add_to(layer)
+            folium.GeoJson(
+                collection,
+                marker=folium.Marker(icon=folium.Icon(color=colour, icon='glyphicon glyphicon-cutlery')),
+                popup=folium.GeoJsonPopup(fields=POPUP_FIELDS, aliases=POPUP_ALIASES)
+            ).add_to(cluster)
+        folium.LayerControl().add_to(my_map)
+        return my_map
+
+    def save(self, path: str = 'map.html', open_browser: bool = False) -> str:
+        """Render the map, write it to path, and open it in a web browser if open_browser is True.
+
+        Return the file URI of the map.
+        """
+        self.render().save(path)
+        uri = Path(path).resolve().as_uri()
+        if open_browser:
+            webbrowser.open(uri)
+        return uri
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["webbrowser", "pathlib", "folium", "folium.plugins"],
+        'allowed-io': ['MapBuilder.save']
+    })
@@ -0,0 +1,110 @@
+"""A packed-bit attribute matrix of the restaurants, for matching many preference vectors in one call.
+
+Each (attribute, value) pair is a column of the matrix: a row of bits, one per restaurant, packed eight to a
+byte with NumPy. Matching a batch of preference vectors gathers the columns each vector asks for and and-s
+them together with one vectorized reduction, instead of walking the decision tree once per vector.
+"""
+from __future__ import annotations
+from typing import Any, Optional
+
+import numpy as np
+
+from index_implement import ANY
+
+# How many preference vectors to match at once (bounds the memory of the gathered columns)
+BATCH_SIZE = 1024
+
+
+class AttributeMatrix:
+    """The decision tree rows of the restaurants, as packed-bit columns of (attribute, value) pairs.
+
+    Instance Attributes:
+        - restaurants: The restaurant at the end of each row, in the order the rows were given.
+        - num_attributes: The number of attributes in a row.
+
+    Representation Invariants:
+        - self._bits.shape == (len(self._columns) + 2, (len(self.restaurants) + 7) // 8)
+    """
+    restaurants: list
+    num_attributes: int
+    # Private Instance Attributes:
+    #   - _columns:
+    #       Maps each (attribute position, value) pair to its row in _bits.
+    #   - _bits:
+    #       The packed columns. The last two rows are the column of no restaurants (for values that never
+    #       occur) and the column of every restaurant (for ANY).
+    #   - _distinct:
+    #       The distinct restaurants, in the order they first appear (the same restaurant may end several rows).
+    #   - _restaurant_codes:
+    #       The position in _distinct of the restaurant of each row.
+    _columns: dict[tuple[int, Any], int]
+    _bits: np.ndarray
+    _distinct: list
+    _restaurant_codes: np.ndarray
+
+    def __init__(self, rows: list[list], num_attributes: int = 8) -> None:
+        """Initialize the matrix of rows, which are make_row rows with num_attributes attributes.
+
+        Rows of any other length are ignored, as in AttributeIndex.
+        """
+        rows = [given for given in rows if len(given) == num_attributes + 1]
+        self.restaurants = [kept[-1] for kept in rows]
+        self._distinct = list(dict.fromkeys(self.restaurants))
+        code_of = {restaurant: code for code, restaurant in enumerate(self._distinct)}
+        self._restaurant_codes = np.array([code_of[r] for r in self.restaurants], dtype=np.int64)
+        self.num_attributes = num_attributes
+        self._columns = {}
+        codes = np.empty((len(rows), num_attributes), dtype=np.int32)
+        for i, row in enumerate(rows):
+            for attribute in range(num_attributes):
+                codes[i, attribute] = self._columns.setdefault((attribute, row[attribute]), len(self._columns))
+
+        dense = np.zeros((len(self._columns) + 2, len(rows)), dtype=bool)
+        for attribute in range(num_attributes):
+            dense[codes[:, attribute], np.arange(len(rows))] = True
+        dense[-1, :] = True
+        self._bits = np.packbits(dense, axis=1)
+
+    def _column_ids(self, preferences: list[list]) -> np.ndarray:
+        """Return, for each preference vector, the rows of _bits for each of its attributes."""
+        none_column = len(self._columns)
+        every_column = none_column + 1
+        ids = np.full((len(preferences), self.num_attributes), every_column, dtype=np.int32)
+        for i, preference in enumerate(preferences):
+            for attribute, value in enumerate(preference[:self.num_attributes]):
+                if value != ANY:
+                    ids[i, attribute] = self._columns.get((attribute, value), none_column)
+        return ids
+
+    def match_bits(self, preferences: list[list]) -> np.ndarray:
+        """Return a boolean array whose entry [i, j] is whether restaurant j matches preference vector i."""
+        ids = self._column_ids(preferences)
+        result = np.empty((len(preferences), len(self.restaurants)), dtype=bool)
+        for start in range(0, len(preferences), BATCH_SIZE):
+            packed = np.bitwise_and.reduce(self._bits[ids[start:start + BATCH_SIZE]], axis=1)
+            result[start:start + BATCH_SIZE] = np.unpackbits(packed, axis=1, count=len(self.restaurants)).view(bool)
+        return result
+
+    def match_many(self, preferences: list[list], limit: Optional[int] = None) -> list[list]:
+        """Return, for each preference vector, the distinct restaurants matching it in row order (up to limit).
+
+        A preference vector is a list of attribute values like the one display_user_input returns, where
+        ANY matches every value.
+        """
+        matches = []
+        for start in range(0, len(preferences), BATCH_SIZE):
+            for row in self.match_bits(preferences[start:start + BATCH_SIZE]):
+                codes = self._restaurant_codes[np.flatnonzero(row)]
+                _, first = np.unique(codes, return_index=True)
+                first.sort()
+                matches.append([self._distinct[code] for code in codes[first[:limit]].tolist()])
+        return matches
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["numpy", "index_implement"]
+    })
@@ -4,7 +4,7 @@ import csv
 import io
 import random
 from python_ta.contracts import check_contracts
-import tree_implement
+import catalogue_implement
 
 
 def read_names_from_csv(filename: str) -> list:
@@ -42,29 +42,32 @@ def generate_dummy_data(num_records: int) -> list:
 
 
 @check_contracts
-def restaurant_finder(cuisine: str) -> list:
+def restaurant_finder(
+        cuisine: str, catalogue: catalogue_implement.RestaurantCatalogue
+) -> list:
     """
      Find restaurants that serve the specified cuisine.
 
     Parameters:
         cuisine (str): The cuisine to search for.
+        catalogue (RestaurantCatalogue): The restaurants to search, loaded once
+            by the caller.
 
     Returns:
-        list: A list of names of restaurants serving the specified cuisine.
+        list: The business ids of the restaurants serving the specified
+            cuisine, in dataset order.
     """
-    yelp_zip = 'yelp_academic_dataset_business.json.zip'
-    yelp_json = 'yelp_academic_dataset_business.json'
-    all_r_data = tree_implement.unzip_data(yelp_zip, yelp_json)
-    r_data = tree_implement.filter_businesses_nashville(all_r_data)
-    r_w_c = [yelp["name"] for yelp in r_data if cuisine in yelp["categories"]]
-
-    return r_w_c
+    return [yelp["business_id"] for yelp in catalogue.restaurants_with(cuisine)]
 
 
 @check_contracts
-def generate_users(user_amount: int, max_restaurants_per_user: int) -> list:
+def generate_users(user_amount: int, max_restaurants_per_user: int,
+                   catalogue: catalogue_implement.RestaurantCatalogue) -> list:
     """
-    Generate dummy users with limited restaurants.
+    Generate dummy users with limited restaurants, chosen from catalogue.
+
+    Each user is a dictionary mapping their name to the business ids of their
+    restaurants.
     """
     cuisine1 = ['Mexican', 'Southern', 'American', 'Italian', 'Seafood']
     cuisine2 = ['Mediterranean', 'Asian', 'Japanese', 'Tex-Mex', 'Fusion']
@@ -76,14 +79,13 @@ def generate_users(user_amount: int, max_restaurants_per_user: int) -> list:
     final_users = []
     for user in users:
         cui = random.choice(cuisine)
-
-        restaurants = restaurant_finder(cui)[:max_restaurants_per_user]
-        final_users.append({user["name"]: restaurants})
+        ids = restaurant_finder(cui, catalogue)
+        final_users.append({user["name"]: ids[:max_restaurants_per_user]})
 
     return final_users
 
 # example use
-# users_for_use = generate_dummy_users(10, 5)
+# users_for_use = generate_users(10, 5, catalogue)
 # print(users_for_use)
 
 
@@ -93,5 +95,5 @@ if __name__ == '__main__':
 
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ["csv", "io", "random", "tree_implement"]
+        'extra-imports': ["csv", "io", "random", "catalogue_implement"]
     })
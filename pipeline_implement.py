@@ -0,0 +1,76 @@
+"""Running the slow stages of Culinary Connections in the background while the user is filling in a window.
+
+The restaurants, decision tree and graph start loading as soon as a StartupPipeline is created (just before
+the preference window opens), so once the user saves their preferences only whatever is left of the loading,
+and the query itself, remain to be waited for. Likewise, the first map is drawn and opened while the window
+for making a friend is showing.
+"""
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+import graph_implement
+import map_implement
+import service_implement
+
+
+class StartupPipeline:
+    """A RecommendationService loading in a background thread, and the maps drawn from it.
+
+    Instance Attributes:
+        - loading: The result of loading the service, which may not have finished yet.
+    """
+    loading: Future
+    # Private Instance Attributes:
+    #   - _executor: The background thread the stages run in, one after another.
+    _executor: ThreadPoolExecutor
+
+    def __init__(self, **options: Any) -> None:
+        """Start loading a RecommendationService in the background, passing options to load_service."""
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='startup')
+        self.loading = self._executor.submit(service_implement.load_service, **options)
+
+    def service(self) -> service_implement.RecommendationService:
+        """Return the service, waiting for it to finish loading if it has not yet.
+
+        Any exception raised while loading is raised again here.
+        """
+        return self.loading.result()
+
+    def recommend(self, area: str, preferences: list, limit: int = 10, weights: Optional[list[float]] = None) \
+            -> tuple[list, map_implement.MapBuilder, dict[str, list[str]]]:
+        """Return the business ids of the best (up to limit) of the restaurants matching preferences, ranked by
+        stars, reviews and distance from area, a map of them and of the restaurants near area that other users
+        have been to, and the attributes relaxed for each recommended restaurant.
+
+        If no restaurant matches every preference, the restaurants needing the fewest (or, with weights, the
+        least important) preferences relaxed are recommended instead (see RecommendationService.recommend).
+        """
+        service = self.service()
+        location = graph_implement.get_lat_lon(area)
+        recommended = service.recommend(preferences, limit, location, weights)
+        map_builder = map_implement.MapBuilder((36.1627, -86.7816), zoom_start=12)
+        service.add_to_map(map_builder, [business for business, _ in recommended], 'decision_tree')
+        service.add_to_map(map_builder, service.nearby(location), 'nearby')
+        return [business['business_id'] for business, _ in recommended], map_builder, \
+            {business['business_id']: relaxed for business, relaxed in recommended}
+
+    def save_map(self, map_builder: map_implement.MapBuilder, path: str = 'map.html',
+                 open_browser: bool = True) -> Future:
+        """Draw map_builder and save it to path in the background (opening it if open_browser is True), and
+        return the result of doing so.
+        """
+        return self._executor.submit(map_builder.save, path, open_browser)
+
+    def close(self) -> None:
+        """Wait for the background stages to finish, and stop the background thread."""
+        self._executor.shutdown(wait=True)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["concurrent.futures", "graph_implement", "map_implement", "service_implement"]
+    })
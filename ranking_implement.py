@@ -0,0 +1,180 @@
+"""Ranking the restaurants that match a user's preferences, best first, one page at a time.
+
+A restaurant's score rewards its stars and (on a log scale, so that a few hundred reviews do not drown out
+the stars) its number of reviews, and penalizes its distance from the user. Only as many restaurants as are
+asked for are ever put in order: top_k selects the best k with a partial sort, and ranked_pages heapifies the
+matches once and pops each page off the heap only when it is asked for.
+"""
+from __future__ import annotations
+import heapq
+import math
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+
+from spatial_implement import EARTH_RADIUS_KM, haversine_km
+
+# How much one star, one factor of e more reviews, and one kilometre further away change a restaurant's score
+STAR_WEIGHT = 1.0
+REVIEW_WEIGHT = 0.25
+DISTANCE_WEIGHT = 0.2
+
+
+def score(business: Any, location: Optional[tuple[float, float]] = None) -> float:
+    """Return the score of business (a Yelp dictionary or record) for a user at location, higher being better.
+
+    If location is None, distance is not taken into account.
+
+    >>> score({'stars': 4.5, 'review_count': 0})
+    4.5
+    >>> score({'stars': 4.5, 'review_count': 100}) > score({'stars': 4.5, 'review_count': 10})
+    True
+    """
+    value = STAR_WEIGHT * business['stars'] + REVIEW_WEIGHT * math.log1p(business.get('review_count') or 0)
+    if location is not None:
+        value -= DISTANCE_WEIGHT * haversine_km(location, (business['latitude'], business['longitude']))
+    return value
+
+
+def ranked_pages(items: list, scores: np.ndarray, page_size: int = 10) -> Iterator[list]:
+    """Yield items, highest score first (ties in the order they were given), page_size at a time.
+
+    scores[i] is the score of items[i]. The first page heapifies the items in linear time, and each page costs
+    O(page_size log n), so the pages that are never asked for are never sorted.
+
+    >>> list(ranked_pages(['a', 'b', 'c'], np.array([1.0, 3.0, 1.0]), 2))
+    [['b', 'a'], ['c']]
+
+    Preconditions:
+        - len(items) == len(scores)
+        - page_size >= 1
+    """
+    heap = list(zip((-scores).tolist(), range(len(items))))
+    heapq.heapify(heap)
+    while heap:
+        yield [items[heapq.heappop(heap)[1]] for _ in range(min(page_size, len(heap)))]
+
+
+class Ranker:
+    """The scores of a set of restaurants, kept in arrays so that all the matches of a query are scored at once.
+
+    Scores are those of score(business, location), with the haversine distance computed by NumPy.
+
+    Representation Invariants:
+        - len(self._ids) <= len(self._static) == len(self._latitudes) == len(self._longitudes)
+        - all(self._ids[i] == business_id for business_id, i in self._positions.items())
+        - len(self._positions) + len(self._free) == len(self._ids)
+    """
+    # Private Instance Attributes:
+    #   - _ids: The business id of the restaurant at each position (or of the last one there, if it is free).
+    #   - _positions: Maps the business id of each restaurant that has not been removed to its position in _ids.
+    #   - _free: The positions of the restaurants that have been removed, which are reused by the next ones added.
+    #   - _static:
+    #       The score of each restaurant without distance. Like _latitudes and _longitudes, this may have room
+    #       for more restaurants than are in _ids, so that adding one does not copy the whole array.
+    #   - _latitudes, _longitudes: The location of each restaurant, in radians.
+    _ids: list[str]
+    _positions: dict[str, int]
+    _free: list[int]
+    _static: np.ndarray
+    _latitudes: np.ndarray
+    _longitudes: np.ndarray
+
+    def __init__(self, restaurants: Iterable[Any]) -> None:
+        """Initialize a ranker of restaurants (Yelp dictionaries or records)."""
+        restaurants = list(restaurants)
+        self._ids = [r['business_id'] for r in restaurants]
+        self._positions = {business_id: i for i, business_id in enumerate(self._ids)}
+        self._free = []
+        self._static = np.array([score(r) for r in restaurants], dtype=np.float64)
+        self._latitudes = np.radians(np.array([r['latitude'] for r in restaurants], dtype=np.float64))
+        self._longitudes = np.radians(np.array([r['longitude'] for r in restaurants], dtype=np.float64))
+
+    def update(self, business: Any) -> None:
+        """Add business to this ranker, or update its score and location if it is already here.
+
+        This takes amortized constant time: a new restaurant takes the place of one that has been removed if
+        there is one, and when the arrays are full, they are doubled in size.
+        """
+        business_id = business['business_id']
+        position = self._positions.get(business_id)
+        if position is None and self._free:
+            position = self._free.pop()
+            self._ids[position] = business_id
+            self._positions[business_id] = position
+        elif position is None:
+            position = len(self._ids)
+            if position == len(self._static):
+                extra = max(position, 16)
+                self._static, self._latitudes, self._longitudes = (
+                    np.concatenate([array, np.zeros(extra)])
+                    for array in (self._static, self._latitudes, self._longitudes))
+            self._ids.append(business_id)
+            self._positions[business_id] = position
+        self._static[position] = score(business)
+        self._latitudes[position] = math.radians(business['latitude'])
+        self._longitudes[position] = math.radians(business['longitude'])
+
+    def remove(self, business_id: str) -> None:
+        """Remove the restaurant with the given business id from this ranker (do nothing if it is not here)."""
+        position = self._positions.pop(business_id, None)
+        if position is not None:
+            self._free.append(position)
+
+    def scored(self, ids: Iterable[str],
+               location: Optional[tuple[float, float]] = None) -> tuple[list[str], np.ndarray]:
+        """Return the ids that this ranker knows (in the order they were given), and their scores for a user at
+        location.
+
+        The scores are a new array, so they can still be used after this ranker changes.
+        """
+        known = [business_id for business_id in ids if business_id in self._positions]
+        positions = np.fromiter(map(self._positions.__getitem__, known), dtype=np.intp, count=len(known))
+        scores = self._static[positions]
+        if location is not None:
+            latitude, longitude = math.radians(location[0]), math.radians(location[1])
+            latitudes = self._latitudes[positions]
+            a = np.sin((latitudes - latitude) / 2) ** 2 + \
+                math.cos(latitude) * np.cos(latitudes) * np.sin((self._longitudes[positions] - longitude) / 2) ** 2
+            scores = scores - DISTANCE_WEIGHT * 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        return known, scores
+
+    def top_k(self, ids: Iterable[str], k: int, location: Optional[tuple[float, float]] = None) -> list[str]:
+        """Return the k best of the restaurants with the given business ids, best first (ties in the order the
+        ids were given).
+
+        Ids this ranker does not know are skipped. np.partition finds the k-th best score in linear time, and
+        only the restaurants scoring at least as much are sorted, so that those tied with the k-th best are
+        chosen by the order the ids were given too.
+        """
+        if k <= 0:
+            return []
+        known, scores = self.scored(ids, location)
+        if k >= len(known):
+            best = np.arange(len(known))
+        else:
+            best = np.flatnonzero(scores >= -np.partition(-scores, k - 1)[k - 1])
+        best = best[np.lexsort((best, -scores[best]))][:k]
+        return [known[i] for i in best.tolist()]
+
+    def pages(self, ids: Iterable[str], page_size: int = 10,
+              location: Optional[tuple[float, float]] = None) -> Iterator[list[str]]:
+        """Yield the restaurants with the given business ids, best first, page_size at a time (see ranked_pages).
+
+        The restaurants are scored when the first page is asked for.
+
+        Preconditions:
+            - page_size >= 1
+        """
+        yield from ranked_pages(*self.scored(ids, location), page_size)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["heapq", "math", "numpy", "spatial_implement"]
+    })
@@ -0,0 +1,118 @@
+"""Friend-of-friend restaurant recommendations from the user-restaurant graph.
+
+A user's restaurants lead to the other people who have been there, and their restaurants are the
+recommendations. Candidates are scored by an approximate personalized PageRank (a random walk from the user
+that restarts at the user) computed by forward push: probability mass is pushed out from vertices whose
+residual is still large, so only the part of the graph near the user is ever visited, however big the whole
+graph is. The push stops early at a depth limit, a push limit or a time limit (see PushParameters).
+"""
+from __future__ import annotations
+import dataclasses
+import heapq
+import time
+from collections import deque
+from typing import Any
+
+
+@dataclasses.dataclass(frozen=True)
+class PushParameters:
+    """How far a forward push from a source may spread.
+
+    Instance Attributes:
+        - alpha: The probability of restarting at the source at each step.
+        - epsilon: A vertex's residual is only pushed to its neighbours while it is at least epsilon times its degree.
+        - max_depth: Vertices max_depth edges from the source receive mass but are never pushed from.
+        - max_pushes: The number of pushes after which pushing stops.
+        - time_budget: The number of seconds after which pushing stops.
+
+    Representation Invariants:
+        - 0 < self.alpha < 1
+        - self.epsilon > 0
+    """
+    alpha: float = 0.15
+    epsilon: float = 1e-4
+    max_depth: int = 3
+    max_pushes: int = 100_000
+    time_budget: float = 0.05
+
+
+def personalized_pagerank(graph: Any, source: Any,
+                          parameters: PushParameters = PushParameters()) -> dict[Any, float]:
+    """Return approximate personalized PageRank scores of the vertices near source in graph, pushing as far as
+    parameters allow.
+
+    graph is any graph with a get_neighbours method (a Graph or a CSRGraph).
+    """
+    deadline = time.perf_counter() + parameters.time_budget
+    scores: dict[Any, float] = {}
+    residuals: dict[Any, float] = {source: 1.0}
+    depths: dict[Any, int] = {source: 0}
+    neighbours_of: dict[Any, list] = {}
+    queue = deque([source])
+    queued = {source}
+    pushes = 0
+
+    while queue and pushes < parameters.max_pushes:
+        if pushes % 64 == 0 and time.perf_counter() > deadline:
+            break
+        u = queue.popleft()
+        queued.discard(u)
+        if u not in neighbours_of:
+            neighbours_of[u] = list(graph.get_neighbours(u))
+        neighbours = neighbours_of[u]
+        if not neighbours or residuals[u] < parameters.epsilon * len(neighbours):
+            continue
+
+        pushes += 1
+        scores[u] = scores.get(u, 0.0) + parameters.alpha * residuals[u]
+        share = (1 - parameters.alpha) * residuals[u] / len(neighbours)
+        residuals[u] = 0.0
+        for v in neighbours:
+            residuals[v] = residuals.get(v, 0.0) + share
+            if v not in depths:
+                depths[v] = depths[u] + 1
+            if v not in queued and depths[v] < parameters.max_depth and residuals[v] >= parameters.epsilon:
+                queue.append(v)
+                queued.add(v)
+
+    # Mass still waiting to be pushed counts towards the vertex that holds it
+    for v in residuals:
+        if residuals[v] > 0:
+            scores[v] = scores.get(v, 0.0) + parameters.alpha * residuals[v]
+    return scores
+
+
+def recommend_restaurants(graph: Any, user: Any, k: int = 10, parameters: PushParameters = PushParameters(),
+                          attempts: int = 3) -> list[tuple[Any, float]]:
+    """Return the k best (restaurant, score) recommendations for user, best first.
+
+    Restaurants the user is already adjacent to are left out. graph must have get_neighbours and get_kind
+    methods, and parameters are passed on to personalized_pagerank. If fewer than k restaurants are reached (as
+    happens around very popular restaurants, whose mass is spread thinly over many people), the walk is
+    tried again with a tenth of the epsilon, up to attempts times in all, within one overall time budget.
+
+    Raise a ValueError if user does not appear as a vertex in graph.
+    """
+    own = graph.get_neighbours(user)
+    deadline = time.perf_counter() + parameters.time_budget
+    candidates: list[tuple[Any, float]] = []
+    for _ in range(attempts):
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        scores = personalized_pagerank(graph, user, dataclasses.replace(parameters, time_budget=remaining))
+        candidates = [(item, score) for item, score in scores.items()
+                      if item != user and item not in own and graph.get_kind(item) == 'restaurant']
+        if len(candidates) >= k:
+            break
+        parameters = dataclasses.replace(parameters, epsilon=parameters.epsilon / 10)
+    return heapq.nlargest(k, candidates, key=lambda candidate: candidate[1])
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["dataclasses", "heapq", "time", "collections"]
+    })
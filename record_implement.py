@@ -0,0 +1,199 @@
+"""Compact restaurant records, holding only the fields of a Yelp business that the program reads.
+
+The strings that repeat across restaurants (names, cities, states, categories and attribute values) are
+dictionary-encoded: each record keeps small integer ids into a StringTable shared with the other records of
+its catalogue instead of its own copies of the strings, and the attributes are kept as a tuple of ids instead
+of a nested dictionary. A table only ever grows, so a catalogue that keeps changing moves its records into a
+new table from time to time (see RestaurantCatalogue.upsert), leaving the strings of removed restaurants
+behind in the old one.
+"""
+from __future__ import annotations
+from typing import Any, Iterator, Optional
+
+from category_implement import split_categories
+
+# The Yelp attributes that make_tree reads; a record keeps only these
+ATTRIBUTE_KEYS = ['RestaurantsTakeOut', 'Alcohol', 'WiFi', 'BusinessAcceptsCreditCards',
+                  'RestaurantsGoodForGroups', 'RestaurantsPriceRange2']
+
+# The keys a record can be indexed with, as if it were the Yelp dictionary of the business
+FIELDS = ('business_id', 'name', 'categories', 'city', 'state', 'latitude', 'longitude', 'stars',
+          'review_count', 'is_open', 'attributes')
+
+
+class StringTable:
+    """A table of distinct strings, each identified by its position in the table."""
+    # Private Instance Attributes:
+    #   - _strings: The strings in the table, in the order they were added.
+    #   - _ids: Maps each string in the table to its id.
+    _strings: list[str]
+    _ids: dict[str, int]
+
+    def __init__(self) -> None:
+        """Initialize an empty table."""
+        self._strings = []
+        self._ids = {}
+
+    def __len__(self) -> int:
+        """Return the number of strings in this table."""
+        return len(self._strings)
+
+    def __getitem__(self, string_id: int) -> str:
+        """Return the string with the given id."""
+        return self._strings[string_id]
+
+    def intern(self, string: str) -> int:
+        """Return the id of string, adding it to this table if it is not already there.
+
+        >>> table = StringTable()
+        >>> table.intern('Mexican'), table.intern('Thai'), table.intern('Mexican')
+        (0, 1, 0)
+        """
+        string_id = self._ids.get(string)
+        if string_id is None:
+            string_id = self._ids[string] = len(self._strings)
+            self._strings.append(string)
+        return string_id
+
+
+# Stands for a missing attribute in a record's attribute tuple
+_MISSING = -1
+
+
+class Restaurant:
+    """A compact record of one restaurant.
+
+    A record can be indexed (and searched with get) like the Yelp dictionary it was made from, so it can be
+    passed to code written for those dictionaries; r['categories'] and r['attributes'] are rebuilt from the
+    encoded ids whenever they are looked up.
+
+    Instance Attributes:
+        - business_id: The Yelp id of this restaurant.
+        - latitude: The latitude of this restaurant.
+        - longitude: The longitude of this restaurant.
+        - stars: The average rating of this restaurant.
+        - review_count: The number of reviews of this restaurant.
+        - is_open: 1 if this restaurant is open, and 0 if it has closed.
+    """
+    __slots__: tuple[str, ...] = ('business_id', '_strings', '_name', '_city', '_state', 'latitude', 'longitude',
+                                  'stars', 'review_count', 'is_open', '_categories', '_attributes')
+    business_id: str
+    latitude: float
+    longitude: float
+    stars: float
+    review_count: int
+    is_open: int
+    # Private Instance Attributes:
+    #   - _strings: The table holding the strings of this restaurant.
+    #   - _name, _city, _state: The ids in _strings of this restaurant's name, city and state.
+    #   - _categories: The ids in _strings of this restaurant's categories, in order.
+    #   - _attributes:
+    #       The ids in _strings of the values of this restaurant's ATTRIBUTE_KEYS (_MISSING for those it does
+    #       not have), or None if the restaurant has no attributes at all.
+    _strings: StringTable
+    _name: int
+    _city: int
+    _state: int
+    _categories: tuple[int, ...]
+    _attributes: Optional[tuple[int, ...]]
+
+    def __init__(self, business: Any, strings: StringTable) -> None:
+        """Initialize a record of business, a Yelp dictionary (or anything indexed like one), keeping its strings
+        in strings.
+        """
+        self.business_id = business['business_id']
+        self._strings = strings
+        self._name = strings.intern(business['name'])
+        self._city = strings.intern(business.get('city') or '')
+        self._state = strings.intern(business.get('state') or '')
+        self.latitude = float(business['latitude'])
+        self.longitude = float(business['longitude'])
+        self.stars = float(business['stars'])
+        self.review_count = int(business.get('review_count') or 0)
+        self.is_open = 1 if business.get('is_open') is None else int(business['is_open'])
+        self._categories = tuple(strings.intern(c) for c in split_categories(business.get('categories')))
+        attributes = business.get('attributes')
+        if isinstance(attributes, dict):
+            self._attributes = tuple(_MISSING if attributes.get(key) is None else strings.intern(attributes[key])
+                                     for key in ATTRIBUTE_KEYS)
+        else:
+            self._attributes = None
+
+    @property
+    def name(self) -> str:
+        """The name of this restaurant."""
+        return self._strings[self._name]
+
+    @property
+    def city(self) -> str:
+        """The city this restaurant is in."""
+        return self._strings[self._city]
+
+    @property
+    def state(self) -> str:
+        """The state this restaurant is in."""
+        return self._strings[self._state]
+
+    @property
+    def categories(self) -> Optional[str]:
+        """The categories of this restaurant, separated by commas as in the Yelp data (None if it has none)."""
+        return ', '.join(self._strings[c] for c in self._categories) if self._categories else None
+
+    @property
+    def attributes(self) -> Optional[dict[str, str]]:
+        """The ATTRIBUTE_KEYS this restaurant has and their values, or None if it has no attributes."""
+        if self._attributes is None:
+            return None
+        return {key: self._strings[value] for key, value in zip(ATTRIBUTE_KEYS, self._attributes)
+                if value != _MISSING}
+
+    def __getitem__(self, key: str) -> Any:
+        """Return the field key of this restaurant, as in its Yelp dictionary.
+
+        Raise a KeyError if key is not one of FIELDS.
+        """
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether key is one of FIELDS."""
+        return key in FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over FIELDS."""
+        return iter(FIELDS)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the field key of this restaurant, or default if key is not one of FIELDS."""
+        return getattr(self, key) if key in FIELDS else default
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return this restaurant as a Yelp dictionary (of FIELDS only)."""
+        return {key: getattr(self, key) for key in FIELDS}
+
+    def __repr__(self) -> str:
+        """Return a representation of this record."""
+        return f'Restaurant({self.business_id!r}, {self.name!r})'
+
+
+def to_json(record: Any) -> dict[str, Any]:
+    """Return record as a dictionary, for json.dumps(..., default=to_json).
+
+    Raise a TypeError if record is not a Restaurant.
+    """
+    if isinstance(record, Restaurant):
+        return record.to_dict()
+    raise TypeError(f'{type(record).__name__} is not JSON serializable')
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'max-attributes': 12,
+        'extra-imports': ["category_implement"]
+    })
@@ -0,0 +1,356 @@
+"""A local HTTP server for Culinary Connections, which loads the restaurants, decision tree and graph once and
+then answers recommendation requests until it is stopped.
+
+Run it with, for example:
+
+    python server.py --port 8000 --shards shards
+
+(or python server.py --check to check this module with python_ta). With --shards, /match and /nearby also
+answer for other cities in the Yelp dataset, given as a "city" and "state" (such as "Tampa" and "FL"); each
+city's shard is loaded the first time it is asked for, and only the --max-shards most recently used ones are
+kept in memory. Areas are only known in Nashville, so elsewhere a location must be given instead.
+
+Every endpoint takes its arguments as a JSON object in the request body (or as query parameters) and answers
+with a JSON object:
+
+    POST /match               {"preferences": [8 attributes, as in main.py]} -> {"restaurants": [...]}
+                              (with an "area" or "location", the restaurants nearer to it rank higher)
+    POST /nearby              {"area": "Downtown"} or {"location": [lat, lon]} -> {"restaurants": [...]}
+                              (optionally with "radius_km", at most MAX_RADIUS_KM, and "k", at most MAX_NEARBY)
+    POST /make_friend         {"user": ..., "friend": ..., "restaurants": [business ids]} -> {"user": ...}
+    GET  /friend_restaurants  ?friend=...                                    -> {"restaurants": [...]}
+    GET  /recommendations     ?user=...&limit=10                             -> {"restaurants": [...]}
+                              (restaurants the people who share user's restaurants go to)
+    POST /apply_delta         {"upserts": [businesses], "deletes": [business ids]} -> {"added": ..., ...}
+    GET  /cache_stats                                                        -> {"hits": ..., "misses": ...}
+
+Requests are read and written on an asyncio event loop, and the work of answering them is done in a pool of
+threads, so a slow request never holds up reading the others.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import graph_implement
+import record_implement
+import service_implement
+import shard_implement
+
+# The largest request body accepted, in bytes
+MAX_BODY_BYTES = 1 << 20
+
+# The largest radius, in kilometres, and number of restaurants a /nearby request may ask for
+MAX_RADIUS_KM = 100.0
+MAX_NEARBY = 100
+
+
+class BadRequest(Exception):
+    """Raised when a request is missing an argument or has an argument of the wrong type."""
+
+
+class RecommendationServer:
+    """Answers HTTP requests from a RecommendationService.
+
+    Instance Attributes:
+        - service: The service answering the requests.
+    """
+    service: service_implement.RecommendationService
+    # Private Instance Attributes:
+    #   - _executor: The threads that answer requests.
+    #   - _routes: Maps each endpoint's path to the function answering it.
+    _executor: ThreadPoolExecutor
+    _routes: dict[str, Callable[[dict], dict]]
+
+    def __init__(self, service: service_implement.RecommendationService, workers: int = 4) -> None:
+        """Initialize a server answering from service with a pool of the given number of threads."""
+        self.service = service
+        self._executor = ThreadPoolExecutor(workers)
+        self._routes = {
+            '/match': self.match,
+            '/nearby': self.nearby,
+            '/make_friend': self.make_friend,
+            '/friend_restaurants': self.friend_restaurants,
+            '/recommendations': self.recommendations,
+            '/apply_delta': self.apply_delta,
+            '/cache_stats': self.cache_stats
+        }
+
+    def city_service(self, request: dict) -> service_implement.RecommendationService:
+        """Return the service answering request: that of its "city" (in its "state") if it has one, and
+        otherwise this server's.
+
+        Raise a BadRequest if there are no restaurants in that city, or if request names an area of a city
+        other than Nashville.
+        """
+        if 'city' not in request:
+            return self.service
+        city, state = request['city'], request.get('state', '')
+        if not isinstance(city, str) or not isinstance(state, str):
+            raise BadRequest('the city and state must be strings')
+        try:
+            service = self.service.in_city(city, state)
+        except KeyError:
+            raise BadRequest(f'there are no restaurants in {city}, {state}')
+        if service.city != shard_implement.NASHVILLE and 'area' in request and 'location' not in request:
+            raise BadRequest('areas are only known in Nashville, so give a location instead')
+        return service
+
+    def match(self, request: dict) -> dict:
+        """Answer a /match request."""
+        preferences = request.get('preferences')
+        if isinstance(preferences, str):
+            preferences = preferences.split(',')
+        if not isinstance(preferences, list):
+            raise BadRequest('preferences must be a list')
+        service = self.city_service(request)
+        location = request_location(request)
+        limit = request_limit(request)
+        try:
+            return {'restaurants': service.match(preferences, limit, location)}
+        except ValueError:
+            raise BadRequest(f'preferences must have {service_implement.NUM_PREFERENCES} attributes')
+
+    def nearby(self, request: dict) -> dict:
+        """Answer a /nearby request."""
+        service = self.city_service(request)
+        location = request_location(request)
+        if location is None:
+            raise BadRequest('nearby needs an area or a location [latitude, longitude]')
+        try:
+            radius_km, k = float(request.get('radius_km', 1.0)), int(request.get('k', 5))
+        except (OverflowError, TypeError, ValueError):
+            raise BadRequest('radius_km must be a number and k an integer')
+        if not (math.isfinite(radius_km) and 0 < radius_km <= MAX_RADIUS_KM):
+            raise BadRequest(f'radius_km must be more than 0 and at most {MAX_RADIUS_KM}')
+        if not 1 <= k <= MAX_NEARBY:
+            raise BadRequest(f'k must be from 1 to {MAX_NEARBY}')
+        return {'restaurants': service.nearby(location, radius_km, k)}
+
+    def make_friend(self, request: dict) -> dict:
+        """Answer a /make_friend request."""
+        user, friend = request.get('user'), request.get('friend')
+        restaurants = request.get('restaurants', [])
+        if not isinstance(user, str) or not isinstance(friend, str) or not isinstance(restaurants, list):
+            raise BadRequest('make_friend needs a user, a friend and a list of restaurants')
+        try:
+            self.service.make_friend(user, friend, restaurants)
+        except ValueError as error:
+            raise BadRequest(str(error))
+        return {'user': user, 'friend': friend}
+
+    def friend_restaurants(self, request: dict) -> dict:
+        """Answer a /friend_restaurants request."""
+        friend = request.get('friend')
+        if not isinstance(friend, str):
+            raise BadRequest('friend_restaurants needs a friend')
+        try:
+            return {'restaurants': self.service.friend_restaurants(friend)}
+        except ValueError:
+            raise BadRequest(f'there is no user named {friend}')
+
+    def recommendations(self, request: dict) -> dict:
+        """Answer a /recommendations request."""
+        user = request.get('user')
+        if not isinstance(user, str):
+            raise BadRequest('recommendations needs a user')
+        limit = request_limit(request)
+        try:
+            return {'restaurants': self.service.recommended_restaurants(user, limit)}
+        except ValueError:
+            raise BadRequest(f'there is no user named {user}')
+
+    def apply_delta(self, request: dict) -> dict:
+        """Answer an /apply_delta request."""
+        upserts, deletes = request.get('upserts', []), request.get('deletes', [])
+        if not isinstance(upserts, list) or not all(isinstance(business, dict) and 'business_id' in business
+                                                    for business in upserts):
+            raise BadRequest('upserts must be a list of businesses with a business_id')
+        if not isinstance(deletes, list) or not all(isinstance(business_id, str) for business_id in deletes):
+            raise BadRequest('deletes must be a list of business ids')
+        try:
+            return self.service.apply_delta(upserts, deletes)
+        except (KeyError, TypeError, ValueError) as error:
+            raise BadRequest(f'a new business is missing a field or has an invalid one: {error}')
+
+    def cache_stats(self, _request: dict) -> dict:
+        """Answer a /cache_stats request with the counters of the service's query cache."""
+        return self.service.cache.stats()
+
+    def respond(self, path: str, query: str, body: bytes) -> tuple[HTTPStatus, bytes]:
+        """Return the status and JSON body of the response to a request for path with the given query string
+        and body.
+        """
+        if path not in self._routes:
+            return HTTPStatus.NOT_FOUND, json.dumps({'error': f'no endpoint {path}'}).encode()
+        try:
+            request = dict(parse_qsl(query))
+            if body:
+                arguments = json.loads(body)
+                if not isinstance(arguments, dict):
+                    raise BadRequest('the body must be a JSON object')
+                request.update(arguments)
+            return HTTPStatus.OK, json.dumps(self._routes[path](request), default=record_implement.to_json).encode()
+        except json.JSONDecodeError:
+            return HTTPStatus.BAD_REQUEST, json.dumps({'error': 'the body is not JSON'}).encode()
+        except BadRequest as error:
+            return HTTPStatus.BAD_REQUEST, json.dumps({'error': str(error)}).encode()
+        except (OverflowError, TypeError, ValueError):
+            return HTTPStatus.BAD_REQUEST, json.dumps({'error': 'an argument has the wrong type'}).encode()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer the requests on one connection until the client closes it (or asks for it to be closed)."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ValueError as error:
+                    await write_response(writer, HTTPStatus.BAD_REQUEST, json.dumps({'error': str(error)}).encode(),
+                                         keep_alive=False)
+                    break
+                if request is None:
+                    break
+                target, headers, body = request
+                url = urlsplit(target)
+                status, response = await loop.run_in_executor(self._executor, self.respond, url.path, url.query,
+                                                              body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await write_response(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8000,
+                    started: Optional[Callable[[asyncio.Server], Any]] = None) -> None:
+        """Serve requests on host and port until cancelled, calling started with the server once it is
+        listening (port 0 picks a free port, which can be found from the server's sockets).
+        """
+        server = await asyncio.start_server(self.handle, host, port)
+        if started is not None:
+            started(server)
+        async with server:
+            await server.serve_forever()
+
+
+def request_location(request: dict) -> Optional[tuple[float, float]]:
+    """Return the latitude and longitude of the "location" (or else the "area") of request, or None if it has
+    neither.
+
+    Raise a BadRequest if the location or area is not valid.
+    """
+    try:
+        if 'location' in request:
+            location = request['location']
+            if isinstance(location, str):
+                location = location.split(',')
+            latitude, longitude = float(location[0]), float(location[1])
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                raise ValueError
+            return latitude, longitude
+        if 'area' in request:
+            return graph_implement.get_lat_lon(request['area'])
+    except (KeyError, IndexError, OverflowError, TypeError, ValueError):
+        raise BadRequest('the location must be an area or [latitude, longitude]')
+    return None
+
+
+def request_limit(request: dict) -> int:
+    """Return the "limit" of request (10 if it has none).
+
+    Raise a BadRequest if the limit is not an integer.
+    """
+    try:
+        return int(request.get('limit', 10))
+    except (OverflowError, TypeError, ValueError):
+        raise BadRequest('the limit must be an integer')
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[tuple[str, dict[str, str], bytes]]:
+    """Return the target, headers (with lowercase names) and body of the next HTTP request from reader, or
+    None if the connection was closed before another request began.
+
+    Raise a ValueError (saying what is wrong) if the request is malformed or its body is too large.
+    """
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError('the request headers are too long')
+    lines = head.decode('latin-1').split('\r\n')
+    request_line = lines[0].split(' ')
+    if len(request_line) != 3:
+        raise ValueError('the request line must be a method, a target and a version')
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise ValueError('the Content-Length is not a number')
+    if not 0 <= length <= MAX_BODY_BYTES:
+        raise ValueError(f'the body must be at most {MAX_BODY_BYTES} bytes')
+    body = await reader.readexactly(length) if length else b''
+    return request_line[1], headers, body
+
+
+async def write_response(writer: asyncio.StreamWriter, status: HTTPStatus, body: bytes, keep_alive: bool) -> None:
+    """Write an HTTP response with the given status and JSON body to writer, saying whether the connection is
+    kept alive.
+    """
+    writer.write(
+        f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+        f'Content-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\n'
+        f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + body)
+    await writer.drain()
+
+
+def main(arguments: argparse.Namespace) -> None:
+    """Load the service (and the city shards, if arguments has a shard directory) and serve requests on the host
+    and port given in arguments until interrupted.
+    """
+    service = service_implement.load_service(arguments.zip, user_amount=arguments.users)
+    if arguments.shards is not None:
+        service.use_shards(shard_implement.ShardedCatalogue(arguments.zip, service_implement.YELP_JSON,
+                                                            service_implement.CUISINE_FILE, arguments.shards,
+                                                            arguments.max_shards))
+    recommendation_server = RecommendationServer(service, arguments.workers)
+    print(f'Serving on http://{arguments.host}:{arguments.port}')
+    asyncio.run(recommendation_server.serve(arguments.host, arguments.port))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve Culinary Connections recommendations over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=4, help='number of threads answering requests')
+    parser.add_argument('--zip', default=service_implement.YELP_ZIP, help='path to the Yelp business dataset zip')
+    parser.add_argument('--users', type=int, default=30, help='number of dummy users to generate')
+    parser.add_argument('--shards', default=None, help='directory of the city shards (built there if missing)')
+    parser.add_argument('--max-shards', type=int, default=4, help='number of city shards kept in memory')
+    parser.add_argument('--check', action='store_true', help='check this module with python_ta instead of serving')
+    command_line = parser.parse_args()
+
+    if command_line.check:
+        import python_ta
+
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["argparse", "asyncio", "json", "math", "concurrent.futures", "http", "urllib.parse",
+                              "graph_implement", "record_implement", "service_implement", "shard_implement"],
+            'allowed-io': ['main']
+        })
+    else:
+        main(command_line)
@@ -0,0 +1,359 @@
+"""Everything main.py builds, loaded once and shared by any number of requests.
+
+A RecommendationService holds the restaurant catalogue, the decision tree and the user-restaurant graph, and
+answers the same questions main.py asks of them. The graph changes as users are added, and the catalogue and
+decision tree change when a delta of the business data is applied, so every use of them holds the service's
+lock, and the service can be used from several threads at once.
+
+The results of match, relaxed_match and nearby are kept in a QueryCache, keyed by the query, the city and the
+versions of the catalogue (and, for nearby, the graph) they were computed from.
+
+A service answers from the restaurants of its own city (Nashville, from its snapshot), but once it is given a
+ShardedCatalogue with use_shards, in_city returns a service answering the same questions about any other city
+in the Yelp dataset, from that city's shard.
+"""
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import catalogue_implement
+import graph_implement
+import map_implement
+import name_implement
+import ranking_implement
+import shard_implement
+import snapshot_implement
+import tree_implement
+from cache_implement import QueryCache
+from feature_implement import ROW_ATTRIBUTES, FeatureExtractor, compile_extractor
+from record_implement import Restaurant
+
+YELP_ZIP = 'yelp_academic_dataset_business.json.zip'
+YELP_JSON = 'yelp_academic_dataset_business.json'
+CUISINE_FILE = 'cuisines.txt'
+
+# The number of preferences the decision tree matches (cuisine, takeout, stars, alcohol, wifi, credit card,
+# groups and price)
+NUM_PREFERENCES = 8
+
+
+def is_open(business: dict) -> bool:
+    """Return whether business is open: whether its is_open is missing, or is an integer other than 0 (or the
+    string of one).
+
+    Raise a ValueError if is_open is not an integer, like record_implement.Restaurant does.
+    """
+    value = business.get('is_open')
+    return value is None or int(value) != 0
+
+
+class RecommendationService:
+    """The restaurant catalogue, decision tree and user-restaurant graph of Culinary Connections.
+
+    Instance Attributes:
+        - catalogue: The restaurants in this service's city.
+        - decision_tree: The decision tree of the restaurants' attributes.
+        - graph: The graph of users and the restaurants they have been to.
+        - cache: The results of recent queries.
+        - city: The key of this service's city (see shard_implement.city_key).
+        - shards: The restaurants of every city, used by in_city, or None if this service only knows its own.
+    """
+    catalogue: catalogue_implement.RestaurantCatalogue
+    decision_tree: Any
+    graph: graph_implement.Graph
+    cache: QueryCache
+    city: str
+    shards: Optional[shard_implement.ShardedCatalogue]
+    # Private Instance Attributes:
+    #   - _lock: Held while the graph is read or changed (and shared with the services in_city returns).
+    _lock: threading.RLock
+
+    def __init__(self, catalogue: catalogue_implement.RestaurantCatalogue, decision_tree: Any,
+                 graph: graph_implement.Graph, cache: Optional[QueryCache] = None) -> None:
+        """Initialize a service answering from the given catalogue, decision tree and graph of Nashville,
+        caching results in cache (a new QueryCache by default).
+        """
+        self.catalogue = catalogue
+        self.decision_tree = decision_tree
+        self.graph = graph
+        self.cache = QueryCache() if cache is None else cache
+        self.city = shard_implement.NASHVILLE
+        self.shards = None
+        self._lock = threading.RLock()
+
+    def use_shards(self, shards: shard_implement.ShardedCatalogue) -> None:
+        """Answer in_city for the cities other than this service's from shards."""
+        self.shards = shards
+
+    def in_city(self, city: str, state: str) -> RecommendationService:
+        """Return a service answering queries about the restaurants of city in state, which shares this service's
+        graph, query cache and lock.
+
+        This service's own city is answered by this service. Any other city is answered from its shard (see
+        use_shards), which is loaded if it is not in memory, evicting the least recently used shard if there
+        are too many. The returned service only answers for its own city, and deltas should only be applied
+        to this one.
+
+        Raise a KeyError if there are no restaurants in that city.
+        """
+        key = shard_implement.city_key(city, state)
+        if key == self.city:
+            return self
+        if self.shards is None:
+            raise KeyError(key)
+        shard = self.shards.shard(city, state)
+        service = RecommendationService(shard.catalogue, shard.decision_tree, self.graph, self.cache)
+        service.city = shard.key
+        service._lock = self._lock
+        return service
+
+    def _matches(self, preferences: list) -> list:
+        """Return the business ids of every restaurant matching preferences.
+
+        Raise a ValueError if preferences does not have exactly NUM_PREFERENCES attributes.
+        """
+        if len(preferences) != NUM_PREFERENCES:
+            raise ValueError(f'preferences must have {NUM_PREFERENCES} attributes')
+        return self.decision_tree.match_all(list(preferences))
+
+    def match(self, preferences: list, limit: int = 10,
+              location: Optional[tuple[float, float]] = None) -> list[Restaurant | dict]:
+        """Return the best (up to limit) of the restaurants matching preferences, ranked by stars, reviews and
+        distance from location (if it is given).
+
+        Raise a ValueError if preferences does not have exactly NUM_PREFERENCES attributes.
+        """
+        if len(preferences) != NUM_PREFERENCES:
+            raise ValueError(f'preferences must have {NUM_PREFERENCES} attributes')
+
+        def compute() -> list[Restaurant | dict]:
+            """Rank the matches of preferences."""
+            with self._lock:
+                ranked = self.catalogue.ranker.top_k(self._matches(preferences), limit, location)
+                return tree_implement.recommended_to_dict(ranked, self.catalogue.by_id)
+
+        key = ('match', self.city, self.catalogue.version, tuple(preferences), limit, location)
+        return list(self.cache.get_or_compute(key, compute))
+
+    def relaxed_match(self, preferences: list, limit: int = 10, location: Optional[tuple[float, float]] = None,
+                      weights: Optional[list[float]] = None) -> list[tuple[Restaurant | dict, list[str]]]:
+        """Return (restaurant, relaxed attributes) for the best (up to limit) of the restaurants that match
+        preferences once the fewest (or, with weights, the least important) of them are relaxed.
+
+        weights gives the importance of each preference (1 each by default); relaxing a set of preferences
+        costs the sum of their weights. Restaurants are returned cheapest relaxation first (relaxing the
+        preferences asked about last first when two cost the same, so the cuisine is kept longest), and ranked
+        as by match among those needing the same relaxation. The relaxed attributes are named as in
+        feature_implement.ROW_ATTRIBUTES, and are empty for exact matches.
+
+        Raise a ValueError if preferences (or weights) does not have exactly NUM_PREFERENCES attributes.
+        """
+        if len(preferences) != NUM_PREFERENCES or (weights is not None and len(weights) != NUM_PREFERENCES):
+            raise ValueError(f'preferences must have {NUM_PREFERENCES} attributes')
+        key = ('relaxed_match', self.city, self.catalogue.version, tuple(preferences), limit, location,
+               None if weights is None else tuple(weights))
+        return list(self.cache.get_or_compute(key, lambda: self._relaxed_match(preferences, limit, location,
+                                                                               weights)))
+
+    def _relaxed_match(self, preferences: list, limit: int, location: Optional[tuple[float, float]],
+                       weights: Optional[list[float]]) -> list[tuple[Restaurant | dict, list[str]]]:
+        """Compute relaxed_match(preferences, limit, location, weights) without the cache."""
+        with self._lock:
+            index = self.decision_tree.index
+            results = []
+            for _, relaxed, bits in index.relaxations(list(preferences), weights):
+                names = [ROW_ATTRIBUTES[i] for i in relaxed]
+                for business_id in self.catalogue.ranker.top_k(index.restaurants(bits), limit - len(results),
+                                                               location):
+                    results.append((self.catalogue.by_id[business_id], names))
+                if len(results) >= limit:
+                    break
+            return results
+
+    def recommend(self, preferences: list, limit: int = 10, location: Optional[tuple[float, float]] = None,
+                  weights: Optional[list[float]] = None) -> list[tuple[Restaurant | dict, list[str]]]:
+        """Return (restaurant, relaxed attributes) for the restaurants main.py recommends: the best (up to
+        limit) exact matches of preferences, or if there are none, the best of relaxed_match.
+
+        Raise a ValueError if preferences (or weights) does not have exactly NUM_PREFERENCES attributes.
+        """
+        exact = self.match(preferences, limit, location)
+        if exact:
+            return [(business, []) for business in exact]
+        return self.relaxed_match(preferences, limit, location, weights)
+
+    def match_pages(self, preferences: list, page_size: int = 10,
+                    location: Optional[tuple[float, float]] = None) -> Iterator[list[Restaurant | dict]]:
+        """Return a generator of the restaurants matching preferences, ranked as by match, page_size at a time.
+
+        The matches are scored under the service's lock, so the pages are those of the catalogue when this was
+        called, even if a delta is applied while they are being read.
+
+        Raise a ValueError if preferences does not have exactly NUM_PREFERENCES attributes.
+        """
+        with self._lock:
+            known, scores = self.catalogue.ranker.scored(self._matches(preferences), location)
+            restaurants = [self.catalogue.by_id[business_id] for business_id in known]
+        return ranking_implement.ranked_pages(restaurants, scores, page_size)
+
+    def nearby(self, location: tuple[float, float], radius_km: float = 1.0,
+               k: int = 5) -> list[Restaurant | dict]:
+        """Return the k restaurants nearest to location (within radius_km) that users have been to."""
+        with self._lock:
+            key = ('nearby', self.city, self.catalogue.version, self.graph.version, tuple(location), radius_km, k)
+            return list(self.cache.get_or_compute(
+                key, lambda: self.graph.get_nearby_restaurants(location, self.catalogue.spatial_index, radius_km, k)))
+
+    def apply_delta(self, upserts: Iterable[dict] = (), deletes: Iterable[str] = (),
+                    keep: Callable[[dict], bool] = tree_implement.is_nashville_restaurant) -> dict[str, int]:
+        """Apply a change to the business data in place, and return how many businesses were added, updated,
+        removed, ignored and skipped.
+
+        Each of upserts is a Yelp business, added (or, if its business_id is already in the catalogue, merged
+        into the restaurant with that id, so that it only needs the fields that changed). A restaurant that has
+        closed (is_open is 0) or no longer passes keep is removed instead, and a new business that is closed or
+        does not pass keep is skipped. Each of deletes is the business id of a restaurant to remove (ignored if
+        there is none). Removed restaurants leave the catalogue, the decision tree (whose emptied branches are
+        pruned) and the graph; the rows of the tree use the cuisine list the catalogue was loaded with.
+
+        This takes time proportional to the size of the delta, not of the catalogue. Every upsert is checked
+        before any of them is applied, changing nothing if one is invalid: raise a ValueError if its is_open is
+        not an integer, and a KeyError if it is a new restaurant missing one of record_implement.FIELDS that a
+        record needs.
+        """
+        with self._lock:
+            extractor = compile_extractor(tuple(self.catalogue.cuisines))
+            records = []
+            for business in upserts:
+                old = self.catalogue.by_id.get(business['business_id'])
+                merged = dict(business) if old is None else {**{key: old.get(key) for key in old}, **business}
+                wanted = is_open(merged) and keep(merged)
+                records.append((Restaurant(merged, self.catalogue.strings) if wanted else merged, old is not None))
+
+            counts = {'added': 0, 'updated': 0, 'removed': 0, 'ignored': 0, 'skipped': 0}
+            for business_id in deletes:
+                counts['removed' if self._remove(business_id, extractor) else 'ignored'] += 1
+            for record, known in records:
+                if not isinstance(record, Restaurant):
+                    if not known:
+                        counts['skipped'] += 1
+                    else:
+                        counts['removed' if self._remove(record['business_id'], extractor) else 'ignored'] += 1
+                    continue
+                old = self.catalogue.upsert(record)
+                if old is not None:
+                    self._remove_row(old, extractor)
+                row = extractor.row(record)
+                if row is not None:
+                    self.decision_tree.insert_sequence(row)
+                counts['added' if old is None else 'updated'] += 1
+            return counts
+
+    def _remove(self, business_id: str, extractor: FeatureExtractor) -> bool:
+        """Remove the restaurant with the given business id from the catalogue, decision tree and graph, and
+        return whether there was one.
+        """
+        old = self.catalogue.remove(business_id)
+        if old is None:
+            return False
+        self._remove_row(old, extractor)
+        self.graph.remove_vertex(business_id)
+        return True
+
+    def _remove_row(self, business: Restaurant | dict, extractor: FeatureExtractor) -> None:
+        """Remove the row of business (as extractor makes it) from the decision tree, if it has one."""
+        row = extractor.row(business)
+        if row is not None:
+            self.decision_tree.remove_sequence(row)
+
+    def add_user(self, user: str, restaurants: list) -> None:
+        """Add user to the graph with the given restaurants (business ids)."""
+        with self._lock:
+            self.graph.user_to_restaurant(user, [r for r in restaurants if r in self.catalogue.by_id])
+
+    def make_friend(self, user: str, friend: str, restaurants: list) -> None:
+        """Add user to the graph with the given restaurants (business ids), and make them friend's friend.
+
+        Raise a ValueError (changing nothing) if friend is not a user in the graph, or is user.
+        """
+        if user == friend:
+            raise ValueError(f'{user} cannot be their own friend')
+        with self._lock:
+            try:
+                is_user = self.graph.get_kind(friend) == 'user'
+            except ValueError:
+                is_user = False
+            if not is_user:
+                raise ValueError(f'there is no user named {friend}')
+            self.add_user(user, restaurants)
+            self.graph.make_friend(user, friend)
+
+    def friend_restaurants(self, friend: str) -> list[Restaurant | dict]:
+        """Return the restaurants friend has been to.
+
+        Raise a ValueError if friend is not in the graph.
+        """
+        with self._lock:
+            return self.graph.get_friend_restaurants(friend, self.catalogue.by_id)
+
+    def recommended_restaurants(self, user: str, k: int = 10) -> list[Restaurant | dict]:
+        """Return the k restaurants recommended to user through the people who go to the same restaurants (and
+        their friends), best first (see Graph.get_recommended_restaurants).
+
+        Raise a ValueError if user is not a user in the graph.
+        """
+        with self._lock:
+            try:
+                is_user = self.graph.get_kind(user) == 'user'
+            except ValueError:
+                is_user = False
+            if not is_user:
+                raise ValueError(f'there is no user named {user}')
+            return self.graph.get_recommended_restaurants(user, self.catalogue.by_id, k)
+
+    def add_to_map(self, map_builder: map_implement.MapBuilder, restaurants: list[Restaurant | dict],
+                   category: str) -> None:
+        """Add the restaurants that users have been to to map_builder in category, with their users."""
+        with self._lock:
+            self.graph.show_restaurants_connected(map_builder, restaurants, category)
+
+    def users(self) -> set[str]:
+        """Return the names of the users in the graph."""
+        with self._lock:
+            return self.graph.get_all_vertices('user')
+
+
+def load_service(zip_file: str = YELP_ZIP, json_file: str = YELP_JSON, cuisine_file: str = CUISINE_FILE,
+                 user_amount: int = 30, max_restaurants_per_user: int = 5,
+                 user_data: Optional[list[dict]] = None) -> RecommendationService:
+    """Load the restaurants (through the snapshot, as in main.py), build the decision tree, and load a graph of
+    user_data, or of user_amount generated users if user_data is None.
+    """
+    snapshot = snapshot_implement.load_or_build(zip_file, json_file, cuisine_file)
+    catalogue = catalogue_implement.catalogue_from(snapshot)
+    decision_tree = tree_implement.make_tree_from_rows(snapshot.rows())
+    return service_from(catalogue, decision_tree, user_amount, max_restaurants_per_user, user_data)
+
+
+def service_from(catalogue: catalogue_implement.RestaurantCatalogue, decision_tree: Any, user_amount: int = 30,
+                 max_restaurants_per_user: int = 5,
+                 user_data: Optional[list[dict]] = None) -> RecommendationService:
+    """Return a service answering from catalogue and decision_tree, with a graph of user_data, or of
+    user_amount users generated from catalogue if user_data is None.
+    """
+    if user_data is None:
+        user_data = name_implement.generate_users(user_amount, max_restaurants_per_user, catalogue)
+    graph = graph_implement.Graph()
+    graph.load_restaurant_graph(catalogue.by_id, user_data)
+    return RecommendationService(catalogue, decision_tree, graph)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["threading", "catalogue_implement", "graph_implement", "map_implement", "name_implement",
+                          "ranking_implement", "shard_implement", "snapshot_implement", "tree_implement",
+                          "cache_implement", "feature_implement", "record_implement"]
+    })
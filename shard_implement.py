@@ -0,0 +1,238 @@
+"""Restaurants of every city in the Yelp dataset, split into one shard per city and loaded only when needed.
+
+One pass over the Yelp dump copies every restaurant (or food business) into a single data file, and records
+in an index which lines of that file belong to each city. A city's shard (its catalogue, decision tree and
+spatial index) is built from just its lines the first time it is asked for, and only the most recently used
+shards are kept in memory.
+
+RecommendationService.in_city answers queries about any of these cities from its shard, which is how the
+server (run with --shards) serves several cities from one process. Nashville itself is still answered from its
+snapshot, and main.py only serves Nashville.
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Optional
+
+import catalogue_implement
+import graph_implement
+import snapshot_implement
+import tree_implement
+
+# Increase this whenever the layout of the data file or index changes, so that old shards are rebuilt
+VERSION = 1
+
+DATA_FILE = 'restaurants.jsonl'
+INDEX_FILE = 'index.json'
+
+# The key of the Nashville shard, the only city whose areas are known by name
+NASHVILLE = 'nashville, TN'
+
+
+def city_key(city: str, state: str) -> str:
+    """Return the key of the shard for city in state, which ignores case and extra spaces in the city name.
+
+    >>> city_key('  St.  Petersburg ', 'fl')
+    'st. petersburg, FL'
+    """
+    return f"{' '.join(city.split()).lower()}, {state.strip().upper()}"
+
+
+def build_shards(zip_path: str, json_file_name: str, cuisine_file: str, directory: str) -> None:
+    """Copy the restaurants of every city in the zip at zip_path into the data file in directory, and write the
+    index of each city's lines (and the centre of its restaurants) next to it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    cities: dict[str, dict[str, Any]] = {}
+    data_path = os.path.join(directory, DATA_FILE)
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref, zip_ref.open(json_file_name) as f, \
+            open(data_path + '.tmp', 'wb') as data:
+        for line in f:
+            if not line.strip():
+                continue
+            d = json.loads(line)
+            if not tree_implement.is_restaurant(d):
+                continue
+            key = city_key(d.get('city') or '', d.get('state') or '')
+            if key not in cities:
+                cities[key] = {'city': d.get('city'), 'state': d.get('state'), 'count': 0, 'latitude': 0.0,
+                               'longitude': 0.0, 'offsets': [], 'lengths': []}
+            entry = cities[key]
+            entry['count'] += 1
+            entry['latitude'] += d['latitude']
+            entry['longitude'] += d['longitude']
+            entry['offsets'].append(data.tell())
+            entry['lengths'].append(len(line))
+            data.write(line)
+
+    for entry in cities.values():
+        entry['latitude'] /= entry['count']
+        entry['longitude'] /= entry['count']
+    index = {'version': VERSION, 'source': snapshot_implement.source_key(zip_path, cuisine_file), 'cities': cities}
+    index_path = os.path.join(directory, INDEX_FILE)
+    with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(data_path + '.tmp', data_path)
+    os.replace(index_path + '.tmp', index_path)
+
+
+class CityShard:
+    """The restaurants of one city.
+
+    Instance Attributes:
+        - key: The key of this shard (see city_key).
+        - centroid: The average latitude and longitude of the restaurants in this city.
+        - catalogue: The restaurants in this city, with their cuisine list and spatial index.
+        - decision_tree: The decision tree of the restaurants in this city.
+    """
+    key: str
+    centroid: tuple[float, float]
+    catalogue: catalogue_implement.RestaurantCatalogue
+    decision_tree: Any
+
+    def __init__(self, key: str, centroid: tuple[float, float], r_data: list[dict], cuisine_file: str) -> None:
+        """Initialize the shard of the city with the given key from its restaurants, r_data."""
+        self.key = key
+        self.centroid = centroid
+        cuisines = tree_implement.filter_cuisine(r_data, cuisine_file)
+        self.catalogue = catalogue_implement.RestaurantCatalogue(r_data, cuisines)
+        self.decision_tree = tree_implement.make_tree_from_rows(tree_implement.make_row(r, cuisines)
+                                                                for r in r_data)
+
+    def locate(self, area: Optional[str] = None) -> tuple[float, float]:
+        """Return the latitude and longitude of area in this city.
+
+        Only the areas of Nashville are known by name; anywhere else (or if area is None or unknown), this
+        returns the centre of the city's restaurants.
+        """
+        if self.key == NASHVILLE and area in graph_implement.NASHVILLE_AREAS:
+            return graph_implement.get_lat_lon(area)
+        return self.centroid
+
+
+class ShardedCatalogue:
+    """The restaurants of every city in the Yelp dataset, with the shards of the most recently used cities kept
+    in memory.
+
+    Instance Attributes:
+        - max_resident: The largest number of shards kept in memory at once.
+
+    Representation Invariants:
+        - self.max_resident >= 1
+        - len(self._resident) <= self.max_resident
+    """
+    max_resident: int
+    # Private Instance Attributes:
+    #   - _directory: The directory holding the data file and index.
+    #   - _cuisine_file: The file listing the cuisines the decision trees may offer.
+    #   - _cities: Maps each city's key to its entry in the index.
+    #   - _resident: The shards in memory, least recently used first.
+    #   - _loading:
+    #       Maps the key of each shard being built to the future of its shard, so that every thread asking for
+    #       it while it is being built waits for the same one.
+    #   - _lock: Held while _resident or _loading is read or changed (but not while a shard is built).
+    _directory: str
+    _cuisine_file: str
+    _cities: dict[str, dict[str, Any]]
+    _resident: OrderedDict[str, CityShard]
+    _loading: dict[str, Future]
+    _lock: threading.Lock
+
+    def __init__(self, zip_path: str, json_file_name: str, cuisine_file: str, directory: str = 'shards',
+                 max_resident: int = 4) -> None:
+        """Initialize the catalogue of the shards in directory, building them from the zip at zip_path first if
+        they are missing or out of date.
+        """
+        self.max_resident = max_resident
+        self._directory = directory
+        self._cuisine_file = cuisine_file
+        index = self._read_index()
+        if index is None or index.get('version') != VERSION or \
+                not snapshot_implement.source_matches(index['source'], zip_path, cuisine_file):
+            build_shards(zip_path, json_file_name, cuisine_file, directory)
+            index = self._read_index()
+        self._cities = index['cities']
+        self._resident = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def _read_index(self) -> Optional[dict]:
+        """Return the index in this catalogue's directory, or None if there is none."""
+        try:
+            with open(os.path.join(self._directory, INDEX_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def cities(self) -> dict[str, int]:
+        """Return a mapping of the key of every city to its number of restaurants, most restaurants first."""
+        return {key: entry['count'] for key, entry in
+                sorted(self._cities.items(), key=lambda item: item[1]['count'], reverse=True)}
+
+    def resident(self) -> list[str]:
+        """Return the keys of the shards in memory, least recently used first."""
+        with self._lock:
+            return list(self._resident)
+
+    def shard(self, city: str, state: str) -> CityShard:
+        """Return the shard of city in state, loading it (and evicting the least recently used shard, if there
+        are too many in memory) if it is not in memory.
+
+        A shard is built without holding the lock, so other cities' shards can be returned (or built) meanwhile;
+        threads asking for a shard that is already being built wait for it rather than building it again.
+
+        Raise a KeyError if there are no restaurants in that city.
+        """
+        key = city_key(city, state)
+        with self._lock:
+            if key in self._resident:
+                self._resident.move_to_end(key)
+                return self._resident[key]
+            entry = self._cities[key]
+            building = key not in self._loading
+            if building:
+                self._loading[key] = Future()
+            future = self._loading[key]
+        if not building:
+            return future.result()
+
+        try:
+            shard = CityShard(key, (entry['latitude'], entry['longitude']), self._load(entry), self._cuisine_file)
+        except Exception as error:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(error)
+            raise
+        with self._lock:
+            del self._loading[key]
+            self._resident[key] = shard
+            while len(self._resident) > self.max_resident:
+                self._resident.popitem(last=False)
+        future.set_result(shard)
+        return shard
+
+    def _load(self, entry: dict) -> list[dict]:
+        """Return the restaurants on the lines of the data file listed in entry."""
+        with open(os.path.join(self._directory, DATA_FILE), 'rb') as f:
+            r_data = []
+            for offset, length in zip(entry['offsets'], entry['lengths']):
+                f.seek(offset)
+                r_data.append(json.loads(f.read(length)))
+            return r_data
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["json", "os", "threading", "zipfile", "collections", "concurrent.futures",
+                          "catalogue_implement", "graph_implement", "snapshot_implement", "tree_implement"],
+        'allowed-io': ['build_shards', 'ShardedCatalogue._read_index', 'ShardedCatalogue._load']
+    })
@@ -0,0 +1,173 @@
+"""An index of "people with similar taste": users whose sets of restaurants overlap the most.
+
+Each user's restaurants are summarized by a MinHash signature, whose entries agree between two users with
+probability equal to the Jaccard similarity of their restaurant sets. Signatures are cut into bands, and
+users sharing any whole band land in the same bucket, so a lookup only compares a user against the users in
+their buckets instead of against everyone.
+"""
+from __future__ import annotations
+import hashlib
+import heapq
+from functools import lru_cache
+from typing import AbstractSet, Any, Iterable, Optional
+
+import numpy as np
+
+# The Mersenne prime 2^31 - 1, small enough that (a * h + b) never overflows a 64-bit integer
+_PRIME = (1 << 31) - 1
+
+
+def jaccard(set1: AbstractSet[str], set2: AbstractSet[str]) -> float:
+    """Return the Jaccard similarity of set1 and set2 (sets or frozensets, 0 if both are empty).
+
+    >>> jaccard({'a', 'b', 'c'}, frozenset({'b', 'c', 'd'}))
+    0.5
+    """
+    union = len(set1 | set2)
+    return len(set1 & set2) / union if union else 0.0
+
+
+@lru_cache(maxsize=1 << 16)
+def _item_hash(item: Any) -> int:
+    """Return a hash of item below _PRIME that is the same in every run of the program."""
+    digest = hashlib.blake2b(str(item).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % _PRIME
+
+
+class MinHashLSH:
+    """A banded MinHash index of the restaurant sets of users.
+
+    Instance Attributes:
+        - num_perm: The length of each signature.
+        - bands: The number of bands each signature is cut into.
+
+    Representation Invariants:
+        - self.num_perm % self.bands == 0
+        - self._restaurants.keys() == self._signatures.keys()
+    """
+    num_perm: int
+    bands: int
+    # Private Instance Attributes:
+    #   - _a, _b: The coefficients of the num_perm hash functions h -> (a * h + b) mod _PRIME.
+    #   - _restaurants: Maps each user in the index to their set of restaurants.
+    #   - _signatures: Maps each user in the index to their signature.
+    #   - _buckets: For each band, maps the band of a signature to the users whose signatures have it.
+    _a: np.ndarray
+    _b: np.ndarray
+    _restaurants: dict[Any, frozenset]
+    _signatures: dict[Any, np.ndarray]
+    _buckets: list[dict[bytes, set]]
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, seed: int = 1) -> None:
+        """Initialize an empty index with signatures of length num_perm cut into the given number of bands.
+
+        With more bands, less similar users are found (at the cost of more comparisons): two users are likely
+        to share a bucket once their similarity is above about (1 / bands) ** (bands / num_perm).
+
+        Preconditions:
+            - num_perm % bands == 0
+        """
+        self.num_perm = num_perm
+        self.bands = bands
+        generator = np.random.default_rng(seed)
+        self._a = generator.integers(1, _PRIME, num_perm, dtype=np.int64)
+        self._b = generator.integers(0, _PRIME, num_perm, dtype=np.int64)
+        self._restaurants = {}
+        self._signatures = {}
+        self._buckets = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        """Return the number of users in this index."""
+        return len(self._signatures)
+
+    def __contains__(self, user: Any) -> bool:
+        """Return whether user is in this index."""
+        return user in self._signatures
+
+    def signature(self, restaurants: Iterable) -> np.ndarray:
+        """Return the MinHash signature of a set of restaurants."""
+        hashes = np.array([_item_hash(r) for r in set(restaurants)], dtype=np.int64)
+        if len(hashes) == 0:
+            return np.full(self.num_perm, _PRIME, dtype=np.int64)
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def _bands(self, signature: np.ndarray) -> list[bytes]:
+        """Return the bucket key of each band of signature."""
+        return [band.tobytes() for band in np.split(signature, self.bands)]
+
+    def insert(self, user: Any, restaurants: Iterable) -> None:
+        """Add user, who has been to the given restaurants, to this index (replacing them if already there)."""
+        if user in self._signatures:
+            self.remove(user)
+        restaurants = frozenset(restaurants)
+        signature = self.signature(restaurants)
+        self._restaurants[user] = restaurants
+        self._signatures[user] = signature
+        for buckets, key in zip(self._buckets, self._bands(signature)):
+            buckets.setdefault(key, set()).add(user)
+
+    def remove(self, user: Any) -> None:
+        """Remove user from this index, if they are in it."""
+        if user not in self._signatures:
+            return
+        for buckets, key in zip(self._buckets, self._bands(self._signatures.pop(user))):
+            buckets[key].discard(user)
+            if not buckets[key]:
+                del buckets[key]
+        del self._restaurants[user]
+
+    def query(self, restaurants: Iterable, k: int = 10, exclude: Optional[Any] = None) -> list[tuple[Any, float]]:
+        """Return up to k (user, similarity) pairs for the users whose restaurants are most similar to the
+        given restaurants, most similar first.
+
+        Only users sharing a bucket with the restaurants are compared (by exact Jaccard similarity), and
+        the user exclude is left out.
+        """
+        restaurants = frozenset(restaurants)
+        candidates = set()
+        for buckets, key in zip(self._buckets, self._bands(self.signature(restaurants))):
+            candidates.update(buckets.get(key, ()))
+        candidates.discard(exclude)
+        scored = ((user, jaccard(restaurants, self._restaurants[user])) for user in candidates)
+        return heapq.nlargest(k, scored, key=lambda pair: pair[1])
+
+    def similar_users(self, user: Any, k: int = 10) -> list[tuple[Any, float]]:
+        """Return up to k (user, similarity) pairs for the users most similar to user, most similar first.
+
+        Raise a ValueError if user is not in this index.
+        """
+        if user not in self._restaurants:
+            raise ValueError
+        return self.query(self._restaurants[user], k, exclude=user)
+
+
+def from_users(user_data: list[dict], **options: Any) -> MinHashLSH:
+    """Return an index of the users in user_data (as generated by name_implement.generate_users)."""
+    index = MinHashLSH(**options)
+    for user in user_data:
+        for user_name, restaurants in user.items():
+            index.insert(user_name, restaurants)
+    return index
+
+
+def from_graph(graph: Any, **options: Any) -> MinHashLSH:
+    """Return an index of the users in graph, which is kept up to date as graph.user_to_restaurant adds users.
+
+    graph must be a graph_implement.Graph.
+    """
+    index = MinHashLSH(**options)
+    for user in graph.get_all_vertices('user'):
+        index.insert(user, [item for item in graph.get_neighbours(user) if graph.get_kind(item) == 'restaurant'])
+    graph.add_user_listener(index.insert)
+    return index
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["hashlib", "heapq", "functools", "numpy"]
+    })
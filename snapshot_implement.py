@@ -0,0 +1,323 @@
+"""A columnar on-disk snapshot of the filtered restaurant data, so that later runs can skip the Yelp dump.
+
+The snapshot file holds the output of filter_businesses_nashville together with the fields make_tree derives
+from each restaurant. It is laid out as:
+
+    MAGIC | header length (8 bytes, little endian) | JSON header | column data
+
+Numeric columns are stored as raw arrays, categorical columns as one byte per restaurant indexing into a list
+of values kept in the header, and string columns as an array of offsets into a block of utf-8 text. The file
+is memory-mapped when it is opened, so a column is only read from disk when it is used.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import mmap
+import os
+from array import array
+from typing import Any, Iterator, Optional
+
+from feature_implement import compile_extractor
+import ingest_implement
+import record_implement
+import tree_implement
+
+MAGIC = b'CCSNAP1\n'
+
+# Increase this whenever the way the stored fields are derived changes, so that old snapshots are rebuilt
+VERSION = 5
+
+# The raw Yelp attributes that make_tree reads
+ATTRIBUTE_KEYS = record_implement.ATTRIBUTE_KEYS
+
+# The derived fields, in the order they appear in a make_row row (the business id comes last)
+DERIVED_FIELDS = ['cuisine', 'takeout', 'stars_bucket', 'alcohol', 'wifi', 'credit_card', 'groups', 'price']
+
+STRING_FIELDS = ['business_id', 'name', 'categories', 'city', 'state']
+FLOAT_FIELDS = ['latitude', 'longitude', 'stars']
+INT_FIELDS = ['review_count', 'is_open']
+
+# Categorical columns use code 255 for a missing value
+_MISSING = 255
+
+
+def file_sha256(path: str) -> str:
+    """Return the hex SHA-256 digest of the file at path."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_key(zip_path: str, cuisine_file: str) -> dict:
+    """Return the size, modification time and hash of the files a snapshot is built from."""
+    stat = os.stat(zip_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(zip_path),
+            'cuisines_sha256': file_sha256(cuisine_file)}
+
+
+class Snapshot:
+    """A memory-mapped columnar snapshot of the filtered restaurant data.
+
+    Instance Attributes:
+        - header: The decoded JSON header of the snapshot file.
+        - cuisines: The cuisine list (as returned by filter_cuisine) used to derive the cuisine column.
+
+    Representation Invariants:
+        - all(len(self.column(name)) == len(self) for name in self.header['columns'])
+    """
+    header: dict
+    cuisines: list[str]
+    # Private Instance Attributes:
+    #   - _map: The memory map over the snapshot file.
+    #   - _data_start: The offset of the first column in the file.
+    _map: mmap.mmap
+    _data_start: int
+
+    def __init__(self, path: str) -> None:
+        """Open and memory-map the snapshot at path.
+
+        Raise a ValueError if path is not a snapshot file (including if it is empty).
+        """
+        # The map keeps its own handle on the file, so the file itself can be closed straight away
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._map[:len(MAGIC)] != MAGIC:
+                raise ValueError('wrong magic number')
+            header_length = int.from_bytes(self._map[len(MAGIC):len(MAGIC) + 8], 'little')
+            header_start = len(MAGIC) + 8
+            self.header = json.loads(self._map[header_start:header_start + header_length])
+            self.cuisines = self.header['cuisines']
+            self._data_start = header_start + header_length
+        except (ValueError, KeyError) as error:
+            self._map.close()
+            raise ValueError(f'{path} is not a restaurant snapshot') from error
+
+    def __len__(self) -> int:
+        """Return the number of restaurants in this snapshot."""
+        return self.header['count']
+
+    def close(self) -> None:
+        """Release the memory map of the snapshot file."""
+        self._map.close()
+
+    def _view(self, offset: int, length: int, typecode: str) -> memoryview:
+        """Return a view of length bytes at offset (relative to the column data) cast to typecode."""
+        start = self._data_start + offset
+        return memoryview(self._map)[start:start + length].cast(typecode)
+
+    def column(self, name: str) -> Any:
+        """Return the column called name.
+
+        Numeric columns are returned as memoryviews over the file, categorical columns as lists of values,
+        and string columns as a _StringColumn that decodes each entry when it is indexed.
+        """
+        spec = self.header['columns'][name]
+        if spec['type'] == 'str':
+            offsets = self._view(spec['offset'], spec['offsets_length'], 'q')
+            text = self._view(spec['offset'] + spec['offsets_length'], spec['text_length'], 'B')
+            return _StringColumn(offsets, text)
+        elif spec['type'] == 'cat':
+            values = spec['values']
+            codes = self._view(spec['offset'], spec['length'], 'B')
+            return [None if code == _MISSING else values[code] for code in codes]
+        else:
+            return self._view(spec['offset'], spec['length'], spec['type'])
+
+    def records(self) -> list[dict]:
+        """Return the restaurants as dictionaries with the same keys (and the same attributes) as the Yelp data
+        that make_tree and the graph read.
+        """
+        columns = {name: self.column(name) for name in STRING_FIELDS + FLOAT_FIELDS + INT_FIELDS}
+        attributes = {key: self.column(key) for key in ATTRIBUTE_KEYS}
+        has_attributes = self.column('has_attributes')
+        records = []
+        for i in range(len(self)):
+            r = {name: columns[name][i] for name in columns}
+            if has_attributes[i]:
+                r['attributes'] = {key: attributes[key][i] for key in ATTRIBUTE_KEYS if attributes[key][i] is not None}
+            else:
+                r['attributes'] = None
+            records.append(r)
+        return records
+
+    def restaurants(self, strings: record_implement.StringTable) -> list[record_implement.Restaurant]:
+        """Return the restaurants as compact records (see record_implement) keeping their strings in strings,
+        which take much less memory than the dictionaries returned by records.
+        """
+        return [record_implement.Restaurant(r, strings) for r in self.records()]
+
+    def rows(self) -> Iterator[Optional[list]]:
+        """Yield the make_row row of every restaurant (or None if it is not in the decision tree), without
+        deriving anything again.
+        """
+        derived = [self.column(name) for name in DERIVED_FIELDS]
+        business_ids = self.column('business_id')
+        for i in range(len(self)):
+            if derived[0][i] is None:
+                yield None
+            else:
+                yield [column[i] for column in derived if column[i] is not None] + [business_ids[i]]
+
+
+class _StringColumn:
+    """A column of strings stored as utf-8 text with an array of offsets into it."""
+    # Private Instance Attributes:
+    #   - _offsets: entry i is the text between _offsets[i] and _offsets[i + 1]
+    #   - _text: the utf-8 text of every entry, concatenated
+    _offsets: memoryview
+    _text: memoryview
+
+    def __init__(self, offsets: memoryview, text: memoryview) -> None:
+        self._offsets = offsets
+        self._text = text
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self._text[self._offsets[i]:self._offsets[i + 1]]).decode('utf-8')
+
+
+def _categorical(values: list[Optional[str]]) -> tuple[list[str], bytes]:
+    """Dictionary-encode values into a list of distinct values and one code byte per value."""
+    distinct: dict[str, int] = {}
+    codes = bytearray()
+    for value in values:
+        if value is None:
+            codes.append(_MISSING)
+        else:
+            codes.append(distinct.setdefault(value, len(distinct)))
+    if len(distinct) >= _MISSING:
+        raise ValueError('too many distinct values for a categorical column')
+    return list(distinct), bytes(codes)
+
+
+def _strings(values: list[str]) -> tuple[bytes, bytes]:
+    """Encode values as an offsets array and a block of utf-8 text."""
+    offsets = array('q', [0])
+    text = bytearray()
+    for value in values:
+        text.extend(value.encode('utf-8'))
+        offsets.append(len(text))
+    return offsets.tobytes(), bytes(text)
+
+
+def _encode_columns(r_data: list[dict], header: dict[str, Any]) -> list[bytes]:
+    """Encode the columns of r_data, recording in header where each one starts (and which restaurants the
+    feature extractor dropped), and return the blocks of every column in file order.
+    """
+    blocks = []
+    offset = 0
+
+    def add(name: str, spec: dict, *data: bytes) -> None:
+        nonlocal offset
+        spec['offset'] = offset
+        header['columns'][name] = spec
+        for block in data:
+            blocks.append(block)
+            offset += len(block)
+
+    for name in STRING_FIELDS:
+        offsets, text = _strings([str(r.get(name, '')) for r in r_data])
+        add(name, {'type': 'str', 'offsets_length': len(offsets), 'text_length': len(text)}, offsets, text)
+    for name in FLOAT_FIELDS:
+        data = array('d', [float(r[name]) for r in r_data]).tobytes()
+        add(name, {'type': 'd', 'length': len(data)}, data)
+    for name in INT_FIELDS:
+        data = array('q', [int(r.get(name) or 0) for r in r_data]).tobytes()
+        add(name, {'type': 'q', 'length': len(data)}, data)
+
+    data = bytes(isinstance(r.get('attributes'), dict) for r in r_data)
+    add('has_attributes', {'type': 'B', 'length': len(data)}, data)
+    for key_name in ATTRIBUTE_KEYS:
+        values, codes = _categorical([r['attributes'].get(key_name) if isinstance(r.get('attributes'), dict)
+                                      else None for r in r_data])
+        add(key_name, {'type': 'cat', 'values': values, 'length': len(codes)}, codes)
+
+    rows, dropped = compile_extractor(tuple(header['cuisines'])).extract_all(r_data)
+    header['dropped'] = dict(dropped)
+    for i, name in enumerate(DERIVED_FIELDS):
+        values, codes = _categorical([None if row is None else row[i] for row in rows])
+        add(name, {'type': 'cat', 'values': values, 'length': len(codes)}, codes)
+    return blocks
+
+
+def build_snapshot(zip_path: str, json_file_name: str, cuisine_file: str, snapshot_path: str,
+                   workers: int = 1) -> None:
+    """Stream the Nashville restaurants out of zip_path and write them to a snapshot at snapshot_path.
+
+    The dump is decoded in this process unless more workers are asked for (see ingest_implement.load_restaurants).
+    """
+    key = source_key(zip_path, cuisine_file)
+    r_data = ingest_implement.load_restaurants(zip_path, json_file_name, workers)
+    cuisine_list = tree_implement.filter_cuisine(r_data, cuisine_file)
+
+    header: dict[str, Any] = {'version': VERSION, 'source': key, 'count': len(r_data), 'cuisines': cuisine_list,
+                              'columns': {}}
+    blocks = _encode_columns(r_data, header)
+
+    encoded_header = json.dumps(header).encode('utf-8')
+    temp_path = snapshot_path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(encoded_header).to_bytes(8, 'little'))
+        f.write(encoded_header)
+        for block in blocks:
+            f.write(block)
+    os.replace(temp_path, snapshot_path)
+
+
+def is_current(snapshot: Snapshot, zip_path: str, cuisine_file: str) -> bool:
+    """Return whether snapshot was built by this version of the code from the current contents of zip_path and
+    cuisine_file (see source_matches).
+    """
+    return snapshot.header.get('version') == VERSION and source_matches(snapshot.header['source'], zip_path,
+                                                                        cuisine_file)
+
+
+def source_matches(source: dict, zip_path: str, cuisine_file: str) -> bool:
+    """Return whether source (as returned by source_key) still describes zip_path and cuisine_file.
+
+    The size and modification time of the zip are checked first; the (slower) hash is only computed when
+    they differ, so a zip that was merely touched or copied does not count as changed.
+    """
+    if source['cuisines_sha256'] != file_sha256(cuisine_file):
+        return False
+    stat = os.stat(zip_path)
+    if stat.st_size != source['size']:
+        return False
+    elif stat.st_mtime_ns == source['mtime_ns']:
+        return True
+    else:
+        return file_sha256(zip_path) == source['sha256']
+
+
+def load_or_build(zip_path: str, json_file_name: str, cuisine_file: str,
+                  snapshot_path: str = 'restaurants.snapshot') -> Snapshot:
+    """Return the snapshot at snapshot_path, (re)building it first if it is missing or out of date."""
+    if os.path.exists(snapshot_path):
+        try:
+            snapshot = Snapshot(snapshot_path)
+        except ValueError:
+            pass
+        else:
+            if is_current(snapshot, zip_path, cuisine_file):
+                return snapshot
+            snapshot.close()
+
+    build_snapshot(zip_path, json_file_name, cuisine_file, snapshot_path)
+    return Snapshot(snapshot_path)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["hashlib", "json", "mmap", "os", "array", "feature_implement", "ingest_implement",
+                          "record_implement", "tree_implement"],
+        'allowed-io': ['file_sha256', 'build_snapshot', 'Snapshot.__init__']
+    })
@@ -0,0 +1,167 @@
+"""A spatial index of restaurants, for finding the ones near a location without measuring the distance to all of them.
+
+Restaurants are bucketed into a uniform grid of latitude/longitude cells. A query only looks at the cells
+overlapping the bounding box of its search circle, discards candidates with a cheap haversine distance, and
+computes the exact (ellipsoidal) geodesic distance only for the candidates that survive.
+"""
+from __future__ import annotations
+import heapq
+import itertools
+import math
+from typing import Callable, Iterable, Optional
+
+from geopy.distance import geodesic
+
+# Mean radius of the Earth, used by the haversine distance
+EARTH_RADIUS_KM = 6371.0088
+
+# Kilometres in one degree of latitude
+KM_PER_DEGREE = 111.32
+
+# The haversine distance can differ from the geodesic one by up to about 0.5%, so candidates are kept if their
+# haversine distance is within this factor of the radius
+HAVERSINE_SLACK = 1.01
+
+
+def haversine_km(location1: tuple[float, float], location2: tuple[float, float]) -> float:
+    """Return the great-circle distance in kilometres between two (latitude, longitude) locations."""
+    lat1, lon1 = math.radians(location1[0]), math.radians(location1[1])
+    lat2, lon2 = math.radians(location2[0]), math.radians(location2[1])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class SpatialIndex:
+    """A uniform latitude/longitude grid of restaurants.
+
+    Instance Attributes:
+        - cell_degrees: The width and height of each grid cell, in degrees.
+
+    Representation Invariants:
+        - self.cell_degrees > 0
+        - all(self._cell(b['latitude'], b['longitude']) == cell for cell, bs in self._cells.items() for b in bs)
+    """
+    cell_degrees: float
+    # Private Instance Attributes:
+    #   - _cells: Maps the (row, column) of each non-empty cell to the restaurants inside it.
+    #   - _bounds:
+    #       The lowest row, lowest column, highest row and highest column of every cell a restaurant has been
+    #       added to (cells emptied by remove are not taken out), or None if none has been.
+    _cells: dict[tuple[int, int], list[dict]]
+    _bounds: Optional[tuple[int, int, int, int]]
+
+    def __init__(self, businesses: Iterable[dict] = (), cell_km: float = 1.0) -> None:
+        """Initialize an index of businesses using cells about cell_km kilometres tall."""
+        self.cell_degrees = cell_km / KM_PER_DEGREE
+        self._cells = {}
+        self._bounds = None
+        for business in businesses:
+            self.add(business)
+
+    def _cell(self, latitude: float, longitude: float) -> tuple[int, int]:
+        """Return the (row, column) of the cell containing the given location."""
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def add(self, business: dict) -> None:
+        """Add business to this index."""
+        cell = self._cell(business['latitude'], business['longitude'])
+        self._cells.setdefault(cell, []).append(business)
+        row, column = cell
+        if self._bounds is None:
+            self._bounds = (row, column, row, column)
+        else:
+            low_row, low_column, high_row, high_column = self._bounds
+            self._bounds = (min(low_row, row), min(low_column, column), max(high_row, row), max(high_column, column))
+
+    def remove(self, business: dict) -> None:
+        """Remove the business with the id of business (at the location of business) from this index.
+
+        Do nothing if it is not there. This takes time proportional to the number of restaurants in its cell.
+        """
+        cell = self._cell(business['latitude'], business['longitude'])
+        businesses = self._cells.get(cell, [])
+        for i, other in enumerate(businesses):
+            if other['business_id'] == business['business_id']:
+                businesses.pop(i)
+                if not businesses:
+                    del self._cells[cell]
+                return
+
+    def candidates(self, location: tuple[float, float], radius_km: float) -> Iterable[dict]:
+        """Yield the restaurants in the cells overlapping the bounding box of the circle of radius_km around
+        location (a superset of the restaurants inside the circle).
+
+        The bounding box is clipped to the cells restaurants have been added to, and if it still covers more
+        cells than are non-empty, the non-empty cells are scanned instead, so a huge radius costs no more than
+        looking at every restaurant.
+
+        Preconditions:
+            - math.isfinite(radius_km) and radius_km >= 0
+        """
+        low_row, low_column, high_row, high_column = self._box(location, radius_km)
+        rows, columns = range(low_row, high_row + 1), range(low_column, high_column + 1)
+        if len(rows) * len(columns) > len(self._cells):
+            cells: Iterable[tuple[int, int]] = [(row, column) for row, column in self._cells
+                                                if row in rows and column in columns]
+        else:
+            cells = itertools.product(rows, columns)
+        for cell in cells:
+            yield from self._cells.get(cell, ())
+
+    def _box(self, location: tuple[float, float], radius_km: float) -> tuple[int, int, int, int]:
+        """Return the lowest row, lowest column, highest row and highest column of the cells overlapping the
+        bounding box of the circle of radius_km around location, clipped to self._bounds (an empty range if
+        this index is empty).
+        """
+        if self._bounds is None:
+            return 0, 0, -1, -1
+        latitude, longitude = location
+        lat_degrees = min(radius_km / KM_PER_DEGREE, 90.0)
+        cos_latitude = max(math.cos(math.radians(latitude)), 1e-6)
+        lon_degrees = min(radius_km / (KM_PER_DEGREE * cos_latitude), 180.0)
+        low_row, low_column = self._cell(latitude - lat_degrees, longitude - lon_degrees)
+        high_row, high_column = self._cell(latitude + lat_degrees, longitude + lon_degrees)
+        return (max(low_row, self._bounds[0]), max(low_column, self._bounds[1]),
+                min(high_row, self._bounds[2]), min(high_column, self._bounds[3]))
+
+    def _distances(self, location: tuple[float, float], radius_km: float,
+                   where: Optional[Callable[[dict], bool]] = None) -> list[tuple[float, dict]]:
+        """Return (geodesic distance, restaurant) for every restaurant within radius_km of location for which
+        where(restaurant) is True (every restaurant if where is None), in no particular order.
+        """
+        cutoff = radius_km * HAVERSINE_SLACK
+        results = []
+        for business in self.candidates(location, radius_km):
+            if where is not None and not where(business):
+                continue
+            b_location = (business['latitude'], business['longitude'])
+            if haversine_km(location, b_location) <= cutoff:
+                distance = geodesic(location, b_location).kilometers
+                if distance <= radius_km:
+                    results.append((distance, business))
+        return results
+
+    def within(self, location: tuple[float, float], radius_km: float = 1.0,
+               where: Optional[Callable[[dict], bool]] = None) -> list[tuple[float, dict]]:
+        """Return (distance, restaurant) for every restaurant within radius_km of location, nearest first.
+
+        Distances are geodesic distances in kilometres. If where is given, only the restaurants for which
+        where(restaurant) is True are measured and returned.
+        """
+        return sorted(self._distances(location, radius_km, where), key=lambda result: result[0])
+
+    def nearest(self, location: tuple[float, float], k: int, radius_km: float = 1.0,
+                where: Optional[Callable[[dict], bool]] = None) -> list[tuple[float, dict]]:
+        """Return (distance, restaurant) for the k restaurants nearest to location within radius_km (for which
+        where(restaurant) is True, if where is given), nearest first.
+        """
+        return heapq.nsmallest(k, self._distances(location, radius_km, where), key=lambda result: result[0])
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ["heapq", "itertools", "math", "geopy.distance"]
+    })
@@ -1,11 +1,15 @@
 """Tree time!"""
 from __future__ import annotations
+import itertools
 import zipfile
 import json
-from typing import Any, Optional
-import os
+from typing import Any, Iterable, Iterator, Optional
 
 from python_ta.contracts import check_contracts
+from category_implement import CategoryStats
+from feature_implement import compile_extractor
+from index_implement import ANY, AttributeIndex
+from record_implement import Restaurant
 
 
 @check_contracts
@@ -61,9 +65,28 @@ class Tree:
 
             curr_subtree.insert_sequence(items[1:])
 
-    def match_user_restaurant(self, user_input: list) -> list:
+    def remove_sequence(self, items: list) -> bool:
+        """Remove the chain of descendants given by items from this tree, along with any subtree that is left
+        with no descendants, and return whether the chain was in this tree.
+
+        The chain must end at a leaf: if items is empty, or only the start of longer chains, nothing is removed
+        and False is returned.
+        """
+        if not items:
+            return False
+
+        for i, sub in enumerate(self._subtrees):
+            if sub._root == items[0]:
+                removed = sub.remove_sequence(items[1:]) if len(items) > 1 else not sub._subtrees
+                if removed and not sub._subtrees:
+                    self._subtrees.pop(i)
+                return removed
+
+        return False
+
+    def match_user_restaurant(self, user_input: list, limit: int = 10) -> list:
         """This function traverses restaurant data tree to determine the possible restaurant(s) that match the
-        user input, and print the result.
+        user input (up to limit of them), and print the result.
         """
 
         if len(user_input) <= 0 and not self._subtrees:
@@ -75,7 +98,7 @@ class Tree:
             accum = 0
             for r_tree in self._subtrees:
                 accum += 1
-                if accum <= 10:
+                if accum <= limit:
                     possible_restaurants.append(r_tree._root)
                 else:
                     break
@@ -92,186 +115,256 @@ class Tree:
             if curr_subtree == self._subtrees:
                 return []
             else:
-                return curr_subtree.match_user_restaurant(user_input[1:])
+                return curr_subtree.match_user_restaurant(user_input[1:], limit)
 
 
-def unzip_data(zip_path: str, json_file_name: str) -> list:
-    """Get json data (all business data from yelp)."""
+class DecisionTree:
+    """A decision tree of restaurant attributes, stored as a trie whose nodes keep their children in a dict.
+
+    This offers the same insert_sequence and match_user_restaurant methods as Tree, but finding a child is
+    a dictionary lookup instead of a scan over a list, and both methods walk down the tree in a loop instead
+    of recursing on a copy of the remaining items.
+
+    Representation Invariants:
+        - all(child._root == item for item, child in self._children.items())
+    """
+    # Private Instance Attributes:
+    #   - _root:
+    #       The item stored at this node.
+    #   - _children:
+    #       Maps the item of each child of this node to that child, in the order the children were inserted.
+    #
+    # Nodes are not checked with check_contracts, since there are tens of thousands of them and every
+    # insert and lookup visits one node per attribute.
+    __slots__: tuple[str, ...] = ('_root', '_children')
+    _root: Any
+    _children: dict[Any, DecisionTree]
+
+    def __init__(self, root: Any) -> None:
+        """Initialize a new node storing root, with no children."""
+        self._root = root
+        self._children = {}
+
+    def insert_sequence(self, items: Iterable) -> None:
+        """Insert the given items into this tree, forming a chain of descendants. Pathways with sequences in
+        common follow the same path until they eventually diverge.
+        """
+        node = self
+        for item in items:
+            child = node._children.get(item)
+            if child is None:
+                child = DecisionTree(item)
+                node._children[item] = child
+            node = child
+
+    def remove_sequence(self, items: Iterable) -> bool:
+        """Remove the chain of descendants given by items from this tree, pruning every node that is left with
+        no children, and return whether the chain was in this tree.
+
+        The chain must end at a leaf: if items is empty, or only the start of longer chains, nothing is removed
+        and False is returned.
+        """
+        path = []
+        node = self
+        for item in items:
+            child = node._children.get(item)
+            if child is None:
+                return False
+            path.append((node, item))
+            node = child
+        if not path or node._children:
+            return False
+        for parent, item in reversed(path):
+            if parent._children[item]._children:
+                break
+            del parent._children[item]
+        return True
+
+    def find(self, items: Iterable) -> Optional[DecisionTree]:
+        """Return the node reached by following items down from this node, or None if there is no such path."""
+        node = self
+        for item in items:
+            child = node._children.get(item)
+            if child is None:
+                return None
+            node = child
+        return node
+
+    def match_user_restaurant(self, user_input: list, limit: int = 10) -> list:
+        """Return (up to limit of) the restaurants whose attributes are exactly user_input, in the order they
+        were inserted.
+        """
+        node = self.find(user_input)
+        if node is None:
+            return []
+        return list(itertools.islice(node._children, limit))
+
+    def match_all(self, user_input: list) -> list:
+        """Return every restaurant whose attributes are exactly user_input, in the order they were inserted."""
+        node = self.find(user_input)
+        return [] if node is None else list(node._children)
+
+
+class RestaurantTree(DecisionTree):
+    """The root of a DecisionTree of restaurant rows, which also indexes the rows by attribute so that user
+    input may contain wildcards.
+
+    Any attribute of the user input may be ANY ("doesn't matter"). Rather than fanning out over every child
+    of the tree at that level, such input is answered by intersecting the bitsets of the specified attributes
+    in an AttributeIndex. Input without wildcards is matched by walking down the tree as before.
+
+    Instance Attributes:
+        - index: The rows of this tree, indexed by the value of each attribute.
+    """
+    __slots__: tuple[str, ...] = ('index',)
+    index: AttributeIndex
+
+    def __init__(self, root: Any = '', num_attributes: int = 8) -> None:
+        """Initialize an empty tree for rows with num_attributes attributes followed by a restaurant."""
+        super().__init__(root)
+        self.index = AttributeIndex(num_attributes)
+
+    def insert_sequence(self, items: Iterable) -> None:
+        """Insert the given items into this tree and its index."""
+        row = list(items)
+        super().insert_sequence(row)
+        self.index.add(row)
+
+    def remove_sequence(self, items: Iterable) -> bool:
+        """Remove the given items from this tree and its index, and return whether they were in the tree."""
+        row = list(items)
+        removed = super().remove_sequence(row)
+        if removed:
+            self.index.remove(row[-1])
+        return removed
+
+    def match_user_restaurant(self, user_input: list, limit: int = 10) -> list:
+        """Return (up to limit of) the restaurants matching user_input, in the order they were inserted.
+
+        Any attribute of user_input may be ANY, which matches every value of that attribute.
+        """
+        if ANY in user_input:
+            return self.index.match(user_input, limit)
+        return super().match_user_restaurant(user_input, limit)
+
+    def match_all(self, user_input: list) -> list:
+        """Return every restaurant matching user_input (which may contain ANY), in the order they were inserted.
+        """
+        if ANY in user_input:
+            return self.index.match(user_input, None)
+        return super().match_all(user_input)
+
 
+def stream_data(zip_path: str, json_file_name: str) -> Iterator[dict]:
+    """Yield each business in json_file_name, decoded one line at a time from inside the zip at zip_path.
+
+    Nothing is extracted to disk: the member is read straight out of the archive.
+    """
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extract(json_file_name)
+        with zip_ref.open(json_file_name) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def unzip_data(zip_path: str, json_file_name: str) -> list:
+    """Get json data (all business data from yelp).
+
+    Prefer stream_restaurants_nashville when only the Nashville restaurants are needed, since this
+    keeps every business in memory.
+    """
+    return list(stream_data(zip_path, json_file_name))
+
+
+def is_restaurant(d: dict) -> bool:
+    """Return whether the business d is a restaurant (or food business), in any city."""
+    categories = d.get('categories')
+    if categories is None:
+        return False
+    return 'Food' in categories or 'Restaurant' in categories
+
+
+def is_nashville_restaurant(d: dict) -> bool:
+    """Return whether the business d is a restaurant (or food business) in Nashville."""
+    return is_restaurant(d) and d['city'] == 'Nashville'
+
+
+def stream_restaurants_nashville(zip_path: str, json_file_name: str) -> Iterator[dict]:
+    """Yield only the Nashville restaurants in the zipped dataset, filtering while streaming.
+
+    Businesses that fail the filter are dropped as soon as they are decoded, so memory use follows
+    the size of the filtered subset rather than the whole dump.
+    """
+    for d in stream_data(zip_path, json_file_name):
+        if is_nashville_restaurant(d):
+            yield d
 
-    with open(json_file_name, 'r') as f:
-        all_data = [json.loads(line) for line in f]
 
-    return all_data
+def load_restaurants_nashville(zip_path: str, json_file_name: str) -> list:
+    """Return the list of Nashville restaurants in the zipped dataset (see stream_restaurants_nashville)."""
+    return list(stream_restaurants_nashville(zip_path, json_file_name))
 
 
 # filtering the business dataset to get that of only restaurants in Nashville
-def filter_businesses_nashville(all_data: list) -> list:
+def filter_businesses_nashville(all_data: Iterable[dict]) -> list:
     """Filter the dataset to only include restaurants in Nashville."""
-    restaurant_data = []
-    for d in all_data:
-        if d.get('categories') is not None:
-            if ('Food' in d['categories'] or 'Restaurant' in d['categories']) and d['city'] == 'Nashville':
-                restaurant_data.append(d)
+    restaurant_data = [d for d in all_data if is_nashville_restaurant(d)]
 
     assert all(de['city'] == 'Nashville' for de in restaurant_data)
     return restaurant_data
 
 
 # creating a list of cuisines available in the dataset
-def filter_cuisine(r_data: list, cuisine_file: str) -> list:
-    """Return a list of all cuisines present in the r_data based on the cuisines present in cuisine_file."""
-    food_list = []
-    for dictionary in r_data:
-        food_list.extend(dictionary['categories'].split())
-    food_count = {}
-    for food in food_list:
-        if food not in food_count:
-            food_count[food] = food_list.count(food)
+def filter_cuisine(r_data: list, cuisine_file: str, stats: Optional[CategoryStats] = None) -> list:
+    """Return a list of all cuisines present in the r_data based on the cuisines present in cuisine_file.
+
+    A cuisine is present if more than 12 restaurants list a category containing it. Pass the CategoryStats
+    of r_data as stats to reuse them instead of counting the categories again.
+    """
+    if stats is None:
+        stats = CategoryStats(r_data)
     with open(cuisine_file, "r") as f:
-        cuisine = []
-        for line in f:
-            cuisine.append(line.strip())
-    cuisine_list = []
-    for c in cuisine:
-        if c in food_count and food_count[c] > 12:
-            cuisine_list.append(c)
-    return cuisine_list
+        cuisine = [line.strip() for line in f]
+    return stats.more_than(12, cuisine)
+
+
+def make_row(r: Restaurant | dict, cuisine_list: list) -> Optional[list]:
+    """Return the path of r through the decision tree: its attributes in the order the user is asked about
+    them, followed by the restaurant's business id.
+
+    Return None if r is missing any of the attributes. The attributes are read as declared in
+    feature_implement.SCHEMA, with the extractor compiled once for each cuisine_list.
+    """
+    return compile_extractor(tuple(cuisine_list)).row(r)
 
 
-def make_tree(restaurant_data: list, cuisine_list: list) -> Tree:
+def make_tree(restaurant_data: list, cuisine_list: list) -> RestaurantTree:
     """Make a tree from the restaurant data attributes we chose to make available to the user from dataset."""
-    central_tree = Tree('', [])
-    # r_rows = []
-    for r in restaurant_data:
-        if isinstance(r, dict):
-            row = []
-
-            # What kind of food are you craving? (FOOD CATEGORY)
-            # After running the function list_of_cuisines we get the list of potential cuisines
-            # (PARAMETER OF THIS FUNCTION)
-            try:
-                cuisine_contains = False
-                for cuisine in cuisine_list:
-                    if cuisine in r['categories']:
-                        row.append(cuisine)
-                        cuisine_contains = True
-                        break
-                if cuisine_contains is False:
-                    continue
-            except KeyError:
-                continue
-
-            # TakeOut option (YES/NO)
-            try:
-                if isinstance(r['attributes'], dict):
-                    if r['attributes']['RestaurantsTakeOut'] == 'True':
-                        row.append('takeout')
-                    elif r['attributes']['RestaurantsTakeOut'] == 'False':
-                        row.append('no takeout')
-                    else:
-                        continue
-
-            except KeyError:
-                continue
-
-            # Do you have a preference for star rating? (RATING) YES/NO
-            try:
-                if r['stars'] >= 3.0:
-                    row.append('high star')
-                elif r['stars'] < 3.0:
-                    row.append('low star')
-                else:
-                    continue
-            except KeyError:
-                continue
-
-            # Would you prefer the option to drink alcohol at the restaurant? (ALCOHOL) YES/NO
-            try:
-                if isinstance(r['attributes'], dict):
-                    if r['attributes']['Alcohol'] == "u'none'":
-                        row.append('no alcohol')
-                    elif r['attributes']['Alcohol'] != "u'none'":
-                        row.append('alcohol')
-                    else:
-                        continue
-            except KeyError:
-                continue
-
-            # Would you prefer having WiFi at the restaurant? (WIFI) YES/NO
-            try:
-                if isinstance(r['attributes'], dict):
-                    if r['attributes']['WiFi'] == "'no'":
-                        row.append('no wifi')
-                    elif r['attributes']['WiFi'] != "'no'":
-                        row.append('wifi')
-                    else:
-                        continue
-            except KeyError:
-                continue
-
-            # Do you need to pay with credit card? (CREDIT CARD) YES/NO
-            try:
-                if isinstance(r['attributes'], dict):
-                    if r['attributes']["BusinessAcceptsCreditCards"] == 'True':
-                        row.append('credit card')
-                    elif r['attributes']["BusinessAcceptsCreditCards"] != 'True':
-                        row.append('no credit card')
-                    else:
-                        continue
-            except KeyError:
-                continue
-
-            # Are you eating with a group? (YES/NO)
-            try:
-                if isinstance(r['attributes'], dict):
-                    if r['attributes']['RestaurantsGoodForGroups'] == 'True':
-                        row.append('groups')
-                    elif r['attributes']['RestaurantsGoodForGroups'] != 'True':
-                        row.append('no groups')
-                    else:
-                        continue
-            except KeyError:
-                continue
-
-            # On a scale of 1 to 4 what kind of pricing do you prefer? ($, $$, $$$, $$$$)
-            try:
-                if isinstance(r['attributes'], dict):
-                    if r['attributes']['RestaurantsPriceRange2'] == '1':
-                        row.append('$')
-                    elif r['attributes']['RestaurantsPriceRange2'] == '2':
-                        row.append('$$')
-                    elif r['attributes']['RestaurantsPriceRange2'] == '3':
-                        row.append('$$$')
-                    elif r['attributes']['RestaurantsPriceRange2'] == '4':
-                        row.append('$$$$')
-                    else:
-                        continue
-            except KeyError:
-                continue
-
-            # Adding the restaurant name as a leaf
-            try:
-                row.append(r['name'])
-            except KeyError:
-                continue
-
-            # r_rows.append(row)
+    return make_tree_from_rows(make_row(r, cuisine_list) for r in restaurant_data
+                               if isinstance(r, (dict, Restaurant)))
+
+
+def make_tree_from_rows(rows: Iterable[Optional[list]], central_tree: Any = None) -> Any:
+    """Make a tree from rows already produced by make_row, skipping any that are None.
+
+    The rows are inserted into central_tree if it is given (any tree with an insert_sequence method, such as
+    Tree('', [])), and otherwise into a new RestaurantTree.
+    """
+    if central_tree is None:
+        central_tree = RestaurantTree()
+    for row in rows:
+        if row is not None:
             central_tree.insert_sequence(row)
 
     return central_tree
 
 
-def recommended_to_dict(r_restaurants: list, r_data: list[dict]) -> list[dict]:
-    """Return the corresponding dictionaries to recommended_restaurants."""
-    r_d = []
-    for business in r_data:
-        for restaurant in r_restaurants:
-            if business['name'] == restaurant:
-                r_d.append(business)
-    return r_d
+def recommended_to_dict(r_restaurants: list, r_index: dict[str, Restaurant | dict]) -> list[Restaurant | dict]:
+    """Return the corresponding dictionaries to recommended_restaurants, which are business ids.
+
+    r_index maps business ids to restaurants (see RestaurantCatalogue.by_id).
+    """
+    return [r_index[restaurant] for restaurant in r_restaurants if restaurant in r_index]
 
 
 if __name__ == '__main__':
@@ -279,8 +372,9 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 300,
-        'disable': ['E1136', 'W0221', 'R0915', 'R0912', 'R1702'],
+        'disable': ['E1136', 'W0221', 'R0915', 'R0912', 'R1702', 'E9959'],
         'max-nested-blocks': 4,
-        'extra-imports': ["json", "zipfile", "os"],
-        'allowed-io': ['unzip_data', 'filter_cuisine']
+        'extra-imports': ["itertools", "json", "zipfile", "category_implement", "feature_implement",
+                          "index_implement", "record_implement"],
+        'allowed-io': ['stream_data', 'filter_cuisine']
     })
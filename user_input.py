@@ -4,6 +4,26 @@ user data in variables for us to make predictions on. We are using the library t
 import tkinter as tk
 from typing import Any
 
+from index_implement import ANY
+
+# The option offered in every preference menu for users who don't mind what the attribute is
+NO_PREFERENCE = "Doesn't matter"
+
+# Maps each option of each preference menu to the value it gives the decision tree (a menu left unset is
+# treated like NO_PREFERENCE)
+CUISINE_OPTIONS = {**{cuisine: cuisine for cuisine in ['American', 'Chinese', 'Greek', 'Italian', 'Japanese',
+                                                       'Mexican', 'Thai', 'Tex-Mex', 'Vegetarian', 'Asian',
+                                                       'Mediterranean', 'Seafood', 'Southern']},
+                   NO_PREFERENCE: ANY}
+TAKEOUT_OPTIONS = {'Takeout': 'takeout', 'Dine In': 'no takeout', NO_PREFERENCE: ANY}
+STAR_RATING_OPTIONS = {'3+ stars': 'high star', '3- stars (Who cares about the rating anyway?)': 'low star',
+                       NO_PREFERENCE: ANY}
+ALCOHOL_OPTIONS = {'Alcohol': 'alcohol', 'No Alcohol': 'no alcohol', NO_PREFERENCE: ANY}
+WIFI_OPTIONS = {'Wi-Fi Available': 'wifi', 'Wi-Fi not needed!': 'no wifi', NO_PREFERENCE: ANY}
+CREDIT_CARD_OPTIONS = {'Credit Card': 'credit card', 'Cash Only': 'no credit card', NO_PREFERENCE: ANY}
+GROUP_OPTIONS = {'Dining with a Group': 'groups', 'No Group!': 'no groups', NO_PREFERENCE: ANY}
+PRICE_OPTIONS = {'$': '$', '$$': '$$', '$$$': '$$$', '$$$$': '$$$$', NO_PREFERENCE: ANY}
+
 
 def display_user_input() -> tuple:
     """Display interactive UI"""
@@ -14,51 +34,11 @@ def display_user_input() -> tuple:
     def save_results() -> tuple:
         """Save the user's choices into variables."""
 
-        user_input_final = []
-
         user_area = area_nashville.get()
-        input_cuisine = cuisine_type.get()
-        input_takeout = takeout_type.get()
-        input_star_rating = star_rating_type.get()
-        input_alcohol = alcohol_type.get()
-        input_wifi = wifi_type.get()
-        input_credit_card = credit_card_type.get()
-        input_group = group_type.get()
-        input_price = price_type.get()
-
-        user_input_final.append(input_cuisine)
-
-        if input_takeout == 'Takeout':
-            user_input_final.append('takeout')
-        else:
-            user_input_final.append('no takeout')
-
-        if input_star_rating == '3+ stars':
-            user_input_final.append('high star')
-        else:
-            user_input_final.append('low star')
-
-        if input_alcohol == 'Alcohol':
-            user_input_final.append('alcohol')
-        else:
-            user_input_final.append('no alcohol')
-
-        if input_wifi == 'Wi-Fi Available':
-            user_input_final.append('wifi')
-        else:
-            user_input_final.append('no wifi')
-
-        if input_credit_card == 'Credit Card':
-            user_input_final.append('credit card')
-        else:
-            user_input_final.append('no credit card')
-
-        if input_group == 'Dining with a Group':
-            user_input_final.append('groups')
-        else:
-            user_input_final.append('no groups')
-
-        user_input_final.append(input_price)
+        menus = [(cuisine_type, CUISINE_OPTIONS), (takeout_type, TAKEOUT_OPTIONS),
+                 (star_rating_type, STAR_RATING_OPTIONS), (alcohol_type, ALCOHOL_OPTIONS), (wifi_type, WIFI_OPTIONS),
+                 (credit_card_type, CREDIT_CARD_OPTIONS), (group_type, GROUP_OPTIONS), (price_type, PRICE_OPTIONS)]
+        user_input_final = [options.get(menu.get(), ANY) for menu, options in menus]
         return user_area, user_input_final
 
     def return_save_results(_event: Any) -> tuple:
@@ -120,42 +100,33 @@ def display_user_input() -> tuple:
     # OPTIONS
     area_nashville_options = ['Downtown', 'East Nashville', 'The Gulch', 'Germantown', '12 South',
                               'Green Hills', 'Belmont-Hillsboro', 'Joelton']
-    cuisine_options = ['American', 'Chinese', 'Greek', 'Italian', 'Japanese', 'Mexican', 'Thai', 'Tex-Mex',
-                       'Vegetarian', 'Asian', 'Mediterranean', 'Seafood', 'Southern']
-    takeout_options = ['Takeout', 'Dine In']
-    star_rating_options = ['3+ stars', '3- stars (Who cares about the rating anyway?)']
-    alcohol_options = ['Alcohol', 'No Alcohol']
-    wifi_options = ['Wi-Fi Available', 'Wi-Fi not needed!']
-    credit_card_options = ['Credit Card', 'Cash Only']
-    group_options = ['Dining with a Group', 'No Group!']
-    price_options = ['$', '$$', '$$$', '$$$$']
 
     # DROP-DOWN MENUS
     area_nashville_menu = tk.OptionMenu(main_frame, area_nashville, *area_nashville_options)
     area_nashville_menu.grid(row=1, column=1)
 
-    cuisine_menu = tk.OptionMenu(main_frame, cuisine_type, *cuisine_options)
+    cuisine_menu = tk.OptionMenu(main_frame, cuisine_type, *CUISINE_OPTIONS)
     cuisine_menu.grid(row=2, column=1)
 
-    takeout_menu = tk.OptionMenu(main_frame, takeout_type, *takeout_options)
+    takeout_menu = tk.OptionMenu(main_frame, takeout_type, *TAKEOUT_OPTIONS)
     takeout_menu.grid(row=3, column=1)
 
-    star_rating_menu = tk.OptionMenu(main_frame, star_rating_type, *star_rating_options)
+    star_rating_menu = tk.OptionMenu(main_frame, star_rating_type, *STAR_RATING_OPTIONS)
     star_rating_menu.grid(row=4, column=1)
 
-    alcohol_menu = tk.OptionMenu(main_frame, alcohol_type, *alcohol_options)
+    alcohol_menu = tk.OptionMenu(main_frame, alcohol_type, *ALCOHOL_OPTIONS)
     alcohol_menu.grid(row=5, column=1)
 
-    wifi_menu = tk.OptionMenu(main_frame, wifi_type, *wifi_options)
+    wifi_menu = tk.OptionMenu(main_frame, wifi_type, *WIFI_OPTIONS)
     wifi_menu.grid(row=6, column=1)
 
-    credit_card_menu = tk.OptionMenu(main_frame, credit_card_type, *credit_card_options)
+    credit_card_menu = tk.OptionMenu(main_frame, credit_card_type, *CREDIT_CARD_OPTIONS)
     credit_card_menu.grid(row=7, column=1)
 
-    group_menu = tk.OptionMenu(main_frame, group_type, *group_options)
+    group_menu = tk.OptionMenu(main_frame, group_type, *GROUP_OPTIONS)
     group_menu.grid(row=8, column=1)
 
-    price_menu = tk.OptionMenu(main_frame, price_type, *price_options)
+    price_menu = tk.OptionMenu(main_frame, price_type, *PRICE_OPTIONS)
     price_menu.grid(row=9, column=1)
 
     # SAVE RESULTS (BUTTON)
@@ -252,5 +223,5 @@ if __name__ == '__main__':
         'max-line-length': 300,
         'disable': ['E1136', 'W0221', 'R0914', 'R0915'],
         'max-nested-blocks': 4,
-        'extra-imports': ['tkinter']
+        'extra-imports': ['tkinter', 'index_implement']
     })